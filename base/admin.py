@@ -55,6 +55,9 @@ class RestaurantAdmin(admin.ModelAdmin):
         ("Horaires", {
             'fields': ('opening_hours',)
         }),
+        ("Commandes", {
+            'fields': ('tax_rate',)
+        }),
         ("Abonnement", {
             'fields': (
                 'subscription_plan',
@@ -0,0 +1,338 @@
+"""
+Outils communs aux commandes de benchmark (manage.py bench_*).
+
+Les benchmarks tournent dans une base de test jetable (comme les tests
+Django) pour ne jamais écrire de données synthétiques dans la vraie base.
+Seule la commande generate_fixtures utilise ces générateurs sur la base
+configurée, à la demande.
+"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import User
+from base.models import Category, MenuItem, Order, OrderItem, Restaurant, Table
+from base.utils import compute_totals
+
+
+@contextmanager
+def isolated_database(keepdb=False):
+    """
+    Crée une base de test temporaire et la supprime à la sortie.
+
+    L'état partagé avec les serveurs est isolé lui aussi : les ids de la base
+    temporaire recoupent ceux des vrais restaurants. Les caches deviennent des
+    LocMemCache privés (pas de snapshot de menu écrit dans le Redis de
+    production), les évènements de commandes passent par un LocalBroker et
+    les paniers par la base temporaire.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        with _private_caches(), _private_brokers():
+            yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def _private_caches():
+    tag = uuid.uuid4().hex[:8]
+    return override_settings(CACHES={
+        alias: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"bench-{tag}-{alias}",
+        }
+        for alias in settings.CACHES
+    })
+
+
+@contextmanager
+def _private_brokers():
+    from base import events
+    from customer import cart_store
+    from customer.tenants import tenant_cache
+
+    saved = events._broker, cart_store._store
+    events._broker, cart_store._store = events.LocalBroker(), cart_store.DatabaseCartStore()
+    tenant_cache.clear()
+    try:
+        yield
+    finally:
+        events._broker, cart_store._store = saved
+        tenant_cache.clear()
+
+
+def create_owner():
+    suffix = uuid.uuid4().hex[:8]
+    return User.objects.create_user(
+        email=f"bench-{suffix}@openfood.test",
+        password=None,
+        first_name="Bench",
+        last_name=suffix,
+    )
+
+
+def create_owners(count, batch_size=1000):
+    """Crée `count` propriétaires en bulk (mot de passe inutilisable)."""
+    tag = uuid.uuid4().hex[:8]
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(
+                email=f"bench-{tag}-{i}@openfood.test",
+                password=password,
+                first_name="Bench",
+                last_name=str(i),
+            )
+            for i in range(count)
+        ],
+        batch_size=batch_size,
+    )
+    return list(User.objects.filter(email__startswith=f"bench-{tag}-").order_by("id"))
+
+
+def create_restaurants(count, owner=None, prefix="resto", batch_size=1000, owners=None):
+    """
+    Crée `count` restaurants en bulk (sans génération de QR code). Avec
+    `owners`, chaque restaurant reçoit un propriétaire de la liste à tour de rôle.
+    """
+    owners = owners or [owner or create_owner()]
+    restaurants = []
+    for i in range(count):
+        slug = slugify(f"{prefix}-{i}")
+        restaurants.append(Restaurant(
+            owner=owners[i % len(owners)],
+            name=f"{prefix.title()} {i}",
+            slug=slug,
+            subdomain=slug,
+            address=f"{i} rue du Marché",
+            phone="0100000000",
+            email=f"{slug}@openfood.test",
+        ))
+    Restaurant.objects.bulk_create(restaurants, batch_size=batch_size)
+    return list(
+        Restaurant.objects.filter(owner__in=owners, slug__startswith=slugify(prefix)).order_by("id")
+    )
+
+
+def create_menu_images(count, size=(640, 480)):
+    """Enregistre `count` images JPEG de démonstration et retourne leurs noms."""
+    from PIL import Image
+
+    field = MenuItem._meta.get_field("image")
+    names = []
+    for i in range(count):
+        color = tuple((i * step) % 256 for step in (67, 131, 197))
+        buffer = BytesIO()
+        Image.new("RGB", size, color).save(buffer, format="JPEG", quality=80)
+        names.append(field.storage.save(f"{field.upload_to}bench-{i}.jpg", ContentFile(buffer.getvalue())))
+    return names
+
+
+def create_menu(restaurants, categories=5, items_per_category=20, images=None, batch_size=1000):
+    """
+    Crée catégories et articles en bulk pour chaque restaurant. `images` :
+    noms de fichiers (create_menu_images) attribués aux articles à tour de rôle.
+    """
+    Category.objects.bulk_create(
+        [
+            Category(restaurant=restaurant, name=f"Catégorie {c}", slug=f"categorie-{c}", order=c)
+            for restaurant in restaurants
+            for c in range(categories)
+        ],
+        batch_size=batch_size,
+    )
+    items = []
+    for category in Category.objects.filter(restaurant__in=restaurants):
+        for i in range(items_per_category):
+            items.append(MenuItem(
+                restaurant_id=category.restaurant_id,
+                category=category,
+                name=f"Plat {category.order}-{i}",
+                slug=f"plat-{category.order}-{i}",
+                price=Decimal(500 + i * 50) / 100,
+                image=images[len(items) % len(images)] if images else "",
+                is_available=i % 10 != 0,
+                order=i,
+            ))
+        if len(items) >= batch_size * 10:
+            MenuItem.objects.bulk_create(items, batch_size=batch_size)
+            items = []
+    MenuItem.objects.bulk_create(items, batch_size=batch_size)
+
+
+def create_tables(restaurants, count=20, batch_size=1000):
+    """Crée `count` tables par restaurant en bulk (sans génération de QR code)."""
+    Table.objects.bulk_create(
+        [
+            Table(restaurant=restaurant, number=str(n + 1), capacity=4, is_active=n % 8 != 0)
+            for restaurant in restaurants
+            for n in range(count)
+        ],
+        batch_size=batch_size,
+    )
+
+
+def create_orders(restaurants, count, days=365, batch_size=5000, seed=42, max_lines=0):
+    """
+    Crée `count` commandes réparties sur les `days` derniers jours, en bulk
+    (sans signaux : les agrégats sont à reconstruire avec rebuild_rollups).
+    Les commandes sur place sont rattachées à une table du restaurant ; avec
+    `max_lines`, chaque commande reçoit de 1 à `max_lines` lignes d'articles.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    tag = uuid.uuid4().hex[:4].upper()
+    types = [code for code, _ in Order.ORDER_TYPE_CHOICES]
+    statuses = [code for code, _ in Order.STATUS_CHOICES]
+    created_at = Order._meta.get_field("created_at")
+
+    tables, menus = {}, {}
+    for restaurant_id, table_id in Table.objects.filter(
+        restaurant__in=restaurants
+    ).values_list("restaurant_id", "id"):
+        tables.setdefault(restaurant_id, []).append(table_id)
+    if max_lines:
+        for restaurant_id, item_id, price in MenuItem.objects.filter(
+            restaurant__in=restaurants, is_available=True
+        ).values_list("restaurant_id", "id", "price"):
+            menus.setdefault(restaurant_id, []).append((item_id, price))
+
+    # auto_now_add écraserait les dates générées
+    created_at.auto_now_add = False
+    try:
+        for start in range(0, count, batch_size):
+            batch, lines = [], {}
+            for i in range(start, min(start + batch_size, count)):
+                restaurant = rng.choice(restaurants)
+                order_type = rng.choice(types)
+                number = f"ORD-{tag}{i:09d}"
+
+                menu = menus.get(restaurant.id)
+                if menu:
+                    lines[number] = [
+                        (item_id, price, rng.randint(1, 3))
+                        for item_id, price in rng.sample(menu, min(len(menu), rng.randint(1, max_lines)))
+                    ]
+                    subtotal = sum((price * qty for _, price, qty in lines[number]), Decimal("0.00"))
+                else:
+                    subtotal = Decimal(rng.randrange(500, 20000)) / 100
+                tax, total = compute_totals(subtotal, restaurant.tax_rate)
+
+                batch.append(Order(
+                    restaurant=restaurant,
+                    table_id=(
+                        rng.choice(tables[restaurant.id])
+                        if order_type == "dine_in" and tables.get(restaurant.id) else None
+                    ),
+                    order_number=number,
+                    order_type=order_type,
+                    status=rng.choice(statuses),
+                    subtotal=subtotal,
+                    tax=tax,
+                    total=total,
+                    created_at=now - timedelta(seconds=rng.randrange(days * 86400)),
+                ))
+            Order.objects.bulk_create(batch)
+
+            if lines:
+                # bulk_create ne renseigne pas les id sous MySQL : relecture par numéro
+                ids = dict(
+                    Order.objects.filter(restaurant__in=restaurants, order_number__in=list(lines))
+                    .values_list("order_number", "id")
+                )
+                OrderItem.objects.bulk_create(
+                    [
+                        OrderItem(order_id=ids[number], menu_item_id=item_id, price=price, quantity=qty)
+                        for number, order_lines in lines.items()
+                        for item_id, price, qty in order_lines
+                    ],
+                    batch_size=batch_size,
+                )
+    finally:
+        created_at.auto_now_add = True
+
+
+def generate_dataset(
+    restaurants=100, tables=20, categories=5, items=20, orders=10_000,
+    days=365, max_lines=3, images=0, prefix="resto", seed=42, stdout=None,
+):
+    """
+    Jeu de données multi-restaurants complet (un propriétaire par restaurant),
+    agrégats journaliers compris. Retourne la liste des restaurants.
+    """
+    from base.rollups import rebuild_rollups
+
+    def step(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    step(f"{restaurants} restaurants...")
+    owners = create_owners(restaurants)
+    created = create_restaurants(restaurants, prefix=prefix, owners=owners)
+
+    step(f"Menus ({categories} catégories x {items} articles)...")
+    create_menu(
+        created, categories, items,
+        images=create_menu_images(images) if images else None,
+    )
+
+    step(f"{tables} tables par restaurant...")
+    create_tables(created, tables)
+
+    step(f"{orders} commandes sur {days} jours...")
+    create_orders(created, orders, days=days, seed=seed, max_lines=max_lines)
+
+    step("Agrégats journaliers...")
+    rebuild_rollups([restaurant.id for restaurant in created])
+    return created
+
+
+def rate(func, iterations):
+    """Exécute `func(i)` `iterations` fois et retourne (durée, ops/s)."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    return elapsed, iterations / elapsed if elapsed else float("inf")
+
+
+def percentile(samples, pct):
+    """Percentile (0-100) d'une liste de mesures, par rang le plus proche."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(func, iterations):
+    """Exécute `func(i)` et retourne la liste des durées (en ms)."""
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    total = sum(samples) / 1000
+    return {
+        "ops/s": len(samples) / total if total else float("inf"),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
@@ -0,0 +1,18 @@
+"""
+Backend MySQL avec pool de connexions (ENGINE = "base.db.mysql_pool").
+
+Activé par DB_POOL=True (voir main/settings.py et base/db/pool.py).
+"""
+from django.db.backends.mysql import base as mysql
+
+from base.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, mysql.DatabaseWrapper):
+
+    def ping(self, connection):
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
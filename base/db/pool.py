@@ -0,0 +1,128 @@
+"""
+Pool de connexions en processus pour les backends Django.
+
+Django garde au plus une connexion par thread (CONN_MAX_AGE). En ASGI, les
+vues async exécutent l'ORM dans des threads de passage : les connexions
+persistantes s'y accumulent ou sont rouvertes sans cesse. Avec le pool,
+chaque requête rend sa connexion (CONN_MAX_AGE = 0) et la suivante la
+reprend, quel que soit son thread.
+
+Une connexion n'est remise dans le pool que si son état est propre (pas de
+transaction ouverte, pas d'erreur) ; sinon elle est fermée.
+"""
+import threading
+import time
+from collections import deque
+
+
+class ConnectionPool:
+    """Connexions DB-API inactives, partagées par les threads d'un processus."""
+
+    def __init__(self, max_size=10, max_lifetime=1800, check=None):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._idle = deque()
+        self._created = {}
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    def _expired(self, connection):
+        created = self._created.get(id(connection))
+        return created is None or time.monotonic() - created >= self.max_lifetime
+
+    def acquire(self, connect):
+        """Connexion inactive du pool, ou nouvelle connexion via `connect()`."""
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                break
+            if self._expired(connection) or (self.check and not self.check(connection)):
+                self.discard(connection)
+                continue
+            with self._lock:
+                self.stats["reused"] += 1
+            return connection
+
+        connection = connect()
+        with self._lock:
+            self._created[id(connection)] = time.monotonic()
+            self.stats["opened"] += 1
+        return connection
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_size and not self._expired(connection):
+                self._idle.append(connection)
+                return
+        self.discard(connection)
+
+    def discard(self, connection):
+        with self._lock:
+            self._created.pop(id(connection), None)
+            self.stats["discarded"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self.discard(connection)
+
+    def __len__(self):
+        return len(self._idle)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(**options)
+        return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    À placer devant le DatabaseWrapper d'un backend. Options, dans
+    DATABASES[alias]["OPTIONS"]["pool"] : max_size, max_lifetime (secondes).
+    """
+
+    def ping(self, connection):
+        """Vérifie une connexion avant réutilisation (CONN_HEALTH_CHECKS)."""
+        raise NotImplementedError
+
+    @property
+    def pool(self):
+        options = self.settings_dict["OPTIONS"].get("pool") or {}
+        check = self.ping if self.settings_dict["CONN_HEALTH_CHECKS"] else None
+        return get_pool(self.alias, check=check, **options)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # État incertain : la connexion n'est pas rendue au pool
+        reusable = (
+            not self.in_atomic_block
+            and not self.errors_occurred
+            and self.get_autocommit() == self.settings_dict["AUTOCOMMIT"]
+        )
+        if reusable:
+            self.pool.release(self.connection)
+        else:
+            self.pool.discard(self.connection)
@@ -0,0 +1,231 @@
+"""
+Évènements de commandes en temps réel (tableau de bord des commandes).
+
+Chaque restaurant a un canal "orders:<id>". Les créations de commande et
+les changements de statut y sont publiés après le commit de la
+transaction (base/signals.py) ; la vue SSE `order_events` relaie le canal
+aux écrans de la cuisine, qui n'ont plus besoin de recharger la liste.
+
+Backends (settings.ORDER_EVENTS["BACKEND"]) :
+- base.events.LocalBroker : en mémoire, par processus. Suffit avec un
+  seul worker ; sinon un évènement publié dans un worker n'atteint pas
+  les écrans abonnés dans un autre.
+- base.events.RedisBroker : PUBLISH / PSUBSCRIBE Redis, entre workers
+  (Redis ou customer.resp.RespStandInServer en local)
+
+La publication ne doit jamais faire échouer une requête : la commande est
+déjà validée quand elle a lieu. Les erreurs du broker sont journalisées
+(on_commit robust) et l'évènement est perdu ; les écrans se resynchronisent
+au prochain rechargement.
+
+Le flux SSE n'est servi que sous ASGI (live_events_available) : sous WSGI,
+un flux infini occuperait un worker jusqu'à la déconnexion du client.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from base.models import Order
+from customer.resp import RespClient
+
+CHANNEL_PREFIX = "orders:"
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS = "order.status"
+# Abonné trop lent (file pleine) : l'écran doit recharger la liste
+RESYNC = "resync"
+
+
+def order_channel(restaurant_id):
+    return f"{CHANNEL_PREFIX}{restaurant_id}"
+
+
+def order_event(order, kind):
+    table = order.table if order.table_id else None
+    return {
+        "type": kind,
+        "id": order.id,
+        "order_number": order.order_number,
+        "status": order.status,
+        "status_display": order.get_status_display(),
+        "order_type": order.order_type,
+        "table": table.number if table else None,
+        "total": str(order.total),
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+def publish_order_event(order, kind):
+    """
+    Publie l'évènement quand (et si) la transaction en cours est validée,
+    avec l'état de la commande à ce moment-là (totaux recalculés...).
+    """
+    channel = order_channel(order.restaurant_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, order_event(order, kind)), robust=True)
+
+
+def publish_order_events(order_ids, kind):
+    """
+    Même chose pour des commandes modifiées par QuerySet.update (sans
+    signaux) : une requête au commit pour toutes les commandes.
+    """
+    def publish():
+        broker = get_broker()
+        for order in Order.objects.filter(pk__in=order_ids).select_related("table"):
+            broker.publish(order_channel(order.restaurant_id), order_event(order, kind))
+
+    transaction.on_commit(publish, robust=True)
+
+
+def live_events_available(request):
+    """Vrai si la requête est servie en ASGI (flux SSE possible)."""
+    return isinstance(request, ASGIRequest)
+
+
+async def event_stream(channel, keepalive=15):
+    """Flux Server-Sent Events d'un canal (commentaire toutes les `keepalive` s)."""
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            event = await subscription.get(keepalive)
+            if event is None:
+                # Garde la connexion ouverte derrière les proxys
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+class Subscription:
+    """File d'évènements d'un abonné, lue depuis sa boucle asyncio."""
+
+    def __init__(self, broker, channel, max_size=100):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_size)
+
+    def deliver(self, event):
+        """Appelable depuis n'importe quel thread."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # On ne bloque jamais l'émetteur : l'abonné repart de zéro
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC})
+
+    async def get(self, timeout=None):
+        """Prochain évènement, ou None après `timeout` secondes."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+
+    def __init__(self, queue_size=100, **options):
+        self.queue_size = queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        self.dispatch(channel, event)
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+        return len(subscriptions)
+
+    def subscribe(self, channel):
+        """À appeler depuis la boucle asyncio de l'abonné."""
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publication par PUBLISH ; une seule connexion PSUBSCRIBE "orders:*" par
+    processus, lue par un thread qui redistribue aux abonnés locaux.
+
+    Serveur injoignable : les publications sont abandonnées sans attendre
+    pendant `retry_after` secondes, au lieu de payer le timeout à chaque commande.
+    """
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", timeout=0.5, queue_size=100,
+                 retry_after=5.0, **options):
+        super().__init__(queue_size)
+        self.client = RespClient(url, timeout=timeout)
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+        self._listener = None
+
+    def publish(self, channel, event):
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError("Broker d'évènements injoignable")
+        try:
+            self.client.execute("PUBLISH", channel, json.dumps(event))
+        except (ConnectionError, OSError):
+            self._retry_at = time.monotonic() + self.retry_after
+            raise
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+        return subscription
+
+    def _listen(self):
+        pattern = f"{CHANNEL_PREFIX}*"
+        while True:
+            try:
+                for message in self.client.listen("PSUBSCRIBE", pattern):
+                    if message and message[0] == b"pmessage":
+                        self.dispatch(message[2].decode(), json.loads(message[3]))
+            except (ConnectionError, OSError, ValueError):
+                # Serveur redémarré : nouvel abonnement après une courte pause
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, "ORDER_EVENTS", {})
+                backend = import_string(config.get("BACKEND", "base.events.LocalBroker"))
+                _broker = backend(**config.get("OPTIONS", {}))
+    return _broker
@@ -23,7 +23,10 @@ class RestaurantCreateForm(forms.ModelForm):
         }
 
 # forms.py
+from datetime import datetime, time, timedelta
+
 from django import forms
+from django.utils import timezone
 from .models import Order, OrderItem, MenuItem, Table
 
 
@@ -72,4 +75,60 @@ OrderItemFormSet = forms.inlineformset_factory(
 class TableForm(forms.ModelForm):
     class Meta:
         model = Table
-        fields = ['number', 'capacity']
\ No newline at end of file
+        fields = ['number', 'capacity']
+
+class OrderFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        label='Statut', choices=[('', 'Tous les statuts')] + Order.STATUS_CHOICES, required=False
+    )
+    order_type = forms.ChoiceField(
+        label='Type', choices=[('', 'Tous les types')] + Order.ORDER_TYPE_CHOICES, required=False
+    )
+    table = forms.ModelChoiceField(
+        label='Table', queryset=Table.objects.none(), required=False, empty_label='Toutes les tables'
+    )
+    date_from = forms.DateField(
+        label='Du', required=False, widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    date_to = forms.DateField(
+        label='Au', required=False, widget=forms.DateInput(attrs={'type': 'date'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.restaurant = kwargs.pop('restaurant', None)
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = (
+                'w-full px-3 py-2 border border-gray-200 rounded-lg text-sm '
+                'focus:outline-none focus:ring-2 focus:ring-primary/20'
+            )
+        if self.restaurant:
+            self.fields['table'].queryset = Table.objects.filter(
+                restaurant=self.restaurant
+            ).order_by('number')
+        # str(table) lirait le restaurant : une requête par option
+        self.fields['table'].label_from_instance = lambda table: f"Table {table.number}"
+
+    def filter(self, queryset):
+        """Applique les filtres valides ; les dates sont converties en bornes
+        created_at (sans __date, qui empêcherait l'usage de l'index)."""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['status']:
+            queryset = queryset.filter(status=data['status'])
+        if data['order_type']:
+            queryset = queryset.filter(order_type=data['order_type'])
+        if data['table']:
+            queryset = queryset.filter(table=data['table'])
+        if data['date_from']:
+            queryset = queryset.filter(created_at__gte=start_of_day(data['date_from']))
+        if data['date_to']:
+            queryset = queryset.filter(
+                created_at__lt=start_of_day(data['date_to'] + timedelta(days=1))
+            )
+        return queryset
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
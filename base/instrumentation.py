@@ -0,0 +1,219 @@
+"""
+Instrumentation des requêtes (opt-in : settings.INSTRUMENTATION_ENABLED).
+
+Pour une fraction des requêtes (INSTRUMENTATION_SAMPLE_RATE), le
+middleware mesure le nombre de requêtes SQL, le temps passé en base, en
+sérialisation et en rendu de templates. Les mesures sont renvoyées dans
+l'en-tête Server-Timing et agrégées par vue dans des histogrammes en
+mémoire (par processus), consultables sur /metrics/ (staff uniquement).
+
+Les requêtes non échantillonnées ne paient qu'un tirage aléatoire.
+"""
+import bisect
+import contextvars
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Bornes des classes des histogrammes, en ms (ou en nombre de requêtes SQL)
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+METRICS = ("total", "db", "queries", "serializer", "template")
+
+_current = contextvars.ContextVar("instrumentation", default=None)
+
+
+class Histogram:
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """Borne supérieure de la classe contenant le percentile demandé."""
+        if not self.count:
+            return 0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 2) if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 2),
+        }
+
+
+class Registry:
+    """Histogrammes par vue et par mesure, partagés par les threads du processus."""
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, timings):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {name: Histogram() for name in METRICS}
+            for name in METRICS:
+                histograms[name].add(timings[name])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for view, histograms in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = Registry()
+
+
+@contextmanager
+def measure(name):
+    """Ajoute la durée du bloc à la mesure `name` de la requête échantillonnée en cours."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] += (time.perf_counter() - start) * 1000
+
+
+def _patch_template_render():
+    """Chronomètre Template.render (rendu de premier niveau seulement)."""
+    from django.template.base import Template
+
+    if getattr(Template.render, "_instrumented", False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        timings = _current.get()
+        if timings is None or timings["_depth"]:
+            return original(self, context)
+        timings["_depth"] += 1
+        try:
+            with measure("template"):
+                return original(self, context)
+        finally:
+            timings["_depth"] -= 1
+
+    render._instrumented = True
+    Template.render = render
+
+
+class InstrumentationMiddleware:
+    # Synchrone ou asynchrone selon la chaîne : sous ASGI, les vues async ne
+    # passent pas par un thread à cause de ce middleware
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTATION_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0.05)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _patch_template_render()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = _new_timings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                _wrap_connections(stack, timings)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timings = _new_timings()
+        # Les connexions sont propres à chaque thread : les wrappers sont posés
+        # dans le thread où s'exécute l'ORM de la requête (thread_sensitive)
+        stack = ExitStack()
+        await sync_to_async(_wrap_connections)(stack, timings)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, timings, start)
+
+    def _finish(self, request, response, timings, start):
+        timings["total"] = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        registry.record(match.view_name if match else "<non résolue>", timings)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={timings["db"]:.1f};desc="{timings["queries"]} SQL"',
+            f'ser;dur={timings["serializer"]:.1f};desc="Serializers"',
+            f'tpl;dur={timings["template"]:.1f};desc="Templates"',
+            f'total;dur={timings["total"]:.1f}',
+        ])
+        return response
+
+
+def _new_timings():
+    timings = {name: 0 for name in METRICS}
+    timings["_depth"] = 0
+    return timings
+
+
+def _wrap_connections(stack, timings):
+    """Chronomètre les requêtes SQL des connexions du thread courant."""
+    def db_wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings["db"] += (time.perf_counter() - start) * 1000
+            timings["queries"] += 1
+
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(db_wrapper))
@@ -0,0 +1,85 @@
+"""
+Écran cuisine : commandes en cours et flux incrémental ("changes since").
+
+Sans curseur, on renvoie les commandes non terminées avec leurs lignes et
+le numéro de table. Avec `since`, on ne renvoie que les commandes créées
+ou modifiées depuis (y compris celles passées à "delivered" / "cancelled",
+marquées `active: false`, que l'écran retire). Une tablette qui interroge
+toutes les quelques secondes ne lit alors presque rien.
+
+Le curseur est une date (updated_at) : il est pris un peu avant l'instant
+de la requête (KITCHEN_CURSOR_LAG) pour ne pas manquer une transaction
+encore en cours ou un léger décalage d'horloge entre workers. Une même
+modification peut donc être renvoyée deux fois ; l'écran remplace la
+commande par son id. Les suppressions n'apparaissent pas dans le flux :
+l'écran recharge la liste complète de temps en temps.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from base.models import Order, OrderItem
+
+ACTIVE_STATUSES = ["pending", "confirmed", "preparing", "ready"]
+ALL_STATUSES = [code for code, _ in Order.STATUS_CHOICES]
+
+
+def encode_since(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_since(cursor):
+    """Retourne la date du curseur ou None s'il est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        moment = datetime.fromisoformat(raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return moment if timezone.is_aware(moment) else None
+
+
+def serialize_order(order):
+    return {
+        "id": order.id,
+        "order_number": order.order_number,
+        "status": order.status,
+        "status_display": order.get_status_display(),
+        "active": order.status in ACTIVE_STATUSES,
+        "order_type": order.order_type,
+        "table": order.table.number if order.table else None,
+        "customer_name": order.customer_name,
+        "notes": order.notes,
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat(),
+        "items": [
+            {"name": item.menu_item.name, "quantity": item.quantity, "notes": item.notes}
+            for item in order.items.all()
+        ],
+    }
+
+
+def kitchen_orders(restaurant, since=None):
+    """
+    Retourne (commandes sérialisées, curseur suivant). Deux requêtes au plus
+    (commandes + lignes), une seule quand rien n'a changé.
+    """
+    cursor = timezone.now() - timedelta(seconds=getattr(settings, "KITCHEN_CURSOR_LAG", 5))
+    orders = Order.objects.filter(restaurant=restaurant)
+    if since is None:
+        orders = orders.filter(status__in=ACTIVE_STATUSES)
+    else:
+        # Tous les statuts listés : plages (status, updated_at) de l'index
+        # (restaurant, status, updated_at) au lieu d'un parcours du restaurant
+        orders = orders.filter(status__in=ALL_STATUSES, updated_at__gt=since)
+
+    orders = (
+        orders.select_related("table")
+        .prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("menu_item").order_by("pk"))
+        )
+        .order_by("created_at", "pk")
+    )
+    return [serialize_order(order) for order in orders], encode_since(cursor)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from base.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats journaliers des commandes (DailyOrderRollup) depuis la table Order"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            type=int,
+            nargs="*",
+            help="Identifiants des restaurants à recalculer (tous par défaut)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(options["restaurant"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{count} ligne(s) d'agrégats recalculée(s)."))
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from base.benchmarks import (
+    create_orders, create_restaurants, isolated_database, summarize, timed,
+)
+from base.models import Order
+from base.rollups import dashboard_stats, rebuild_rollups
+
+
+def order_table_stats(restaurant):
+    """Ancien calcul du tableau de bord, directement sur la table Order."""
+    today = timezone.now().date()
+    orders = Order.objects.filter(restaurant=restaurant)
+    total_orders = orders.count()
+    today_orders = orders.filter(created_at__date=today).count()
+    total_revenue = orders.filter(
+        status__in=["confirmed", "preparing", "ready", "delivered"]
+    ).aggregate(total=Sum("total"))["total"] or 0
+    orders_by_day = list(
+        orders.filter(created_at__date__gte=today - timedelta(days=6))
+        .extra(select={"day": "date(created_at)"})
+        .values("day")
+        .annotate(count=Count("id"))
+        .order_by("day")
+    )
+    order_types = list(orders.values("order_type").annotate(count=Count("id")))
+    return total_orders, today_orders, total_revenue, orders_by_day, order_types
+
+
+class Command(BaseCommand):
+    help = "Compare le tableau de bord calculé sur Order et sur les agrégats journaliers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--restaurants", type=int, default=20)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            restaurants = create_restaurants(options["restaurants"])
+            self.stdout.write(f"Création de {options['orders']} commandes...")
+            create_orders(restaurants, options["orders"], days=options["days"], seed=options["seed"])
+
+            elapsed = timed(lambda i: rebuild_rollups(), 1)[0]
+            self.stdout.write(f"backfill_order_rollups : {elapsed / 1000:.1f}s")
+
+            restaurant = restaurants[0]
+            for label, func in (
+                ("table Order", order_table_stats),
+                ("agrégats", dashboard_stats),
+            ):
+                with CaptureQueriesContext(connection) as queries:
+                    func(restaurant)
+                stats = summarize(timed(lambda i: func(restaurant), options["iterations"]))
+                self.stdout.write(
+                    f"{label:>12} : {len(queries):2d} requêtes, "
+                    f"p50 {stats['p50']:8.2f} ms, p95 {stats['p95']:8.2f} ms, p99 {stats['p99']:8.2f} ms"
+                )
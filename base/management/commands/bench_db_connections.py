@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from base.benchmarks import summarize, timed
+from base.db.pool import PooledDatabaseWrapperMixin, get_pool
+
+
+def make_wrapper(alias, pooled=False, **overrides):
+    """Connexion indépendante de `connections`, avec ses propres réglages."""
+    settings_dict = {**connections[DEFAULT_DB_ALIAS].settings_dict, **overrides}
+    backend = load_backend(settings_dict["ENGINE"])
+    wrapper_class = backend.DatabaseWrapper
+    if pooled and not issubclass(wrapper_class, PooledDatabaseWrapperMixin):
+        # Stand-in (SQLite...) : même mécanisme que base.db.mysql_pool
+        def ping(self, connection):
+            try:
+                connection.cursor().execute("SELECT 1")
+            except Exception:
+                return False
+            return True
+
+        wrapper_class = type(
+            "Pooled" + wrapper_class.__name__,
+            (PooledDatabaseWrapperMixin, wrapper_class),
+            {"ping": ping},
+        )
+    return wrapper_class(settings_dict, alias)
+
+
+def simulate_request(wrapper):
+    """Cycle d'une requête : close_old_connections, une requête SQL, close_old_connections."""
+    wrapper.close_if_unusable_or_obsolete()
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    wrapper.close_if_unusable_or_obsolete()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le coût par requête de la connexion à la base : une connexion par "
+        "requête, connexions persistantes (avec ou sans health checks) et pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, **options):
+        default = connections[DEFAULT_DB_ALIAS]
+        if default.vendor == "sqlite" and default.is_in_memory_db():
+            raise CommandError("Base SQLite en mémoire : utiliser un fichier pour ce benchmark")
+        self.stdout.write(f"Base : {default.vendor} ({default.settings_dict['NAME']})")
+
+        modes = (
+            ("une connexion par requête", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+            ("persistante", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": False}),
+            ("persistante + health checks", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}),
+            ("pool", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "pooled": True}),
+            ("pool + health checks", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "pooled": True}),
+        )
+        for i, (label, overrides) in enumerate(modes):
+            alias = f"bench_connections_{i}"
+            wrapper = make_wrapper(alias, **overrides)
+            try:
+                simulate_request(wrapper)  # premier accès hors mesure
+                stats = summarize(timed(lambda n: simulate_request(wrapper), options["iterations"]))
+            finally:
+                wrapper.close()
+                if overrides.get("pooled"):
+                    get_pool(alias).close_all()
+            self.stdout.write(
+                f"{label:>28} : {stats['ops/s']:9.0f} req/s, p50 {stats['p50']:.3f} ms, "
+                f"p95 {stats['p95']:.3f} ms, p99 {stats['p99']:.3f} ms"
+            )
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from base.benchmarks import summarize, timed
+from base.models import MenuItem
+from customer.api.serializers import MenuItemSerializer
+
+
+class LegacyMenuItemSerializer(MenuItemSerializer):
+    """Ancienne version : build_absolute_uri pour chaque image et chaque miniature."""
+
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        request = self.context.get("request")
+        if request:
+            return request.build_absolute_uri(obj.image.url)
+        return f"{settings.BACKEND_DOMAIN}{obj.image.url}"
+
+    def get_image_srcset(self, obj):
+        request = self.context["request"]
+        return {
+            fmt: ", ".join(
+                f"{request.build_absolute_uri(obj.image.storage.url(name))} {width}w"
+                for width, name in names.items()
+            )
+            for fmt, names in obj.thumbnails["image"]["variants"].items()
+        }
+
+
+def build_items(count, widths=(320, 640, 1024)):
+    """Articles en mémoire (sans base) avec image et miniatures WebP/JPEG."""
+    items = []
+    for i in range(count):
+        image = f"menu_items/plat-{i}.jpg"
+        items.append(MenuItem(
+            id=i + 1,
+            name=f"Plat {i}",
+            description="Plat du jour",
+            price=Decimal("12.50"),
+            image=image,
+            thumbnails={"image": {
+                "source": image,
+                "variants": {
+                    fmt: {str(w): f"thumbs/menu_items/{i:032d}-{w}.{fmt}" for w in widths}
+                    for fmt in ("webp", "jpeg")
+                },
+            }},
+        ))
+    return items
+
+
+class Command(BaseCommand):
+    help = "Compare la sérialisation d'un menu avec build_absolute_uri et avec MediaURLResolver"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=300)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        items = build_items(options["items"])
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS[0] != "*" else "demo.openfood.test"
+        factory = RequestFactory()
+
+        results = {}
+        for label, serializer in (
+            ("build_absolute_uri", LegacyMenuItemSerializer),
+            ("MediaURLResolver", MenuItemSerializer),
+        ):
+            def run(i):
+                # Nouvelle requête à chaque itération : pas de cache d'une requête à l'autre
+                request = factory.get("/api/customer/menu/", HTTP_HOST=host)
+                return serializer(items, many=True, context={"request": request}).data
+
+            results[label] = run(0)
+            stats = summarize(timed(run, options["iterations"]))
+            self.stdout.write(
+                f"{label:>18} : {options['items']} articles, "
+                f"p50 {stats['p50']:7.2f} ms, p95 {stats['p95']:7.2f} ms, p99 {stats['p99']:7.2f} ms"
+            )
+
+        if results["build_absolute_uri"] != results["MediaURLResolver"]:
+            self.stderr.write("Attention : les deux sérialisations diffèrent.")
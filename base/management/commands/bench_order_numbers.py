@@ -0,0 +1,64 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+from base.benchmarks import create_owner, create_restaurants
+from base.models import Order
+from base.order_numbers import allocator
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée des commandes en parallèle (threads) dans un restaurant temporaire et "
+        "vérifie qu'aucun numéro de commande n'est attribué deux fois"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100_000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--block-size", type=int, nargs="*", default=[1, 50])
+        parser.add_argument("--batch", type=int, default=100, help="Commandes par transaction")
+
+    def handle(self, *args, **options):
+        default = connections[DEFAULT_DB_ALIAS]
+        if default.vendor == "sqlite" and default.is_in_memory_db():
+            raise CommandError("Base SQLite en mémoire : utiliser un fichier pour ce benchmark")
+        per_thread = options["orders"] // options["threads"]
+
+        owner = create_owner()
+        try:
+            for block_size in options["block_size"]:
+                restaurant = create_restaurants(1, owner=owner, prefix=f"bench-num-{uuid.uuid4().hex[:6]}")[0]
+
+                def worker(_):
+                    try:
+                        for start in range(0, per_thread, options["batch"]):
+                            with transaction.atomic():
+                                for _ in range(min(options["batch"], per_thread - start)):
+                                    Order.objects.create(restaurant=restaurant)
+                    finally:
+                        connections.close_all()
+
+                allocator.block_size = block_size
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                    list(pool.map(worker, range(options["threads"])))
+                elapsed = time.perf_counter() - start
+
+                orders = Order.objects.filter(restaurant=restaurant)
+                duplicates = (
+                    orders.values("order_number").annotate(n=Count("id")).filter(n__gt=1).count()
+                )
+                self.stdout.write(
+                    f"bloc de {block_size:>3} : {orders.count()} commandes, "
+                    f"{orders.count() / elapsed:8.0f} commandes/s, {duplicates} doublon(s)"
+                )
+                restaurant.delete()
+        finally:
+            allocator.block_size = None
+            allocator.reset()
+            owner.delete()
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from base.models import Restaurant, Table
+
+
+class Command(BaseCommand):
+    help = "Supprime les fichiers QR code qui ne sont plus référencés par aucun restaurant ni aucune table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Affiche les fichiers orphelins sans les supprimer",
+        )
+
+    def handle(self, *args, **options):
+        removed = 0
+        for model in (Restaurant, Table):
+            field = model._meta.get_field("qr_code")
+            storage = field.storage
+            directory = field.upload_to.rstrip("/")
+
+            referenced = set(
+                model.objects.exclude(qr_code="")
+                .exclude(qr_code__isnull=True)
+                .values_list("qr_code", flat=True)
+            )
+
+            try:
+                _, files = storage.listdir(directory)
+            except FileNotFoundError:
+                continue
+
+            for filename in files:
+                name = f"{directory}/{filename}"
+                if name in referenced:
+                    continue
+                removed += 1
+                if options["dry_run"]:
+                    self.stdout.write(f"[dry-run] {name}")
+                else:
+                    storage.delete(name)
+                    self.stdout.write(f"✘ {name}")
+
+        verb = "à supprimer" if options["dry_run"] else "supprimé(s)"
+        self.stdout.write(self.style.SUCCESS(f"{removed} fichier(s) orphelin(s) {verb}"))
@@ -0,0 +1,117 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from base.benchmarks import (
+    create_menu, create_orders, create_owner, create_restaurants, create_tables,
+    isolated_database,
+)
+from base.models import Table
+from customer import menu_cache
+from customer.tenants import tenant_cache
+
+# Tables volumineuses : un parcours complet y est une régression
+WATCHED_TABLES = {
+    "base_order", "base_orderitem", "base_menuitem", "base_category",
+    "base_table", "base_restaurant", "base_dailyorderrollup",
+}
+
+
+def full_scans(plan, vendor):
+    """Tables parcourues intégralement d'après le plan d'exécution."""
+    if vendor == "sqlite":
+        # "SCAN base_order" (sans index) ; "SEARCH ... USING INDEX" est correct
+        found = re.findall(r"^SCAN (\w+)(?! USING (?:COVERING )?INDEX)", plan, re.MULTILINE)
+    elif vendor == "mysql":
+        found = []
+        for match in re.finditer(r'"table_name": "(\w+)".*?"access_type": "(\w+)"', plan, re.DOTALL):
+            if match.group(2) == "ALL":
+                found.append(match.group(1))
+    else:
+        found = re.findall(r"Seq Scan on (\w+)", plan)
+    return sorted(set(found) & WATCHED_TABLES)
+
+
+def explain(sql):
+    prefix = connection.ops.explain_query_prefix(
+        format="JSON" if connection.vendor == "mysql" else None
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}")
+        rows = cursor.fetchall()
+    if connection.vendor == "sqlite":
+        return "\n".join(row[-1] for row in rows)
+    if connection.vendor == "mysql":
+        return json.dumps(json.loads(rows[0][0]), indent=1)
+    return "\n".join(row[0] for row in rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute EXPLAIN sur les requêtes du tableau de bord, du menu client et de la "
+        "liste des commandes (base générée) et signale les parcours complets de table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=100_000)
+        parser.add_argument("--items", type=int, default=20, help="Articles par catégorie")
+        parser.add_argument("--tables", type=int, default=20, help="Tables par restaurant")
+        parser.add_argument("--verbose-plans", action="store_true", help="Affiche chaque plan")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            owner = create_owner()
+            restaurants = create_restaurants(options["restaurants"], owner=create_owner())
+            restaurants += create_restaurants(1, owner=owner, prefix="audit")
+            create_menu(restaurants, items_per_category=options["items"])
+            create_tables(restaurants, options["tables"])
+            create_orders(restaurants, options["orders"])
+            with connection.cursor() as cursor:
+                # Statistiques à jour : plans représentatifs d'une base de production
+                cursor.execute("ANALYZE")
+
+            restaurant = restaurants[-1]
+            table = Table.objects.filter(restaurant=restaurant, is_active=True).first()
+            client = Client(HTTP_HOST=f"{restaurant.subdomain}.localhost")
+            client.force_login(owner)
+
+            pages = {
+                "tableau de bord": "/dashboard/",
+                "liste des commandes": "/orders/",
+                "commandes filtrées": "/orders/?status=pending",
+                "menu client (API)": f"/api/customer/menu/{table.token}/",
+                "menu client": f"/t/{table.token}/",
+            }
+            problems = []
+            for label, url in pages.items():
+                # Premier affichage : nouvelle version du menu (caches privés,
+                # voir isolated_database) et tenant à résoudre
+                menu_cache.bump_version(restaurant.id)
+                tenant_cache.invalidate(restaurant.id)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"{label} ({url}) : HTTP {response.status_code}")
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{label} — {len(queries)} requête(s)"))
+                for query in queries:
+                    sql = query["sql"]
+                    if not sql.lstrip().upper().startswith("SELECT"):
+                        continue
+                    plan = explain(sql)
+                    scans = full_scans(plan, connection.vendor)
+                    status = self.style.ERROR("PARCOURS COMPLET " + ", ".join(scans)) if scans else "ok"
+                    self.stdout.write(f"  [{status}] {sql[:110]}")
+                    if options["verbose_plans"] or scans:
+                        self.stdout.write("      " + plan.replace("\n", "\n      "))
+                    if scans:
+                        problems.append((label, sql))
+
+        if problems:
+            raise CommandError(f"{len(problems)} requête(s) avec parcours complet de table")
+        self.stdout.write(self.style.SUCCESS("Aucun parcours complet sur les tables surveillées."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import slugify
+
+from base.benchmarks import generate_dataset
+from base.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données multi-restaurants réaliste (restaurants, menus avec "
+        "images, tables, historique de commandes) dans la base configurée"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=1000)
+        parser.add_argument("--tables", type=int, default=20, help="Tables par restaurant")
+        parser.add_argument("--categories", type=int, default=5, help="Catégories par restaurant")
+        parser.add_argument("--items", type=int, default=20, help="Articles par catégorie")
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=365, help="Profondeur de l'historique")
+        parser.add_argument("--max-lines", type=int, default=3, help="Lignes max. par commande")
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=20,
+            help="Images distinctes partagées entre les articles (0 : sans image)",
+        )
+        parser.add_argument("--prefix", default="loadtest", help="Préfixe des slugs / sous-domaines")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        prefix = slugify(options["prefix"])
+        if Restaurant.objects.filter(slug__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Des restaurants '{prefix}-*' existent déjà : choisissez un autre --prefix."
+            )
+
+        restaurants = generate_dataset(
+            restaurants=options["restaurants"],
+            tables=options["tables"],
+            categories=options["categories"],
+            items=options["items"],
+            orders=options["orders"],
+            days=options["days"],
+            max_lines=options["max_lines"],
+            images=options["images"],
+            prefix=prefix,
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(restaurants)} restaurants générés ({prefix}-0 à {prefix}-{len(restaurants) - 1})."
+        ))
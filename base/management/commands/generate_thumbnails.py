@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from base.models import Category, MenuItem, RestaurantCustomization
+from base.tasks import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures WebP/JPEG manquantes ou périmées des images existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            type=int,
+            nargs="*",
+            help="Identifiants des restaurants à traiter (tous par défaut)",
+        )
+        parser.add_argument("--force", action="store_true", help="Régénère toutes les miniatures")
+
+    def handle(self, *args, **options):
+        done = 0
+        for model in (MenuItem, Category, RestaurantCustomization):
+            queryset = model.objects.all()
+            if options["restaurant"]:
+                queryset = queryset.filter(restaurant_id__in=options["restaurant"])
+            if options["force"]:
+                queryset.update(thumbnails={})
+
+            for instance in queryset.only("pk", "restaurant_id", "thumbnails", *model.THUMBNAIL_FIELDS).iterator():
+                if instance.thumbnails_outdated():
+                    done += len(generate_thumbnails(model._meta.label, instance.pk))
+        self.stdout.write(self.style.SUCCESS(f"{done} image(s) traitée(s)."))
@@ -0,0 +1,112 @@
+import io
+import random
+import time
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from base.benchmarks import generate_dataset, isolated_database, percentile
+from base.models import MenuItem, Table
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue les parcours scan QR, ajout au panier, commande et tableau de bord via le "
+        "client de test et affiche p50/p95/p99 et nombre de requêtes SQL par endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=200)
+        parser.add_argument("--tables", type=int, default=20, help="Tables par restaurant")
+        parser.add_argument("--categories", type=int, default=5)
+        parser.add_argument("--items", type=int, default=20, help="Articles par catégorie")
+        parser.add_argument("--orders", type=int, default=50_000)
+        parser.add_argument("--guests", type=int, default=200, help="Parcours clients rejoués")
+        parser.add_argument("--cart-adds", type=int, default=3, help="Ajouts au panier par client")
+        parser.add_argument("--dashboards", type=int, default=100, help="Affichages du tableau de bord")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.samples = {}
+
+        with isolated_database():
+            restaurants = generate_dataset(
+                restaurants=options["restaurants"],
+                tables=options["tables"],
+                categories=options["categories"],
+                items=options["items"],
+                orders=options["orders"],
+                seed=options["seed"],
+                stdout=self.stdout,
+            )
+            tables, menus = {}, {}
+            for restaurant_id, token in Table.objects.filter(is_active=True).values_list(
+                "restaurant_id", "token"
+            ):
+                tables.setdefault(restaurant_id, []).append(token)
+            for restaurant_id, item_id in MenuItem.objects.filter(is_available=True).values_list(
+                "restaurant_id", "id"
+            ):
+                menus.setdefault(restaurant_id, []).append(item_id)
+
+            # Trafic réaliste : quelques restaurants concentrent les scans
+            weights = [1 / (rank + 1) for rank in range(len(restaurants))]
+
+            self.stdout.write("Parcours en cours...")
+            # Les vues client écrivent des traces de débogage sur stdout
+            with redirect_stdout(io.StringIO()):
+                for _ in range(options["guests"]):
+                    restaurant = rng.choices(restaurants, weights)[0]
+                    self.guest_flow(
+                        restaurant,
+                        rng.choice(tables[restaurant.id]),
+                        rng.sample(menus[restaurant.id], options["cart_adds"]),
+                    )
+                owners = {}
+                for _ in range(options["dashboards"]):
+                    restaurant = rng.choices(restaurants, weights)[0]
+                    if restaurant.id not in owners:
+                        owners[restaurant.id] = Client()
+                        owners[restaurant.id].force_login(restaurant.owner)
+                    self.request("tableau de bord", owners[restaurant.id], "get", "/dashboard/")
+
+        self.report()
+
+    def guest_flow(self, restaurant, token, item_ids):
+        client = Client(HTTP_HOST=f"{restaurant.subdomain}.localhost")
+        self.request("scan QR (menu HTML)", client, "get", f"/t/{token}/")
+        self.request("menu (API)", client, "get", f"/api/customer/menu/{token}/")
+        for item_id in item_ids:
+            self.request(
+                "ajout au panier", client, "post", f"/t/{token}/cart/",
+                {"action": "add", "item_id": item_id}, content_type="application/json",
+            )
+        self.request("commande (checkout)", client, "post", f"/t/{token}/checkout/", expect=302)
+
+    def request(self, endpoint, client, method, url, data=None, expect=200, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data, **extra)
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != expect:
+            raise RuntimeError(f"{endpoint} {url} : HTTP {response.status_code}")
+        self.samples.setdefault(endpoint, []).append((elapsed, len(queries)))
+
+    def report(self):
+        self.stdout.write(
+            f"\n{'endpoint':<22} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'req. moy':>9} {'req. max':>9}"
+        )
+        for endpoint, samples in self.samples.items():
+            latencies = [latency for latency, _ in samples]
+            queries = [count for _, count in samples]
+            self.stdout.write(
+                f"{endpoint:<22} {len(samples):>6} "
+                f"{percentile(latencies, 50):>9.2f} {percentile(latencies, 95):>9.2f} "
+                f"{percentile(latencies, 99):>9.2f} "
+                f"{sum(queries) / len(queries):>9.1f} {max(queries):>9}"
+            )
@@ -0,0 +1,81 @@
+"""
+URLs absolues des fichiers média (images du menu, logos, miniatures).
+
+L'origine est calculée une fois par requête : settings.MEDIA_ORIGIN (CDN)
+si défini, sinon le domaine de la requête, sinon settings.BACKEND_DOMAIN.
+Le résolveur garde les URLs déjà calculées par chemin de fichier et, pour
+le stockage disque, le préfixe absolu de MEDIA_URL : on évite ainsi
+build_absolute_uri et storage.url (validation de l'hôte, urljoin) pour
+chaque image et chaque miniature de chaque article sérialisé.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+
+
+def is_absolute(url):
+    return url.startswith(("http://", "https://", "//"))
+
+
+class MediaURLResolver:
+
+    def __init__(self, origin):
+        self.origin = origin.rstrip("/")
+        self._urls = {}
+        self._prefixes = {}
+
+    @classmethod
+    def for_request(cls, request=None):
+        origin = getattr(settings, "MEDIA_ORIGIN", "")
+        if not origin and request is not None:
+            origin = f"{request.scheme}://{request.get_host()}"
+        return cls(origin or settings.BACKEND_DOMAIN)
+
+    def url(self, name, storage):
+        """URL absolue du fichier `name` du stockage `storage` (None si vide)."""
+        if not name:
+            return None
+        try:
+            return self._urls[name]
+        except KeyError:
+            pass
+        prefix = self._prefix(storage)
+        if prefix:
+            # Équivalent de FileSystemStorage.url, sans urljoin
+            url = prefix + filepath_to_uri(name).lstrip("/")
+        else:
+            url = storage.url(name)
+            # Stockage distant (S3...) : l'URL est déjà absolue
+            if not is_absolute(url):
+                url = self.origin + url
+        self._urls[name] = url
+        return url
+
+    def _prefix(self, storage):
+        try:
+            return self._prefixes[storage]
+        except KeyError:
+            pass
+        prefix = None
+        if isinstance(storage, FileSystemStorage) and storage.base_url:
+            base_url = storage.base_url
+            prefix = base_url if is_absolute(base_url) else self.origin + base_url
+        self._prefixes[storage] = prefix
+        return prefix
+
+    def file_url(self, field_file):
+        if not field_file:
+            return None
+        return self.url(field_file.name, field_file.storage)
+
+
+def get_resolver(context):
+    """Résolveur partagé par tous les serializers d'un même rendu (contexte DRF)."""
+    resolver = context.get("media_urls")
+    if resolver is None:
+        request = context.get("request")
+        resolver = getattr(request, "_media_urls", None) or MediaURLResolver.for_request(request)
+        if request is not None:
+            request._media_urls = resolver
+        context["media_urls"] = resolver
+    return resolver
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+def mark_existing_qr_ready(apps, schema_editor):
+    for model_name in ('Restaurant', 'Table'):
+        model = apps.get_model('base', model_name)
+        model.objects.exclude(qr_code='').exclude(qr_code__isnull=True).update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_restaurantcustomization_cover_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'En cours de génération'), ('ready', 'Prêt')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'En cours de génération'), ('ready', 'Prêt')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_qr_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('base', 'Order')
+    DailyOrderRollup = apps.get_model('base', 'DailyOrderRollup')
+    rows = (
+        Order.objects.annotate(day=TruncDate('created_at'))
+        .values('restaurant_id', 'day', 'order_type', 'status')
+        .annotate(count=Count('id'), revenue=Sum('total'))
+        .order_by()
+    )
+    DailyOrderRollup.objects.bulk_create(
+        (
+            DailyOrderRollup(
+                restaurant_id=row['restaurant_id'],
+                day=row['day'],
+                order_type=row['order_type'],
+                status=row['status'],
+                orders=row['count'],
+                revenue=row['revenue'] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_qr_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_type', models.CharField(choices=[('dine_in', 'Sur place'), ('takeaway', 'À emporter'), ('delivery', 'Livraison')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('confirmed', 'Confirmée'), ('preparing', 'En préparation'), ('ready', 'Prête'), ('delivered', 'Livrée'), ('cancelled', 'Annulée')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_rollups', to='base.restaurant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'day', 'order_type', 'status'), name='unique_daily_order_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
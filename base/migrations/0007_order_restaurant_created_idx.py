@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_dailyorderrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'created_at'], name='order_restaurant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_order_restaurant_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['restaurant', 'is_active', 'order'], name='category_rest_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['restaurant', 'is_available', 'order'], name='menuitem_rest_avail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', 'is_available', 'order'], name='menuitem_cat_avail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'status', 'created_at'], name='order_rest_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='table',
+            index=models.Index(fields=['restaurant', 'is_active'], name='table_rest_active_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'status', 'updated_at'], name='order_rest_status_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 10:26
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='tax_rate',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.10'), max_digits=5),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 11:05
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def seed_sequences(apps, schema_editor):
+    # Restaurants qui ont déjà des commandes (anciens numéros "ORD-<hex>") :
+    # la séquence repart après leur nombre de commandes, pas de ORD-000001
+    Order = apps.get_model("base", "Order")
+    OrderNumberSequence = apps.get_model("base", "OrderNumberSequence")
+    seeded = set(OrderNumberSequence.objects.values_list("restaurant_id", flat=True))
+    OrderNumberSequence.objects.bulk_create(
+        [
+            OrderNumberSequence(restaurant_id=row["restaurant_id"], last_value=row["orders"])
+            for row in Order.objects.values("restaurant_id").annotate(orders=Count("pk"))
+            if row["restaurant_id"] not in seeded
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_restaurant_tax_rate'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_seed_order_number_sequences'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='restaurant',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'En cours de génération'), ('ready', 'Prêt'), ('failed', 'Échec')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'En cours de génération'), ('ready', 'Prêt'), ('failed', 'Échec')], default='pending', max_length=10),
+        ),
+    ]
@@ -1,12 +1,13 @@
 # models.py
 # from tkinter import N
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils.text import slugify
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.core.files.base import ContentFile
 from decimal import Decimal
+from base.qrcodes import qr_filename, render_qr
+from base.thumbnails import ThumbnailsMixin
 
 
 from accounts.models import User
@@ -43,7 +44,50 @@ class SubscriptionPlan(models.Model):
 
 
 
-class Restaurant(models.Model):
+QR_STATUS_CHOICES = [
+    ('pending', 'En cours de génération'),
+    ('ready', 'Prêt'),
+    ('failed', 'Échec'),
+]
+
+
+class QRCodeMixin:
+    """
+    QR code stocké par contenu (voir base/qrcodes.py) : si un fichier
+    existe déjà pour la même url / couleurs / format, il est réutilisé.
+    """
+    qr_fill_color = "black"
+
+    def get_qr_url(self):
+        raise NotImplementedError
+
+    def get_qr_spec(self):
+        return (
+            self.get_qr_url(),
+            self.qr_fill_color,
+            "white",
+            10,
+            5,
+            getattr(settings, "QR_FORMAT", "png"),
+        )
+
+    def get_qr_name(self, spec=None):
+        return self.qr_code.field.upload_to + qr_filename(*(spec or self.get_qr_spec()))
+
+    def assign_qr_code(self, image=None):
+        # `image` peut être pré-rendue (génération en lot dans un pool de processus)
+        spec = self.get_qr_spec()
+        name = self.get_qr_name(spec)
+        storage = self.qr_code.storage
+        if not storage.exists(name):
+            if image is None:
+                image = render_qr(*spec)
+            name = storage.save(name, ContentFile(image))
+        self.qr_code.name = name
+        self.qr_status = 'ready'
+
+
+class Restaurant(QRCodeMixin, models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='restaurants')
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
@@ -71,11 +115,15 @@ class Restaurant(models.Model):
     
     # QR Code
     qr_code = models.ImageField(upload_to='qrcodes/', blank=True)
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default='pending')
     
     # Customization
     primary_color = models.CharField(max_length=7, default='#FF6B6B')
     secondary_color = models.CharField(max_length=7, default='#4ECDC4')
     
+    # Taxe appliquée aux commandes (0.10 = 10 %)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=4, default=Decimal("0.10"))
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -93,39 +141,45 @@ class Restaurant(models.Model):
             self.subdomain = self.slug
         super().save(*args, **kwargs)
         
-        # Générer QR Code
+        # Générer QR Code (en tâche de fond, voir base/tasks.py)
         if not self.qr_code:
-            self.generate_qr_code()
+            from base.tasks import generate_restaurant_qr, run_in_background
+            run_in_background(generate_restaurant_qr, self.pk)
     
-    def generate_qr_code(self):
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        url = f"https://{self.subdomain}.votredomaine.com"
-        qr.add_data(url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color=self.primary_color, back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        filename = f'qr_{self.slug}.png'
-        self.qr_code.save(filename, File(buffer), save=False)
-        super().save(update_fields=['qr_code'])
+    @property
+    def qr_fill_color(self):
+        return self.primary_color
+
+    def get_qr_url(self):
+        return f"https://{self.subdomain}.votredomaine.com"
+
+    def generate_qr_code(self, image=None):
+        self.assign_qr_code(image)
+        super().save(update_fields=['qr_code', 'qr_status'])
     
     def __str__(self):
         return self.name
 
 
-class Category(models.Model):
+class Category(ThumbnailsMixin, models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
     slug = models.SlugField(blank=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+
+    THUMBNAIL_FIELDS = ('image',)
     
     class Meta:
         ordering = ['order', 'name']
         verbose_name_plural = 'Categories'
+        indexes = [
+            # Menu client : catégories actives d'un restaurant, dans l'ordre
+            models.Index(fields=['restaurant', 'is_active', 'order'], name='category_rest_active_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -135,7 +189,7 @@ class Category(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
 
-class MenuItem(models.Model):
+class MenuItem(ThumbnailsMixin, models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_items')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='items')
     
@@ -149,6 +203,8 @@ class MenuItem(models.Model):
     
     # Images
     image = models.ImageField(upload_to='menu_items/', blank=True)
+    # Miniatures WebP/JPEG générées en arrière-plan (base/thumbnails.py)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     
     # Info
     ingredients = models.TextField(blank=True)
@@ -164,9 +220,17 @@ class MenuItem(models.Model):
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    THUMBNAIL_FIELDS = ('image',)
     
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            # Menu client, panier, commandes : articles disponibles d'un restaurant
+            models.Index(fields=['restaurant', 'is_available', 'order'], name='menuitem_rest_avail_idx'),
+            # Préchargement des articles par catégorie (Prefetch "items")
+            models.Index(fields=['category', 'is_available', 'order'], name='menuitem_cat_avail_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -177,11 +241,9 @@ class MenuItem(models.Model):
         return f"{self.name} - {self.price}€"
 
 
-from django.conf import settings
 
 
-
-class Table(models.Model):
+class Table(QRCodeMixin, models.Model):
     restaurant = models.ForeignKey(
         Restaurant,
         on_delete=models.CASCADE,
@@ -194,6 +256,7 @@ class Table(models.Model):
         blank=True,
         null=True
     )
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default='pending')
     is_active = models.BooleanField(default=True)
     token = models.UUIDField(
         default=uuid.uuid4,
@@ -203,36 +266,28 @@ class Table(models.Model):
 
     class Meta:
         unique_together = ("restaurant", "number")
+        indexes = [
+            # Tableau de bord et résolution des tables actives
+            models.Index(fields=["restaurant", "is_active"], name="table_rest_active_idx"),
+        ]
 
-    def generate_qr_code(self):
-        # Si déjà généré, ne rien faire
-        # if self.qr_code:
-        #     return
-
+    def get_qr_url(self):
         subdomain = self.restaurant.subdomain or slugify(self.restaurant.name)
-        url = f"https://{subdomain}.{settings.FRONTEND_BASE_URL}/t/{self.token}"
-
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(url)
-        qr.make(fit=True)
+        return f"https://{subdomain}.{settings.FRONTEND_BASE_URL}/t/{self.token}"
 
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-
-        filename = f"table_{self.restaurant.slug}_{self.number}.png"
-        self.qr_code.save(filename, File(buffer), save=False)
+    def generate_qr_code(self, image=None):
+        self.assign_qr_code(image)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
 
-        # Générer QR Code avant le save si la table est nouvelle
-        if is_new and not self.qr_code:
-            self.generate_qr_code()
-
         super().save(*args, **kwargs)
 
+        # Nouvelle table : QR Code généré en tâche de fond (base/tasks.py)
+        if is_new and not self.qr_code:
+            from base.tasks import generate_table_qr, run_in_background
+            run_in_background(generate_table_qr, self.pk)
+
     def __str__(self):
         return f"Table {self.number} - {self.restaurant.name}"
 
@@ -256,7 +311,8 @@ class Order(models.Model):
     
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='orders')
     table = models.ForeignKey(Table, on_delete=models.SET_NULL, null=True, blank=True)
-    order_number = models.CharField(max_length=20, unique=True, blank=True)
+    # Unique par restaurant, attribué par base/order_numbers.py
+    order_number = models.CharField(max_length=20, blank=True)
     
     # Client info
     customer_name = models.CharField(max_length=200, blank=True)
@@ -276,20 +332,53 @@ class Order(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Liste des commandes (pagination par curseur sur created_at, id)
+            models.Index(fields=["restaurant", "created_at"], name="order_restaurant_created_idx"),
+            # Liste filtrée par statut
+            models.Index(fields=["restaurant", "status", "created_at"], name="order_rest_status_created_idx"),
+            # Écran cuisine : commandes en cours et flux "since" (base/kitchen.py)
+            models.Index(fields=["restaurant", "status", "updated_at"], name="order_rest_status_updated_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["restaurant", "order_number"], name="order_restaurant_number_uniq"),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+            from base.order_numbers import next_order_number
+
+            self.order_number = next_order_number(self.restaurant_id)
         super().save(*args, **kwargs)
     
     def calculate_total(self):
-        self.subtotal = sum(
-            (item.get_total() for item in self.items.all()),
-            Decimal("0.00")
-        )
-        self.tax = self.subtotal * Decimal("0.10")
-        self.total = self.subtotal + self.tax
-        self.save(update_fields=["subtotal", "tax", "total"])
+        """
+        Recalcule et enregistre les totaux à partir des lignes (une requête
+        d'agrégat). La ligne de la commande est verrouillée pendant le
+        calcul : deux modifications concurrentes des lignes recalculent
+        l'une après l'autre, et la dernière voit les lignes de l'autre.
+        """
+        from base.utils import compute_totals
+
+        tax_rate = self.restaurant.tax_rate
+        with transaction.atomic():
+            # Instance relue sous verrou : les agrégats (base/rollups.py)
+            # partent du total réellement en base, pas de celui de self
+            order = Order.objects.select_for_update().get(pk=self.pk)
+            order.subtotal = self.items.aggregate(
+                subtotal=models.Sum(
+                    models.F("price") * models.F("quantity"),
+                    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                )
+            )["subtotal"] or Decimal("0.00")
+            order.tax, order.total = compute_totals(order.subtotal, tax_rate)
+            order.save(update_fields=["subtotal", "tax", "total", "updated_at"])
+
+        self.subtotal, self.tax, self.total = order.subtotal, order.tax, order.total
+        self.updated_at = order.updated_at
+        self._rollup_state = order._rollup_state
 
         
     def __str__(self):
@@ -314,6 +403,42 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.menu_item.name} x{self.quantity}"
 
+
+class OrderNumberSequence(models.Model):
+    """Dernier numéro de commande attribué par restaurant (base/order_numbers.py)."""
+    restaurant = models.OneToOneField(
+        Restaurant, on_delete=models.CASCADE, primary_key=True, related_name='order_number_sequence'
+    )
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.restaurant_id} : {self.last_value}"
+
+
+class DailyOrderRollup(models.Model):
+    """
+    Agrégat des commandes par restaurant / jour / type / statut, tenu à jour
+    à chaque création ou changement de commande (voir base/rollups.py).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='order_rollups')
+    day = models.DateField()
+    order_type = models.CharField(max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "day", "order_type", "status"],
+                name="unique_daily_order_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} {self.day} {self.order_type}/{self.status} : {self.orders}"
+
 class Payment(models.Model):
     PAYMENT_METHOD = [
         ('cash', 'Espèces'),
@@ -339,7 +464,7 @@ class Payment(models.Model):
         return f"Payment {self.order.order_number} - {self.amount}FCFA"
     
     
-class RestaurantCustomization(models.Model):
+class RestaurantCustomization(ThumbnailsMixin, models.Model):
     FONT_CHOICES = [
         ('inter', 'Inter'),
         ('poppins', 'Poppins'),
@@ -376,6 +501,9 @@ class RestaurantCustomization(models.Model):
         blank=True,
         null=True
     )
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+
+    THUMBNAIL_FIELDS = ("logo", "cover_image")
 
     # 🔤 Typographie
     font_family = models.CharField(
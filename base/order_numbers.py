@@ -0,0 +1,111 @@
+"""
+Numéros de commande : séquence par restaurant (ORD-000001, ORD-000002...).
+
+Le dernier numéro attribué est gardé dans OrderNumberSequence (une ligne
+par restaurant), incrémentée par un UPDATE atomique : pas de collision
+possible, donc pas d'IntegrityError ni de nouvel essai en pleine
+commande, et des numéros croissants (bonne localité de l'index unique
+(restaurant, order_number)).
+
+La réservation se fait dans la transaction de la commande : la ligne du
+restaurant reste verrouillée jusqu'à son commit. Avec une plage de 1,
+toutes les commandes d'un restaurant attendraient donc les unes après
+les autres. Par défaut (ORDER_NUMBER_BLOCK_SIZE = 20), chaque processus
+réserve une plage et la distribue en mémoire : la ligne n'est écrite et
+verrouillée qu'une fois toutes les 20 commandes. Une plage réservée dans
+une transaction n'est réutilisée qu'après son commit (si la transaction
+est annulée, la réservation l'est aussi et un autre processus peut la
+recevoir).
+
+Les numéros sont uniques et croissants dans un processus, mais pas
+consécutifs : ceux de plusieurs workers s'entrelacent, une plage non
+épuisée au redémarrage d'un worker laisse un trou (au plus taille - 1
+numéros) et une commande annulée après avoir reçu un numéro d'une plage
+déjà validée le perd. ORDER_NUMBER_BLOCK_SIZE = 1 donne des numéros
+consécutifs, au prix de cette attente.
+
+Les commandes antérieures gardent leur ancien numéro "ORD-" + 8 chiffres
+hexadécimaux ; la migration 0013 fait repartir la séquence de chaque
+restaurant après son nombre de commandes existantes. Les deux formats
+cohabitent sans collision tant que la séquence reste sous 10 000 000
+(7 chiffres au plus, contre 8 caractères pour les anciens numéros).
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from base.models import OrderNumberSequence
+
+NUMBER_FORMAT = "ORD-{:06d}"
+
+
+def reserve_numbers(restaurant_id, count):
+    """Réserve `count` numéros ; retourne le dernier de la plage."""
+    sequences = OrderNumberSequence.objects.filter(restaurant_id=restaurant_id)
+    with transaction.atomic():
+        if not sequences.update(last_value=F("last_value") + count):
+            try:
+                with transaction.atomic():
+                    OrderNumberSequence.objects.create(restaurant_id=restaurant_id, last_value=count)
+                return count
+            except IntegrityError:
+                # Ligne créée entre-temps par une autre requête
+                sequences.update(last_value=F("last_value") + count)
+        return sequences.values_list("last_value", flat=True).get()
+
+
+class _Block:
+
+    def __init__(self, first, last):
+        self.next = first
+        self.last = last
+        self.committed = False
+
+    def commit(self):
+        self.committed = True
+
+
+class BlockAllocator:
+    """Distribue les numéros de plages réservées par `reserve(clé, taille)`."""
+
+    def __init__(self, reserve, block_size=None):
+        self.reserve = reserve
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def get_block_size(self):
+        if self.block_size is not None:
+            return self.block_size
+        return max(1, getattr(settings, "ORDER_NUMBER_BLOCK_SIZE", 20))
+
+    def next(self, key):
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None and block.committed and block.next <= block.last:
+                value = block.next
+                block.next += 1
+                return value
+
+        size = self.get_block_size()
+        last = self.reserve(key, size)
+        if size > 1:
+            block = _Block(last - size + 2, last)
+            with self._lock:
+                self._blocks[key] = block
+            # Immédiat hors transaction ; jamais si la transaction est annulée
+            transaction.on_commit(block.commit)
+        return last - size + 1
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+allocator = BlockAllocator(reserve_numbers)
+
+
+def next_order_number(restaurant_id):
+    return NUMBER_FORMAT.format(allocator.next(restaurant_id))
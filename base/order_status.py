@@ -0,0 +1,83 @@
+"""
+Changements de statut des commandes (machine à états).
+
+Une commande avance dans l'ordre de Order.STATUS_CHOICES (en attente ->
+confirmée -> en préparation -> prête -> livrée), en pouvant sauter des
+étapes, ou est annulée tant qu'elle n'est pas terminée. "delivered" et
+"cancelled" sont terminaux.
+
+Les changements sont des UPDATE conditionnels (WHERE status IN <statuts
+de départ autorisés>) qui n'écrivent que status et updated_at : deux
+membres de l'équipe qui touchent la même commande ne s'écrasent plus, et
+plusieurs commandes changent en une seule requête. QuerySet.update
+contourne les signaux : agrégats (base/rollups.py) et évènements temps
+réel (base/events.py) sont mis à jour ici.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from base.events import ORDER_STATUS, publish_order_events
+from base.models import Order
+from base.rollups import apply_delta, order_day
+
+TERMINAL_STATUSES = ["delivered", "cancelled"]
+FLOW = [code for code, _ in Order.STATUS_CHOICES if code != "cancelled"]
+
+TRANSITIONS = {
+    status: [*FLOW[index + 1:], "cancelled"] for index, status in enumerate(FLOW)
+    if status not in TERMINAL_STATUSES
+}
+TRANSITIONS.update({status: [] for status in TERMINAL_STATUSES})
+
+
+def can_transition(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, ())
+
+
+def source_statuses(new_status):
+    """Statuts depuis lesquels `new_status` est autorisé."""
+    return [status for status, targets in TRANSITIONS.items() if new_status in targets]
+
+
+@transaction.atomic
+def transition_orders(orders, new_status, expected=None):
+    """
+    Passe au statut `new_status` les commandes de `orders` qui le
+    permettent (et dont le statut vaut `expected`, si donné). Retourne la
+    liste des ids modifiés ; les autres commandes sont ignorées.
+    """
+    sources = source_statuses(new_status)
+    if expected is not None:
+        sources = [status for status in sources if status == expected]
+    if not sources:
+        return []
+
+    # Verrou sur les lignes concernées : un changement concurrent attend
+    # notre commit puis ne trouve plus le statut de départ attendu
+    rows = list(
+        orders.filter(status__in=sources)
+        .select_for_update()
+        .values_list("pk", "restaurant_id", "created_at", "order_type", "status", "total")
+    )
+    if not rows:
+        return []
+    ids = [row[0] for row in rows]
+    Order.objects.filter(pk__in=ids, status__in=sources).update(
+        status=new_status, updated_at=timezone.now()
+    )
+
+    # Agrégats : une écriture par case quittée et par case rejointe
+    moves = defaultdict(lambda: [0, Decimal("0")])
+    for _, restaurant_id, created_at, order_type, status, total in rows:
+        move = moves[(restaurant_id, order_day(created_at), order_type, status)]
+        move[0] += 1
+        move[1] += total or 0
+    for (restaurant_id, day, order_type, status), (count, revenue) in moves.items():
+        apply_delta(restaurant_id, day, order_type, status, -count, -revenue)
+        apply_delta(restaurant_id, day, order_type, new_status, count, revenue)
+
+    publish_order_events(ids, ORDER_STATUS)
+    return ids
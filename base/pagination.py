@@ -0,0 +1,90 @@
+"""
+Pagination par curseur (keyset) sur (created_at, id).
+
+Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position :
+la base reprend directement après la dernière ligne affichée grâce à
+l'index (restaurant, created_at).
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Retourne (created_at, id) ou None si le curseur est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_page(queryset, after=None, before=None, per_page=25):
+    """
+    Page de `queryset`, du plus récent au plus ancien. `after` : curseur de
+    la dernière ligne de la page précédente ; `before` : curseur de la
+    première ligne de la page suivante (retour en arrière).
+    """
+    position = decode_cursor(before) if before else decode_cursor(after) if after else None
+
+    if before and position:
+        created_at, pk = position
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by("created_at", "pk")[:per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]) if rows else None,
+            previous_cursor=encode_cursor(rows[0]) if rows and has_more else None,
+        )
+
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(queryset.order_by("-created_at", "-pk")[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if rows and has_more else None,
+        previous_cursor=encode_cursor(rows[0]) if rows and position else None,
+    )
@@ -0,0 +1,127 @@
+"""
+Export en lot des QR codes des tables (ZIP ou planche imprimable).
+
+Les réponses sont produites au fil de l'eau (StreamingHttpResponse) : une
+table à la fois, sans jamais garder toutes les images en mémoire. Les
+images déjà stockées sont relues telles quelles ; seules les tables sans
+image passent par Table.generate_qr_code.
+
+Sous ASGI, StreamingHttpResponse consomme un itérateur sync d'un bloc
+(sync_to_async(list)) : streaming_response lui passe un itérateur async
+qui avance le générateur un morceau à la fois.
+"""
+import os
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.html import format_html
+from django.utils.text import slugify
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStream:
+    """Fichier en écriture seule (non seekable) vidé à chaque lecture."""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def __len__(self):
+        return self._size
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks, self._size = [], 0
+        return data
+
+
+def streaming_response(request, chunks, **kwargs):
+    """StreamingHttpResponse au fil de l'eau, sous WSGI comme sous ASGI."""
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter_chunks(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+async def _aiter_chunks(chunks):
+    # thread_sensitive : le curseur (.iterator()) reste sur la connexion de la requête
+    next_chunk = sync_to_async(next)
+    done = object()
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
+
+
+def iter_table_qr(tables):
+    """Itère sur (table, nom du fichier stocké), en générant les QR manquants."""
+    for table in tables:
+        if not table.qr_code or not table.qr_code.storage.exists(table.qr_code.name):
+            table.generate_qr_code()
+            table.save(update_fields=["qr_code", "qr_status"])
+        yield table, table.qr_code.name
+
+
+def stream_qr_zip(tables):
+    buffer = _ZipStream()
+    seen = set()
+    with zipfile.ZipFile(buffer, mode="w") as archive:
+        for table, name in iter_table_qr(tables):
+            base, ext = f"table-{slugify(table.number) or table.pk}", os.path.splitext(name)[1]
+            if base in seen:
+                base = f"{base}-{table.pk}"
+            seen.add(base)
+
+            with table.qr_code.storage.open(name, "rb") as image:
+                data = image.read()
+            # Les PNG sont déjà compressés : inutile de les recompresser
+            compression = zipfile.ZIP_STORED if ext == ".png" else zipfile.ZIP_DEFLATED
+            archive.writestr(base + ext, data, compress_type=compression)
+
+            if len(buffer) >= ZIP_CHUNK_SIZE:
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+SHEET_HEAD = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>QR Codes – {}</title>
+<style>
+  @page {{ size: A4; margin: 12mm; }}
+  body {{ font-family: sans-serif; margin: 0; color: #111827; }}
+  .page {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 8mm; page-break-after: always; }}
+  .page:last-child {{ page-break-after: auto; }}
+  .card {{ border: 1px dashed #d1d5db; padding: 4mm; text-align: center; break-inside: avoid; }}
+  .card img {{ width: 100%; height: auto; }}
+  .card h2 {{ font-size: 14pt; margin: 2mm 0 0; }}
+  .card p {{ font-size: 9pt; margin: 1mm 0 0; color: #6b7280; }}
+  @media screen {{ body {{ padding: 12mm; }} .page {{ margin-bottom: 12mm; }} }}
+</style>
+</head>
+<body>
+"""
+
+SHEET_CARD = """<div class="card"><img src="{}" alt="Table {}"><h2>Table {}</h2><p>{}</p></div>
+"""
+
+
+def stream_qr_sheet(restaurant, tables, per_page=12):
+    """Planche HTML à imprimer (ou enregistrer en PDF depuis le navigateur)."""
+    yield format_html(SHEET_HEAD, restaurant.name)
+    count = 0
+    for table, _ in iter_table_qr(tables):
+        if count % per_page == 0:
+            yield '</div>\n<div class="page">\n' if count else '<div class="page">\n'
+        yield format_html(SHEET_CARD, table.qr_code.url, table.number, table.number, restaurant.name)
+        count += 1
+    yield "</div>\n</body>\n</html>\n" if count else "</body>\n</html>\n"
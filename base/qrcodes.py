@@ -0,0 +1,84 @@
+"""
+Rendu des QR codes.
+
+Ce module n'importe pas Django : les fonctions de rendu peuvent être
+exécutées dans un pool de processus (voir base/tasks.py).
+
+Les images sont adressées par leur contenu : le nom du fichier est un hash
+de (url, couleurs, box_size, border, format). Une même demande réutilise
+donc toujours le même fichier au lieu d'en écrire un nouveau.
+"""
+import hashlib
+from io import BytesIO
+
+import qrcode
+
+FORMATS = ("png", "svg")
+
+
+def qr_digest(url, fill_color="black", back_color="white", box_size=10, border=5, fmt="png"):
+    key = "\x1f".join(str(part) for part in (url, fill_color, back_color, box_size, border, fmt))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def qr_filename(url, fill_color="black", back_color="white", box_size=10, border=5, fmt="png"):
+    return f"{qr_digest(url, fill_color, back_color, box_size, border, fmt)}.{fmt}"
+
+
+def _matrix(url, border):
+    qr = qrcode.QRCode(version=1, border=border)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_qr_png(url, fill_color="black", back_color="white", box_size=10, border=5):
+    """Encode `url` en QR code et retourne l'image PNG (bytes)."""
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color=fill_color, back_color=back_color)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_qr_svg(url, fill_color="black", back_color="white", box_size=10, border=5):
+    """
+    Encode `url` en SVG : un seul <path> tracé au trait, un segment par
+    suite de modules noirs consécutifs sur une ligne. Vectoriel (net à
+    l'impression quelle que soit la taille) et très compressible (gzip).
+    """
+    matrix = _matrix(url, border)
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}.5h{x - start}")
+
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="{back_color}"/>'
+        f'<path stroke="{fill_color}" d="{"".join(path)}"/></svg>'
+    ).encode()
+
+
+def render_qr(url, fill_color="black", back_color="white", box_size=10, border=5, fmt="png"):
+    if fmt == "svg":
+        return render_qr_svg(url, fill_color, back_color, box_size, border)
+    return render_qr_png(url, fill_color, back_color, box_size, border)
+
+
+def render_many(specs):
+    """Rendu d'une liste de specs (arguments de render_qr) ; utilisé par le pool de processus."""
+    return [render_qr(*spec) for spec in specs]
@@ -0,0 +1,152 @@
+"""
+Agrégats journaliers des commandes (DailyOrderRollup).
+
+Chaque commande compte dans une case (restaurant, jour, type, statut). Les
+signaux de base/signals.py déplacent la commande d'une case à l'autre
+quand elle est créée, modifiée ou supprimée ; le tableau de bord ne lit
+plus que ces quelques lignes au lieu de parcourir la table des commandes.
+
+Les écritures qui contournent les signaux (QuerySet.update, bulk_create)
+doivent appeler apply_delta elles-mêmes, ou être suivies de
+`manage.py backfill_order_rollups`.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from base.models import DailyOrderRollup, Order
+
+# Statuts comptés dans le chiffre d'affaires
+REVENUE_STATUSES = ["confirmed", "preparing", "ready", "delivered"]
+
+
+def order_day(created_at):
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def order_state(order):
+    """Case de l'agrégat occupée par la commande (None si non enregistrée)."""
+    values = order.__dict__
+    # __dict__ : ne pas déclencher de requête pour un champ différé
+    if values.get("created_at") is None or values.get("restaurant_id") is None:
+        return None
+    if "status" not in values or "order_type" not in values or "total" not in values:
+        return None
+    return (
+        values["restaurant_id"],
+        order_day(values["created_at"]),
+        values["order_type"],
+        values["status"],
+        Decimal(values["total"] or 0),
+    )
+
+
+def apply_delta(restaurant_id, day, order_type, status, orders, revenue):
+    lookup = dict(restaurant_id=restaurant_id, day=day, order_type=order_type, status=status)
+    updated = DailyOrderRollup.objects.filter(**lookup).update(
+        orders=F("orders") + orders,
+        revenue=F("revenue") + revenue,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            DailyOrderRollup.objects.create(orders=orders, revenue=revenue, **lookup)
+    except IntegrityError:
+        # Ligne créée entre-temps par une autre requête
+        DailyOrderRollup.objects.filter(**lookup).update(
+            orders=F("orders") + orders,
+            revenue=F("revenue") + revenue,
+        )
+
+
+def move_order(old_state, new_state):
+    if old_state == new_state:
+        return
+    if old_state is not None:
+        apply_delta(*old_state[:4], -1, -old_state[4])
+    if new_state is not None:
+        apply_delta(*new_state[:4], 1, new_state[4])
+
+
+# --------------------------
+# Lecture (tableau de bord)
+# --------------------------
+def dashboard_stats(restaurant, today=None, days=7):
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+    rollups = DailyOrderRollup.objects.filter(restaurant=restaurant)
+
+    by_type = {
+        f"type_{code}": Sum("orders", filter=Q(order_type=code), default=0)
+        for code, _ in Order.ORDER_TYPE_CHOICES
+    }
+    totals = rollups.aggregate(
+        total_orders=Sum("orders", default=0),
+        today_orders=Sum("orders", filter=Q(day=today), default=0),
+        total_revenue=Sum("revenue", filter=Q(status__in=REVENUE_STATUSES), default=0),
+        **by_type,
+    )
+
+    orders_by_day = (
+        rollups.filter(day__gte=first_day)
+        .values("day")
+        .annotate(count=Sum("orders"))
+        .filter(count__gt=0)
+        .order_by("day")
+    )
+
+    type_counts = [
+        (code, totals[f"type_{code}"])
+        for code, _ in Order.ORDER_TYPE_CHOICES
+        if totals[f"type_{code}"]
+    ]
+    return {
+        "total_orders": totals["total_orders"],
+        "today_orders": totals["today_orders"],
+        "total_revenue": totals["total_revenue"],
+        "days": [row["day"].strftime("%d/%m") for row in orders_by_day],
+        "orders_count": [row["count"] for row in orders_by_day],
+        "type_labels": [code for code, _ in type_counts],
+        "type_values": [count for _, count in type_counts],
+    }
+
+
+# --------------------------
+# Reconstruction complète
+# --------------------------
+def rebuild_rollups(restaurant_ids=None, batch_size=1000):
+    """Recalcule les agrégats depuis la table des commandes ; retourne le nombre de lignes."""
+    orders = Order.objects.all()
+    rollups = DailyOrderRollup.objects.all()
+    if restaurant_ids:
+        orders = orders.filter(restaurant_id__in=restaurant_ids)
+        rollups = rollups.filter(restaurant_id__in=restaurant_ids)
+
+    rows = (
+        orders.annotate(day=TruncDate("created_at"))
+        .values("restaurant_id", "day", "order_type", "status")
+        .annotate(count=Count("id"), revenue=Sum("total"))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = DailyOrderRollup.objects.bulk_create(
+            (
+                DailyOrderRollup(
+                    restaurant_id=row["restaurant_id"],
+                    day=row["day"],
+                    order_type=row["order_type"],
+                    status=row["status"],
+                    orders=row["count"],
+                    revenue=row["revenue"] or 0,
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=batch_size,
+        )
+    return len(created)
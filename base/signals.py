@@ -0,0 +1,63 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from base.events import ORDER_CREATED, ORDER_STATUS, publish_order_event
+from base.models import Category, MenuItem, Order, RestaurantCustomization
+from base.rollups import move_order, order_state
+from base.tasks import enqueue_thumbnails
+
+
+# --------------------------
+# Agrégats journaliers des commandes
+# --------------------------
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    instance._rollup_state = order_state(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollup(sender, instance, created, **kwargs):
+    new_state = order_state(instance)
+    # Commande chargée avec des champs différés : état précédent inconnu
+    if created or instance._rollup_state is not None:
+        move_order(instance._rollup_state, new_state)
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_rollup(sender, instance, origin=None, **kwargs):
+    # Commande supprimée avec son restaurant (ou son propriétaire) : les
+    # agrégats du restaurant sont supprimés avec lui, ne pas les recréer
+    deleted = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and deleted is not Order:
+        return
+    move_order(instance._rollup_state, None)
+
+
+# --------------------------
+# Évènements temps réel (base/events.py)
+# --------------------------
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._event_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Order)
+def publish_order_events(sender, instance, created, **kwargs):
+    status = instance.__dict__.get("status")
+    if created:
+        publish_order_event(instance, ORDER_CREATED)
+    elif status != instance._event_status:
+        publish_order_event(instance, ORDER_STATUS)
+    instance._event_status = status
+
+
+# --------------------------
+# Miniatures des images (hors requête)
+# --------------------------
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=RestaurantCustomization)
+def schedule_thumbnails(sender, instance, **kwargs):
+    enqueue_thumbnails(instance)
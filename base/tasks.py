@@ -0,0 +1,196 @@
+"""
+File de tâches en arrière-plan (pool de threads local au processus).
+
+Les tâches sont soumises après le commit de la transaction courante, pour
+que le worker voie les lignes qui viennent d'être créées. Avec
+settings.BACKGROUND_TASKS_ASYNC = False, elles s'exécutent immédiatement
+(utile en développement et dans les scripts).
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from base.qrcodes import render_many
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "BACKGROUND_TASKS_WORKERS", 2),
+                    thread_name_prefix="openfood-tasks",
+                )
+    return _executor
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Échec de la tâche %s%r", func.__name__, args)
+    finally:
+        # Les threads du pool ne passent pas par le cycle requête/réponse
+        connection.close()
+
+
+def run_in_background(func, *args):
+    if not getattr(settings, "BACKGROUND_TASKS_ASYNC", True):
+        func(*args)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, func, *args))
+
+
+# --------------------------
+# QR codes
+# --------------------------
+def generate_table_qr(table_id, force=False):
+    from base.models import Table
+
+    table = Table.objects.select_related("restaurant").filter(pk=table_id).first()
+    if table is None or (table.qr_code and table.qr_status == "ready" and not force):
+        return
+    try:
+        table.generate_qr_code()
+    except Exception:
+        Table.objects.filter(pk=table_id).update(qr_status="failed")
+        raise
+    table.save(update_fields=["qr_code", "qr_status"])
+
+
+def generate_restaurant_qr(restaurant_id, force=False):
+    from base.models import Restaurant
+
+    restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+    if restaurant is None or (restaurant.qr_code and restaurant.qr_status == "ready" and not force):
+        return
+    try:
+        restaurant.generate_qr_code()
+    except Exception:
+        Restaurant.objects.filter(pk=restaurant_id).update(qr_status="failed")
+        raise
+
+
+def generate_restaurant_tables_qr(restaurant_id):
+    """Régénère les QR de toutes les tables d'un restaurant (rendu en pool de processus)."""
+    from base.models import Table
+
+    tables = list(Table.objects.select_related("restaurant").filter(restaurant_id=restaurant_id))
+    if not tables:
+        return
+    try:
+        _render_tables_qr(tables)
+    except Exception:
+        # Sinon les tables resteraient « en cours de génération » indéfiniment
+        Table.objects.filter(restaurant_id=restaurant_id, qr_status="pending").update(qr_status="failed")
+        raise
+
+
+def _render_pool(max_workers):
+    # "spawn" : ne pas forker un processus serveur multi-threadé
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _render_tables_qr(tables):
+    from base.models import Table
+
+    # Seules les images absentes du stockage sont rendues
+    storage = Table._meta.get_field("qr_code").storage
+    specs = {table.pk: table.get_qr_spec() for table in tables}
+    missing = [
+        table for table in tables
+        if not storage.exists(table.get_qr_name(specs[table.pk]))
+    ]
+    jobs = [specs[table.pk] for table in missing]
+    workers = getattr(settings, "QR_PROCESS_POOL_SIZE", 0) or multiprocessing.cpu_count()
+
+    if len(jobs) < getattr(settings, "QR_PROCESS_POOL_THRESHOLD", 8) or workers < 2:
+        images = render_many(jobs)
+    else:
+        chunk = -(-len(jobs) // workers)
+        chunks = [jobs[i:i + chunk] for i in range(0, len(jobs), chunk)]
+        with _render_pool(len(chunks)) as pool:
+            images = [png for rendered in pool.map(render_many, chunks) for png in rendered]
+
+    rendered = {table.pk: image for table, image in zip(missing, images)}
+    for table in tables:
+        table.generate_qr_code(rendered.get(table.pk))
+    Table.objects.bulk_update(tables, ["qr_code", "qr_status"])
+
+
+def enqueue_table_qr(table_id, force=False):
+    from base.models import Table
+
+    Table.objects.filter(pk=table_id).update(qr_status="pending")
+    run_in_background(generate_table_qr, table_id, force)
+
+
+def enqueue_restaurant_qr(restaurant_id, force=False):
+    from base.models import Restaurant
+
+    Restaurant.objects.filter(pk=restaurant_id).update(qr_status="pending")
+    run_in_background(generate_restaurant_qr, restaurant_id, force)
+
+
+def enqueue_restaurant_tables_qr(restaurant_id):
+    from base.models import Table
+
+    Table.objects.filter(restaurant_id=restaurant_id).update(qr_status="pending")
+    run_in_background(generate_restaurant_tables_qr, restaurant_id)
+
+
+# --------------------------
+# Miniatures des images
+# --------------------------
+def generate_thumbnails(model_label, pk):
+    """
+    Miniatures de tous les champs image périmés d'une instance, en une tâche.
+    Le rendu se fait hors transaction ; l'écriture relit la ligne verrouillée
+    (select_for_update) et ne touche que les champs dont l'image n'a pas
+    changé entre-temps : deux tâches sur la même instance ne s'écrasent pas.
+    """
+    from django.apps import apps
+
+    from base.thumbnails import build_thumbnails
+    from customer import menu_cache
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return []
+    entries = {field: build_thumbnails(getattr(instance, field)) for field in instance.thumbnails_outdated()}
+    if not entries:
+        return []
+
+    with transaction.atomic():
+        current = model.objects.select_for_update().filter(pk=pk).first()
+        if current is None:
+            return []
+        thumbnails = dict(current.thumbnails)
+        for field, entry in list(entries.items()):
+            # Image remplacée pendant le rendu : la tâche de ce nouvel enregistrement s'en charge
+            if getattr(current, field).name != getattr(instance, field).name:
+                del entries[field]
+            elif entry is None:
+                thumbnails.pop(field, None)
+            else:
+                thumbnails[field] = entry
+        # update() : pas de nouveau post_save, donc pas de nouvelle mise en file
+        model.objects.filter(pk=pk).update(thumbnails=thumbnails)
+    menu_cache.bump_version(instance.restaurant_id)
+    return list(entries)
+
+
+def enqueue_thumbnails(instance):
+    if instance.thumbnails_outdated():
+        run_in_background(generate_thumbnails, instance._meta.label, instance.pk)
@@ -1,3 +1,1130 @@
-from django.test import TestCase
+import asyncio
+import json
+import shutil
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings, skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from base import benchmarks, events, order_numbers, tasks
+from base.db.pool import ConnectionPool
+from base.instrumentation import registry
+from base.kitchen import decode_since, kitchen_orders
+from base.media_urls import MediaURLResolver
+from base.models import (
+    Category, DailyOrderRollup, MenuItem, Order, OrderItem, OrderNumberSequence, Restaurant,
+    RestaurantCustomization, Table,
+)
+from base.order_status import can_transition, transition_orders
+from base.pagination import keyset_page
+from base.rollups import dashboard_stats, rebuild_rollups
+from customer.api.serializers import MenuItemSerializer, RestaurantCustomizationSerializer
+from customer.resp import RespStandInServer
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def create_user(email="owner@openfood.test", **fields):
+    return User.objects.create_user(email=email, password="secret", first_name="O", last_name="W", **fields)
+
+
+def create_restaurant(owner, name="Le Test", email="r@openfood.test", **fields):
+    return Restaurant.objects.create(
+        owner=owner, name=name, address="1 rue", phone="0100", email=email, **fields
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RestaurantTestCase(TestCase):
+    """Propriétaire, restaurant (et table si ``table_number``) partagés ; médias supprimés en fin de classe."""
+
+    table_number = None
+    restaurant_fields = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = create_user()
+        cls.restaurant = create_restaurant(cls.owner, **cls.restaurant_fields)
+        if cls.table_number is not None:
+            cls.table = Table.objects.create(restaurant=cls.restaurant, number=cls.table_number, capacity=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+class OrderRollupTests(RestaurantTestCase):
+
+    def create_order(self, total, **fields):
+        return Order.objects.create(restaurant=self.restaurant, total=Decimal(total), **fields)
+
+    def rollups(self):
+        return {
+            (r.order_type, r.status): (r.orders, r.revenue)
+            for r in DailyOrderRollup.objects.filter(restaurant=self.restaurant)
+            if r.orders
+        }
+
+    def test_rollups_follow_order_lifecycle(self):
+        order = self.create_order("12.00")
+        self.create_order("8.00", order_type="takeaway", status="confirmed")
+        self.assertEqual(self.rollups(), {
+            ("dine_in", "pending"): (1, Decimal("12.00")),
+            ("takeaway", "confirmed"): (1, Decimal("8.00")),
+        })
+
+        order = Order.objects.get(pk=order.pk)
+        order.status = "confirmed"
+        order.order_type = "takeaway"
+        order.save()
+        self.assertEqual(self.rollups(), {("takeaway", "confirmed"): (2, Decimal("20.00"))})
+
+        order.delete()
+        self.assertEqual(self.rollups(), {("takeaway", "confirmed"): (1, Decimal("8.00"))})
+
+    def test_deferred_load_does_not_double_count(self):
+        order = self.create_order("5.00")
+        partial = Order.objects.only("id", "notes").get(pk=order.pk)
+        partial.notes = "Sans oignons"
+        partial.save(update_fields=["notes"])
+        self.assertEqual(self.rollups(), {("dine_in", "pending"): (1, Decimal("5.00"))})
+
+    def test_restaurant_deletion_drops_its_rollups(self):
+        restaurant = create_restaurant(self.owner, name="Fermé", email="f@openfood.test")
+        Order.objects.create(restaurant=restaurant, total=Decimal("7.00"))
+        restaurant_id = restaurant.id
+        restaurant.delete()
+        self.assertFalse(DailyOrderRollup.objects.filter(restaurant_id=restaurant_id).exists())
+
+        owner = create_user("o2@openfood.test")
+        restaurant = create_restaurant(owner, name="Parti", email="p@openfood.test")
+        Order.objects.create(restaurant=restaurant, total=Decimal("7.00"))
+        User.objects.filter(pk=owner.pk).delete()
+        self.assertFalse(DailyOrderRollup.objects.filter(restaurant_id=restaurant.id).exists())
+
+    def test_dashboard_matches_backfill(self):
+        self.create_order("10.00", status="delivered")
+        self.create_order("4.00", status="cancelled", order_type="delivery")
+        self.create_order("6.00", status="confirmed")
+        live = dashboard_stats(self.restaurant)
+
+        DailyOrderRollup.objects.all().delete()
+        rebuild_rollups()
+        self.assertEqual(dashboard_stats(self.restaurant), live)
+        self.assertEqual(live["total_orders"], 3)
+        self.assertEqual(live["today_orders"], 3)
+        self.assertEqual(live["total_revenue"], Decimal("16.00"))
+        self.assertEqual(live["type_labels"], ["dine_in", "delivery"])
+        self.assertEqual(live["type_values"], [2, 1])
+
+    def test_dashboard_view(self):
+        self.create_order("10.00", status="delivered")
+        self.client.force_login(self.owner)
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_orders"], 1)
+
+
+class OrdersListTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(restaurant=cls.restaurant, name="Plats")
+        item = MenuItem.objects.create(
+            restaurant=cls.restaurant, category=category, name="Plat", price=Decimal("10.00")
+        )
+
+        # Plusieurs commandes à la même seconde : départage par id
+        now = timezone.now()
+        for i in range(60):
+            order = Order.objects.create(
+                restaurant=cls.restaurant,
+                table=cls.table if i % 2 else None,
+                status="delivered" if i % 3 else "pending",
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i // 4))
+            OrderItem.objects.create(order=order, menu_item=item, quantity=1, price=item.price)
+
+    def test_keyset_pages_cover_every_order_once(self):
+        orders = Order.objects.filter(restaurant=self.restaurant)
+        expected = list(orders.order_by("-created_at", "-pk").values_list("pk", flat=True))
+
+        seen, pages, page = [], [], keyset_page(orders, per_page=25)
+        while True:
+            pages.append(page)
+            seen += [order.pk for order in page]
+            if not page.has_next:
+                break
+            page = keyset_page(orders, after=page.next_cursor, per_page=25)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        back = keyset_page(orders, before=pages[2].previous_cursor, per_page=25)
+        self.assertEqual([o.pk for o in back], [o.pk for o in pages[1]])
+        self.assertTrue(back.has_previous)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = keyset_page(Order.objects.all(), after="pas-un-curseur", per_page=10)
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous)
+
+    def test_view_filters(self):
+        self.client.force_login(self.owner)
+        response = self.client.get("/orders/", {"status": "pending", "table": self.table.pk})
+        self.assertEqual(response.status_code, 200)
+        orders = list(response.context["orders"])
+        self.assertTrue(orders)
+        self.assertTrue(all(o.status == "pending" and o.table_id == self.table.pk for o in orders))
+
+    def test_view_query_count_does_not_depend_on_rows(self):
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get("/orders/")
+        cursor = response.context["orders"].next_cursor
+        response = self.client.get("/orders/", {"after": cursor})
+        with CaptureQueriesContext(connection) as last_page:
+            response = self.client.get("/orders/", {"after": response.context["orders"].next_cursor})
+        self.assertEqual(len(response.context["orders"]), 10)
+        self.assertEqual(len(first_page), len(last_page))
+
+
+@override_settings(
+    INSTRUMENTATION_ENABLED=True,
+    INSTRUMENTATION_SAMPLE_RATE=1.0,
+)
+class InstrumentationTests(RestaurantTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = create_user("staff@openfood.test", is_staff=True)
+
+    def setUp(self):
+        registry.reset()
+
+    def test_server_timing_and_histograms(self):
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/dashboard/")
+        timing = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries)} SQL"', timing)
+        self.assertIn("tpl;dur=", timing)
+
+        views = registry.snapshot()
+        self.assertEqual(views["dashboard"]["queries"]["count"], 1)
+        self.assertGreater(views["dashboard"]["template"]["max"], 0)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get("/metrics/").status_code, 302)
+
+        self.client.force_login(self.staff)
+        data = self.client.get("/metrics/").json()
+        self.assertIn("instrumentation_metrics", data["views"])
+        self.assertIn("hit_ratio", data["menu_cache"])
+        self.assertIn("size", data["tenant_cache"])
+
+    async def test_async_requests_stay_async(self):
+        from asgiref.sync import iscoroutinefunction
+        from base.instrumentation import InstrumentationMiddleware
+
+        async def view(request):
+            return HttpResponse(str(await Restaurant.objects.acount()))
+
+        middleware = InstrumentationMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = await middleware(AsyncRequestFactory().get("/"))
+        self.assertIn('desc="1 SQL"', response["Server-Timing"])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_measured(self):
+        self.client.force_login(self.owner)
+        response = self.client.get("/dashboard/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry.snapshot(), {})
+
+
+def png_upload(width, height, name="photo.png"):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height), (200, 80, 20, 128)).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(
+    BACKGROUND_TASKS_ASYNC=False,
+    THUMBNAIL_WIDTHS=[320, 640, 1024],
+    THUMBNAIL_FORMATS=["jpeg"],
+    BACKEND_DOMAIN="https://api.openfood.test",
+)
+class ThumbnailTests(RestaurantTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = Category.objects.create(restaurant=cls.restaurant, name="Plats")
+
+    def create_item(self, image):
+        return MenuItem.objects.create(
+            restaurant=self.restaurant, category=self.category, name="Plat",
+            price=Decimal("10.00"), image=image,
+        )
+
+    def test_variants_are_generated_without_upscaling(self):
+        item = self.create_item(png_upload(800, 400))
+        item.refresh_from_db()
+
+        entry = item.thumbnails["image"]
+        self.assertEqual(entry["source"], item.image.name)
+        self.assertEqual(sorted(entry["variants"]["jpeg"], key=int), ["320", "640", "800"])
+
+        from PIL import Image
+
+        with item.image.storage.open(entry["variants"]["jpeg"]["320"]) as thumb:
+            self.assertEqual(Image.open(thumb).size, (320, 160))
+
+    def test_serializer_srcset_follows_image_changes(self):
+        item = self.create_item(png_upload(500, 500))
+        item.refresh_from_db()
+        srcset = MenuItemSerializer(item).data["image_srcset"]["jpeg"]
+        self.assertTrue(srcset.startswith("https://api.openfood.test/"))
+        self.assertTrue(srcset.endswith("500w"))
+
+        # Nouvelle image : miniatures régénérées, les anciennes ne sont plus servies
+        item.image = png_upload(300, 300, name="autre.png")
+        item.save()
+        item.refresh_from_db()
+        self.assertIn("300w", MenuItemSerializer(item).data["image_srcset"]["jpeg"])
+
+        item.image = ""
+        item.save()
+        item.refresh_from_db()
+        self.assertEqual(item.thumbnails, {})
+        self.assertEqual(MenuItemSerializer(item).data["image_srcset"], {})
+
+
+    def test_one_task_per_instance_for_all_image_fields(self):
+        from base import tasks
+
+        customization = RestaurantCustomization.objects.create(restaurant=self.restaurant)
+        customization.logo = png_upload(200, 200, name="logo.png")
+        customization.cover_image = png_upload(600, 300, name="cover.png")
+        with mock.patch.object(tasks, "run_in_background", wraps=tasks.run_in_background) as run:
+            customization.save()
+        run.assert_called_once_with(tasks.generate_thumbnails, customization._meta.label, customization.pk)
+
+        customization.refresh_from_db()
+        self.assertEqual(sorted(customization.thumbnails), ["cover_image", "logo"])
+        self.assertEqual(customization.thumbnails_outdated(), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_URL="/media/", BACKEND_DOMAIN="https://api.openfood.test")
+class MediaURLTests(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get("/", HTTP_HOST="demo.openfood.test")
+
+    def test_resolver_matches_storage_urls(self):
+        item = MenuItem(image="menu_items/crêpe salée.jpg")
+        resolver = MediaURLResolver.for_request(self.request)
+        self.assertEqual(
+            resolver.file_url(item.image),
+            self.request.build_absolute_uri(item.image.url),
+        )
+        self.assertIsNone(resolver.file_url(MenuItem().image))
+
+    @override_settings(MEDIA_ORIGIN="https://cdn.openfood.test/")
+    def test_cdn_origin_applies_to_every_image(self):
+        customization = RestaurantCustomization(
+            logo="restaurants/customization/logos/l.png",
+            cover_image="restaurants/customization/covers/c.png",
+        )
+        data = RestaurantCustomizationSerializer(customization, context={"request": self.request}).data
+        self.assertEqual(data["logo"], "https://cdn.openfood.test/media/restaurants/customization/logos/l.png")
+        self.assertEqual(data["cover_image"], "https://cdn.openfood.test/media/restaurants/customization/covers/c.png")
+
+    def test_without_request_falls_back_to_backend_domain(self):
+        customization = RestaurantCustomization(cover_image="restaurants/customization/covers/c.png")
+        data = RestaurantCustomizationSerializer(customization).data
+        self.assertEqual(data["cover_image"], "https://api.openfood.test/media/restaurants/customization/covers/c.png")
+        self.assertIsNone(data["logo"])
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class QrExportTests(RestaurantTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(3):
+            Table.objects.create(restaurant=cls.restaurant, number=str(number + 1), capacity=4)
+
+    async def test_zip_is_streamed_chunk_by_chunk_under_asgi(self):
+        import zipfile
+
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get("/tables/export_qr/")
+        # Itérateur async : pas de sync_to_async(list) sur tout le ZIP
+        self.assertTrue(response.is_async)
+
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()), ["table-1.png", "table-2.png", "table-3.png"]
+            )
+
+    def test_sheet_is_streamed_page_by_page(self):
+        for number in range(4, 14):
+            Table.objects.create(restaurant=self.restaurant, number=str(number), capacity=4)
+        missing = Table.objects.get(restaurant=self.restaurant, number="2")
+        missing.qr_code.storage.delete(missing.qr_code.name)
+
+        self.client.force_login(self.owner)
+        response = self.client.get("/tables/export_qr/", {"format": "sheet"})
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 13)
+
+        content = b"".join(chunks).decode()
+        self.assertEqual(content.count('<div class="page">'), 2)
+        self.assertEqual(content.count('<div class="card">'), 13)
+        # Image manquante régénérée au passage
+        self.assertTrue(missing.qr_code.storage.exists(missing.qr_code.name))
+        for table in Table.objects.filter(restaurant=self.restaurant):
+            self.assertIn(f'src="{table.qr_code.url}"', content)
+
+    @override_settings(QR_PROCESS_POOL_SIZE=3, QR_PROCESS_POOL_THRESHOLD=2)
+    def test_bulk_generation_in_a_pool_keeps_images_in_order(self):
+        from base.qrcodes import render_qr
+
+        for number in range(4, 8):
+            Table.objects.create(restaurant=self.restaurant, number=str(number), capacity=4)
+        tables = list(Table.objects.filter(restaurant=self.restaurant))
+        for table in tables:
+            table.qr_code.storage.delete(table.qr_code.name)
+
+        # Même découpage qu'avec le pool de processus, sans lancer d'interpréteur
+        with mock.patch("base.tasks._render_pool", side_effect=ThreadPoolExecutor) as pool:
+            tasks.generate_restaurant_tables_qr(self.restaurant.id)
+        pool.assert_called_once_with(3)
+
+        for table in Table.objects.filter(restaurant=self.restaurant):
+            self.assertEqual(table.qr_status, "ready")
+            with table.qr_code.open("rb") as image:
+                self.assertEqual(image.read(), render_qr(*table.get_qr_spec()))
+
+
+
+class QrTaskTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        # Fichiers partagés entre les tests de la classe : chaque test repart sans image
+        self.table.qr_code.storage.delete(self.table.get_qr_name())
+
+    def test_regeneration_runs_after_commit(self):
+        executor = mock.Mock()
+        with mock.patch("base.tasks.get_executor", return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f"/tables/{self.table.id}/regenerate_qr/", HTTP_REFERER="/tables/")
+                executor.submit.assert_not_called()
+        executor.submit.assert_called_once_with(tasks._run, tasks.generate_table_qr, self.table.id, True)
+
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.qr_status, "pending")
+        self.assertContains(self.client.get("/tables/"), "En cours de génération")
+
+        tasks.generate_table_qr(self.table.id, True)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.qr_status, "ready")
+        self.assertEqual(self.table.qr_code.name, self.table.get_qr_name())
+        self.assertTrue(self.table.qr_code.storage.exists(self.table.qr_code.name))
+        self.assertContains(self.client.get("/tables/"), "Voir QR Code")
+
+    @override_settings(BACKGROUND_TASKS_ASYNC=False)
+    def test_generate_all_tables(self):
+        Table.objects.create(restaurant=self.restaurant, number="2", capacity=4)
+        response = self.client.post("/tables/generate_qr/")
+        self.assertRedirects(response, "/tables/", fetch_redirect_response=False)
+
+        tables = Table.objects.filter(restaurant=self.restaurant)
+        self.assertEqual({table.qr_status for table in tables}, {"ready"})
+        for table in tables:
+            self.assertEqual(table.qr_code.name, table.get_qr_name())
+            self.assertTrue(table.qr_code.storage.exists(table.qr_code.name))
+
+    @override_settings(BACKGROUND_TASKS_ASYNC=False)
+    def test_failed_render_marks_the_table(self):
+        with mock.patch("base.models.render_qr", side_effect=RuntimeError("qrcode")):
+            with self.assertRaises(RuntimeError):
+                tasks.enqueue_table_qr(self.table.id, force=True)
+
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.qr_status, "failed")
+        self.assertContains(self.client.get("/tables/"), "Échec, régénérer")
+
+    def test_worker_failure_is_logged_and_marks_the_tables(self):
+        Table.objects.filter(pk=self.table.pk).update(qr_status="pending")
+        # connection.close() du worker fermerait la transaction du test
+        with mock.patch("base.tasks.render_many", side_effect=RuntimeError("pool")), \
+                mock.patch("base.tasks.connection"), self.assertLogs("base.tasks", "ERROR"):
+            tasks._run(tasks.generate_restaurant_tables_qr, self.restaurant.id)
+
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.qr_status, "failed")
+
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class QrStorageTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # QR générés à la création (tâches synchrones) sur d'autres instances
+        cls.table.refresh_from_db()
+        cls.restaurant.refresh_from_db()
+
+    def stored(self, directory):
+        return set(self.table.qr_code.storage.listdir(directory)[1])
+
+    def test_identical_spec_reuses_the_file(self):
+        name = self.table.qr_code.name
+        files = self.stored("table_qrcodes")
+        with mock.patch("base.models.render_qr") as render:
+            tasks.generate_table_qr(self.table.id, force=True)
+        render.assert_not_called()
+
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.qr_code.name, name)
+        self.assertEqual(self.stored("table_qrcodes"), files)
+
+    @override_settings(QR_FORMAT="svg")
+    def test_changed_spec_writes_a_new_file(self):
+        previous = self.table.qr_code.name
+        tasks.generate_table_qr(self.table.id, force=True)
+
+        self.table.refresh_from_db()
+        self.assertNotEqual(self.table.qr_code.name, previous)
+        self.assertEqual(self.table.qr_code.name, self.table.get_qr_name())
+        self.assertTrue(self.table.qr_code.name.endswith(".svg"))
+        with self.table.qr_code.open("rb") as svg:
+            self.assertTrue(svg.read().startswith(b"<svg"))
+        # L'ancienne image reste en place jusqu'au nettoyage
+        self.assertTrue(self.table.qr_code.storage.exists(previous))
+
+    def test_cleanup_deletes_only_unreferenced_files(self):
+        storage = self.table.qr_code.storage
+        orphans = [
+            storage.save("table_qrcodes/orphan.png", ContentFile(b"x")),
+            storage.save("qrcodes/orphan.png", ContentFile(b"x")),
+        ]
+        unrelated = storage.save("menu_items/photo.png", ContentFile(b"x"))
+        kept = [self.table.qr_code.name, self.restaurant.qr_code.name]
+
+        out = StringIO()
+        call_command("cleanup_qr_files", "--dry-run", stdout=out)
+        self.assertIn("[dry-run] table_qrcodes/orphan.png", out.getvalue())
+        self.assertTrue(all(storage.exists(name) for name in orphans))
+
+        call_command("cleanup_qr_files", stdout=StringIO())
+        self.assertFalse(any(storage.exists(name) for name in orphans))
+        self.assertTrue(all(storage.exists(name) for name in kept + [unrelated]))
+
+
+class FakeConnection:
+    closed = False
+    healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_reuses_released_connections(self):
+        pool = ConnectionPool(max_size=1)
+        first = pool.acquire(FakeConnection)
+        second = pool.acquire(FakeConnection)
+        pool.release(first)
+        pool.release(second)
+        # Pool plein : la connexion en trop est fermée
+        self.assertTrue(second.closed)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        self.assertEqual(pool.stats, {"opened": 2, "reused": 1, "discarded": 1})
+
+    def test_discards_expired_and_unhealthy_connections(self):
+        pool = ConnectionPool(max_lifetime=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+
+        pool = ConnectionPool(check=lambda connection: connection.healthy)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        connection.healthy = False
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+
+
+class OrderEventTests(RestaurantTestCase):
+
+    def setUp(self):
+        self.broker = events.LocalBroker()
+        events._broker, previous = self.broker, events._broker
+        self.addCleanup(setattr, events, "_broker", previous)
+
+    def test_events_are_published_after_commit(self):
+        published = []
+        self.broker.publish = lambda channel, event: published.append((channel, event["type"]))
+        channel = events.order_channel(self.restaurant.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(restaurant=self.restaurant)
+            order.notes = "Sans sel"
+            order.save()
+            self.assertEqual(published, [])
+        # Création puis modification dans la même transaction : un seul événement
+        self.assertEqual(published, [(channel, events.ORDER_CREATED)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.get(pk=order.pk)
+            order.status = "preparing"
+            order.save()
+        self.assertEqual(published, [(channel, events.ORDER_CREATED), (channel, events.ORDER_STATUS)])
+
+    def test_broker_errors_never_fail_the_request(self):
+        Order.objects.create(restaurant=self.restaurant)
+        events.publish_order_events([1], events.ORDER_STATUS)
+        # Exécutés au commit : une erreur du broker est journalisée, pas propagée
+        self.assertEqual([robust for _, _, robust in connection.run_on_commit[-2:]], [True, True])
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            url = "redis://127.0.0.1:%d/0" % sock.getsockname()[1]
+        broker = events.RedisBroker(url=url, timeout=0.2)
+        with self.assertRaises(ConnectionError):
+            broker.publish("orders:1", {"type": events.ORDER_CREATED})
+        # Serveur toujours injoignable : abandon immédiat, sans nouvelle connexion
+        broker.client = None
+        with self.assertRaises(ConnectionError):
+            broker.publish("orders:1", {"type": events.ORDER_CREATED})
+
+    def test_no_event_stream_under_wsgi(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get("/orders/events/").status_code, 204)
+
+        response = self.client.get("/orders/")
+        self.assertFalse(response.context["live_events"])
+        self.assertNotContains(response, "new EventSource")
+
+    async def test_sse_view_streams_restaurant_events(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get("/orders/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        # Publication depuis un autre thread (vue sync, tâche de fond...)
+        event = {"type": events.ORDER_STATUS, "id": 1, "status": "ready"}
+        await asyncio.to_thread(self.broker.publish, events.order_channel(self.restaurant.id), event)
+        self.assertEqual(await anext(stream), f"event: order.status\ndata: {json.dumps(event)}\n\n".encode())
+
+        # Déconnexion du client : le handler ASGI annule la lecture en cours
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(self.broker._subscriptions, {})
+
+    async def test_slow_subscriber_gets_resync(self):
+        broker = events.LocalBroker(queue_size=2)
+        subscription = broker.subscribe("orders:1")
+        for i in range(3):
+            broker.publish("orders:1", {"type": events.ORDER_CREATED, "id": i})
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(1), {"type": events.RESYNC})
+        self.assertIsNone(await subscription.get(0.01))
+
+    async def test_redis_broker_fans_out_between_processes(self):
+        server = RespStandInServer().start()
+        self.addCleanup(server.stop)
+        subscriber, publisher = events.RedisBroker(url=server.url), events.RedisBroker(url=server.url)
+        subscription = subscriber.subscribe("orders:7")
+        while not server._subscribers:
+            await asyncio.sleep(0.01)
+
+        await asyncio.to_thread(publisher.publish, "orders:7", {"type": events.ORDER_CREATED, "id": 3})
+        await asyncio.to_thread(publisher.publish, "orders:8", {"type": events.ORDER_CREATED, "id": 4})
+        self.assertEqual(await subscription.get(2), {"type": events.ORDER_CREATED, "id": 3})
+        self.assertIsNone(await subscription.get(0.05))
+
+
+class KitchenDisplayTests(RestaurantTestCase):
+
+    table_number = "5"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(restaurant=cls.restaurant, name="Plats")
+        item = MenuItem.objects.create(
+            restaurant=cls.restaurant, category=category, name="Plat", price=Decimal("10.00")
+        )
+        for status in ("pending", "preparing", "ready", "delivered", "cancelled"):
+            order = Order.objects.create(restaurant=cls.restaurant, table=cls.table, status=status)
+            OrderItem.objects.create(order=order, menu_item=item, quantity=2, price=item.price)
+        # Commandes modifiées il y a une heure
+        Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def get(self, **params):
+        response = self.client.get("/orders/kitchen/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_list_contains_active_orders_only(self):
+        with self.assertNumQueries(2):
+            orders, _ = kitchen_orders(self.restaurant)
+        self.assertEqual([order["status"] for order in orders], ["pending", "preparing", "ready"])
+        self.assertEqual(orders[0]["table"], "5")
+        self.assertEqual(orders[0]["items"], [{"name": "Plat", "quantity": 2, "notes": ""}])
+
+        data = self.get(since="pas-un-curseur")
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["orders"]), 3)
+
+    def test_since_returns_only_changed_orders(self):
+        cursor = self.get()["cursor"]
+        with self.assertNumQueries(1):
+            orders, _ = kitchen_orders(self.restaurant, decode_since(cursor))
+        self.assertEqual(orders, [])
+
+        order = Order.objects.get(restaurant=self.restaurant, status="ready")
+        order.status = "delivered"
+        order.save()
+        data = self.get(since=cursor)
+        self.assertFalse(data["full"])
+        self.assertEqual([(o["id"], o["active"]) for o in data["orders"]], [(order.id, False)])
+
+
+class OrderStatusTests(RestaurantTestCase):
+
+    table_number = "5"
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def create_order(self, status, table=None):
+        return Order.objects.create(
+            restaurant=self.restaurant, table=table, status=status, total=Decimal("10.00")
+        )
+
+    def assertRollupsMatchBackfill(self):
+        live = {
+            (r.day, r.order_type, r.status): (r.orders, r.revenue)
+            for r in DailyOrderRollup.objects.filter(restaurant=self.restaurant) if r.orders
+        }
+        rebuild_rollups([self.restaurant.id])
+        rebuilt = {
+            (r.day, r.order_type, r.status): (r.orders, r.revenue)
+            for r in DailyOrderRollup.objects.filter(restaurant=self.restaurant)
+        }
+        self.assertEqual(live, rebuilt)
+
+    def test_transitions_follow_state_machine(self):
+        self.assertTrue(can_transition("pending", "ready"))
+        self.assertTrue(can_transition("ready", "cancelled"))
+        self.assertFalse(can_transition("ready", "pending"))
+        self.assertFalse(can_transition("delivered", "cancelled"))
+
+        order = self.create_order("pending")
+        orders = Order.objects.filter(pk=order.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(transition_orders(orders, "preparing"), [order.pk])
+        update = next(q["sql"] for q in queries if q["sql"].startswith("UPDATE \"base_order\""))
+        self.assertNotIn("total", update)
+        # Statut attendu périmé (un collègue est passé avant) : rien ne change
+        self.assertEqual(transition_orders(orders, "ready", expected="pending"), [])
+        self.assertEqual(transition_orders(orders, "pending"), [])
+        self.assertEqual(Order.objects.get(pk=order.pk).status, "preparing")
+        self.assertRollupsMatchBackfill()
+
+    def test_bulk_endpoint_moves_matching_orders_in_one_update(self):
+        ready = [self.create_order("ready", self.table) for _ in range(3)]
+        pending = self.create_order("pending", self.table)
+        other_table = self.create_order("ready")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/orders/bulk-status/", {
+                "status": "delivered", "from_status": "ready", "table": "5",
+            })
+        self.assertEqual(response.json()["updated"], 3)
+        statuses = dict(Order.objects.values_list("pk", "status"))
+        self.assertEqual({statuses[o.pk] for o in ready}, {"delivered"})
+        self.assertEqual(statuses[pending.pk], "pending")
+        self.assertEqual(statuses[other_table.pk], "ready")
+        self.assertRollupsMatchBackfill()
+
+        response = self.client.post("/orders/bulk-status/", {"status": "delivered"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_change_status_view_rejects_stale_screen(self):
+        order = self.create_order("confirmed")
+        url = f"/orders/{order.pk}/change-status/"
+        self.client.post(url, {"status": "ready", "expected": "pending"})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, "confirmed")
+        self.client.post(url, {"status": "ready", "expected": "confirmed"})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, "ready")
+        self.assertEqual(self.client.post("/orders/999999/change-status/", {"status": "ready"}).status_code, 404)
+
+    def test_orders_list_exposes_transitions_to_live_updates(self):
+        order = self.create_order("ready")
+        response = self.client.get("/orders/")
+        # Le script temps réel recalcule "expected" et les actions à partir de ces données
+        self.assertContains(response, '<script id="status-transitions" type="application/json">')
+        self.assertEqual(response.context["status_transitions"]["ready"], ["delivered", "cancelled"])
+        self.assertContains(response, f'id="order-{order.pk}" data-status="ready"')
+        self.assertContains(response, 'data-status="delivered"')
+
+
+class OrderNumberTests(RestaurantTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = create_restaurant(cls.owner, name="L'Autre", email="autre@openfood.test")
+
+    def setUp(self):
+        order_numbers.allocator.reset()
+
+    @override_settings(ORDER_NUMBER_BLOCK_SIZE=1)
+    def test_numbers_follow_a_sequence_per_restaurant(self):
+        numbers = [Order.objects.create(restaurant=self.restaurant).order_number for _ in range(3)]
+        self.assertEqual(numbers, ["ORD-000001", "ORD-000002", "ORD-000003"])
+        self.assertEqual(Order.objects.create(restaurant=self.other).order_number, "ORD-000001")
+
+    @override_settings(ORDER_NUMBER_BLOCK_SIZE=10)
+    def test_block_reserved_in_rolled_back_transaction_is_not_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Order.objects.create(restaurant=self.restaurant)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            # La réservation est annulée avec la commande : on repart de 1
+            first = Order.objects.create(restaurant=self.restaurant)
+        self.assertEqual(first.order_number, "ORD-000001")
+
+        # Plage validée : les numéros suivants sont servis sans requête
+        with CaptureQueriesContext(connection) as queries:
+            second = Order.objects.create(restaurant=self.restaurant)
+        self.assertEqual(second.order_number, "ORD-000002")
+        self.assertFalse([q for q in queries if "ordernumbersequence" in q["sql"]])
+        self.assertEqual(OrderNumberSequence.objects.get(restaurant=self.restaurant).last_value, 10)
+
+    def test_default_block_locks_the_sequence_once_per_block(self):
+        numbers = []
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                numbers.append(Order.objects.create(restaurant=self.restaurant).order_number)
+        self.assertEqual(numbers, ["ORD-000001", "ORD-000002", "ORD-000003"])
+        # Une seule réservation pour les trois commandes
+        self.assertEqual(OrderNumberSequence.objects.get(restaurant=self.restaurant).last_value, 20)
+
+    @override_settings(ORDER_NUMBER_BLOCK_SIZE=1)
+    def test_migration_seeds_sequences_after_legacy_numbers(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        seed = import_module("base.migrations.0013_seed_order_number_sequences").seed_sequences
+        for number in ("ORD-3FA9C2E1", "ORD-00B71D4A"):
+            Order.objects.create(restaurant=self.restaurant, order_number=number)
+        OrderNumberSequence.objects.filter(restaurant=self.restaurant).delete()
+
+        seed(apps, None)
+        self.assertEqual(OrderNumberSequence.objects.get(restaurant=self.restaurant).last_value, 2)
+        self.assertEqual(Order.objects.create(restaurant=self.restaurant).order_number, "ORD-000003")
+
+    def test_block_allocator_hands_out_unique_numbers_across_threads(self):
+        # Distribution en mémoire seulement ; le vrai UPDATE : ConcurrentOrderNumberTests
+        counters, lock = {}, threading.Lock()
+
+        def reserve(key, count):
+            # Équivalent de l'UPDATE ... SET last_value = last_value + count
+            with lock:
+                counters[key] = counters.get(key, 0) + count
+                return counters[key]
+
+        allocator = order_numbers.BlockAllocator(reserve, block_size=50)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            chunks = list(pool.map(
+                lambda _: [allocator.next(self.restaurant.id) for _ in range(12_500)], range(8)
+            ))
+        numbers = [number for chunk in chunks for number in chunk]
+        self.assertEqual(len(numbers), 100_000)
+        self.assertEqual(len(set(numbers)), 100_000)
+        # Chaque thread reçoit des numéros croissants
+        self.assertTrue(all(chunk == sorted(chunk) for chunk in chunks))
+
+
+class ConcurrentOrderNumberTests(TransactionTestCase):
+
+    def tearDown(self):
+        order_numbers.allocator.reset()
+
+    # Écritures concurrentes réelles : pas sous SQLite (base verrouillée en entier)
+    @skipUnlessDBFeature("has_select_for_update")
+    @override_settings(ORDER_NUMBER_BLOCK_SIZE=5)
+    def test_concurrent_orders_get_unique_numbers(self):
+        restaurant = create_restaurant(create_user())
+        order_numbers.allocator.reset()
+
+        def create_orders(_):
+            try:
+                for _ in range(25):
+                    Order.objects.create(restaurant=restaurant)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(create_orders, range(8)))
+
+        numbers = list(Order.objects.filter(restaurant=restaurant).values_list("order_number", flat=True))
+        self.assertEqual(len(numbers), 200)
+        self.assertEqual(len(set(numbers)), 200)
+        self.assertGreaterEqual(OrderNumberSequence.objects.get(restaurant=restaurant).last_value, 200)
+
+
+def create_menu(restaurant, count):
+    category = Category.objects.create(restaurant=restaurant, name="Plats")
+    return [
+        MenuItem.objects.create(
+            restaurant=restaurant, category=category, name=f"Plat {i}", price=Decimal("8.00") + i
+        )
+        for i in range(count)
+    ]
+
+
+class OrderTotalTests(RestaurantTestCase):
+
+    restaurant_fields = {"tax_rate": Decimal("0.055")}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.items = create_menu(cls.restaurant, 2)
+
+    def add_line(self, order, menu_item, quantity):
+        OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity)
+
+    def test_totals_use_restaurant_tax_rate(self):
+        order = Order.objects.create(restaurant=self.restaurant)
+        self.add_line(order, self.items[0], 2)
+        self.add_line(order, self.items[1], 1)
+        order.calculate_total()
+
+        stored = Order.objects.get(pk=order.pk)
+        self.assertEqual(stored.subtotal, Decimal("25.00"))
+        self.assertEqual(stored.tax, Decimal("1.38"))
+        self.assertEqual(stored.total, Decimal("26.38"))
+        self.assertEqual(order.total, stored.total)
+
+    def test_stale_instance_keeps_totals_and_rollups_consistent(self):
+        order = Order.objects.create(restaurant=self.restaurant)
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+
+        # Deux écrans modifient la même commande, chacun avec sa copie
+        self.add_line(order, self.items[0], 1)
+        first.calculate_total()
+        self.add_line(order, self.items[1], 2)
+        second.calculate_total()
+
+        stored = Order.objects.get(pk=order.pk)
+        self.assertEqual(stored.subtotal, Decimal("26.00"))
+        self.assertEqual(second.total, stored.total)
+        revenue = DailyOrderRollup.objects.filter(restaurant=self.restaurant).aggregate(
+            revenue=Sum("revenue")
+        )["revenue"]
+        self.assertEqual(revenue, stored.total)
+
+    def test_settings_view_updates_tax_rate(self):
+        self.client.force_login(self.owner)
+        fields = {"name": "Le Test", "phone": "0100", "email": "r@openfood.test", "address": "1 rue"}
+        self.client.post("/settings/", dict(fields, tax_rate="20"))
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.tax_rate, Decimal("0.2"))
+
+        self.client.post("/settings/", dict(fields, tax_rate="abc"))
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.tax_rate, Decimal("0.2"))
+
+
+class ConcurrentOrderTotalTests(TransactionTestCase):
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_concurrent_item_edits_keep_totals_consistent(self):
+        restaurant = create_restaurant(create_user())
+        items = create_menu(restaurant, 8)
+        order = Order.objects.create(restaurant=restaurant)
+
+        def add_line(menu_item):
+            try:
+                with transaction.atomic():
+                    # Chaque modification part de sa propre copie de la commande
+                    edited = Order.objects.get(pk=order.pk)
+                    OrderItem.objects.create(order=edited, menu_item=menu_item, quantity=1)
+                    edited.calculate_total()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(add_line, items))
+
+        order.refresh_from_db()
+        self.assertEqual(order.subtotal, sum(item.price for item in items))
+        self.assertEqual(order.total, order.subtotal + order.tax)
+        revenue = DailyOrderRollup.objects.filter(restaurant=restaurant).aggregate(
+            revenue=Sum("revenue")
+        )["revenue"]
+        self.assertEqual(revenue, order.total)
+
+
+class OrderEditTests(RestaurantTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.items = create_menu(cls.restaurant, 34)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def create_order(self, line_count):
+        order = Order.objects.create(restaurant=self.restaurant, order_type="takeaway")
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=1, price=item.price)
+            for item in self.items[:line_count]
+        ])
+        order.calculate_total()
+        return order
+
+    def edit_payload(self, order):
+        """Supprime la première ligne, passe les autres à 2, ajoute 3 articles."""
+        data = {"order_type": "takeaway", "new-items-TOTAL_FORMS": "3"}
+        for index, line in enumerate(order.items.order_by("pk")):
+            data[f"items-{index}-id"] = line.pk
+            data[f"items-{index}-menu_item"] = line.menu_item_id
+            data[f"items-{index}-quantity"] = 2
+            if index == 0:
+                data[f"items-{index}-DELETE"] = "True"
+        # Deux nouveaux articles, et un déjà dans la commande
+        for index, item in enumerate([self.items[-1], self.items[-2], self.items[1]]):
+            data[f"new-items-{index}-menu_item"] = item.pk
+            data[f"new-items-{index}-quantity"] = 1
+        return data
+
+    def count_queries(self, method, order, data=None):
+        url = f"/orders/{order.pk}/update/"
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertEqual(response.status_code, 302 if method == "post" else 200)
+        return len(queries)
+
+    def test_edit_queries_do_not_depend_on_line_count(self):
+        small, large = self.create_order(2), self.create_order(30)
+        self.assertEqual(self.count_queries("get", small), self.count_queries("get", large))
+        self.assertEqual(
+            self.count_queries("post", small, self.edit_payload(small)),
+            self.count_queries("post", large, self.edit_payload(large)),
+        )
+
+        lines = {line.menu_item_id: line.quantity for line in large.items.all()}
+        self.assertEqual(len(lines), 31)
+        self.assertNotIn(self.items[0].pk, lines)
+        self.assertEqual(lines[self.items[1].pk], 3)
+        self.assertEqual(lines[self.items[-1].pk], 1)
+        large.refresh_from_db()
+        self.assertEqual(
+            large.subtotal, sum(item.price * lines[item.pk] for item in self.items if item.pk in lines)
+        )
+
+    def test_invalid_line_leaves_order_unchanged(self):
+        order = self.create_order(2)
+        data = self.edit_payload(order)
+        data["new-items-0-quantity"] = "abc"
+        response = self.client.post(f"/orders/{order.pk}/update/", data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(order.items.count(), 2)
+
+
+@contextmanager
+def current_test_database():
+    # isolated_database crée sa propre base : les tests tournent déjà dans une base jetable
+    with benchmarks._private_caches(), benchmarks._private_brokers():
+        yield connection
+
+
+class BenchmarkCommandTests(TestCase):
+    """Exécution complète sur un jeu de données minuscule (index, contraintes, vues)."""
+
+    def test_generate_fixtures(self):
+        out = StringIO()
+        call_command(
+            "generate_fixtures", restaurants=2, tables=2, categories=2, items=2, orders=20,
+            images=0, prefix="smoke", stdout=out,
+        )
+        self.assertIn("2 restaurants générés", out.getvalue())
+        self.assertEqual(Restaurant.objects.filter(slug__startswith="smoke-").count(), 2)
+        self.assertEqual(Order.objects.count(), 20)
+
+    @mock.patch("base.management.commands.run_benchmarks.isolated_database", current_test_database)
+    def test_run_benchmarks(self):
+        out = StringIO()
+        call_command(
+            "run_benchmarks", restaurants=2, tables=2, categories=2, items=3, orders=20,
+            guests=2, cart_adds=2, dashboards=2, stdout=out,
+        )
+        for endpoint in ("scan QR (menu HTML)", "menu (API)", "commande (checkout)", "tableau de bord"):
+            self.assertIn(endpoint, out.getvalue())
+
+    @mock.patch("base.management.commands.explain_hot_queries.isolated_database", current_test_database)
+    def test_explain_hot_queries(self):
+        out = StringIO()
+        call_command("explain_hot_queries", restaurants=2, orders=50, items=2, tables=2, stdout=out)
+        self.assertIn("menu client (API)", out.getvalue())
+        self.assertIn("Aucun parcours complet", out.getvalue())
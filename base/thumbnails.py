@@ -0,0 +1,119 @@
+"""
+Miniatures des images (articles, catégories, personnalisation).
+
+Chaque image envoyée est réduite à plusieurs largeurs et réencodée en
+WebP et JPEG, hors de la requête (base/tasks.py). Les fichiers sont
+adressés par le contenu de l'original : un même fichier n'est traité
+qu'une fois. Le champ JSON `thumbnails` du modèle garde, par champ image :
+
+    {"image": {"source": "menu_items/x.png",
+               "variants": {"webp": {"320": "thumbs/...-320.webp", ...},
+                            "jpeg": {...}}}}
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def get_widths():
+    return sorted(getattr(settings, "THUMBNAIL_WIDTHS", [320, 640, 1024]))
+
+
+def get_formats():
+    from PIL import features
+
+    formats = getattr(settings, "THUMBNAIL_FORMATS", ["webp", "jpeg"])
+    # Pillow compilé sans libwebp : JPEG uniquement
+    return [fmt for fmt in formats if fmt != "webp" or features.check("webp")]
+
+
+def render_variants(data, widths, formats, quality=80):
+    """Retourne [(largeur, format, bytes)] ; jamais d'agrandissement."""
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        targets = sorted({min(width, image.width) for width in widths})
+        variants = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+            for fmt in formats:
+                frame = resized
+                if fmt == "jpeg" and frame.mode == "RGBA":
+                    # JPEG sans transparence : fond blanc
+                    frame = Image.new("RGB", frame.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                buffer = BytesIO()
+                frame.save(buffer, format=fmt.upper(), quality=quality, optimize=fmt == "jpeg")
+                variants.append((width, fmt, buffer.getvalue()))
+        return variants
+
+
+def build_thumbnails(field_file):
+    """Génère (ou réutilise) les miniatures d'un FieldFile ; None si pas d'image."""
+    if not field_file:
+        return None
+    storage = field_file.storage
+    with storage.open(field_file.name, "rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    folder = f"thumbs/{field_file.field.upload_to}"
+
+    variants = {}
+    for width, fmt, image in render_variants(
+        data, get_widths(), get_formats(), getattr(settings, "THUMBNAIL_QUALITY", 80)
+    ):
+        name = f"{folder}{digest}-{width}.{fmt}"
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(image))
+        variants.setdefault(fmt, {})[str(width)] = name
+    return {"source": field_file.name, "variants": variants}
+
+
+def srcsets(entry, name, storage, resolver=None):
+    """
+    Attributs srcset par format à partir de l'entrée `thumbnails[champ]`.
+    Utilisable sur des lignes .values() comme sur des instances.
+    """
+    if not entry or entry.get("source") != name:
+        return {}
+    url = resolver.url if resolver else (lambda path, storage: storage.url(path))
+    return {
+        fmt: ", ".join(
+            f"{url(path, storage)} {width}w"
+            for width, path in sorted(names.items(), key=lambda pair: int(pair[0]))
+        )
+        for fmt, names in entry["variants"].items()
+    }
+
+
+class ThumbnailsMixin:
+    """Modèles avec un champ `thumbnails` (JSONField) et des champs image."""
+    THUMBNAIL_FIELDS = ()
+
+    def thumbnails_outdated(self):
+        """Champs image dont les miniatures ne correspondent plus au fichier."""
+        return [
+            field for field in self.THUMBNAIL_FIELDS
+            if (getattr(self, field).name or None) != self.thumbnails.get(field, {}).get("source")
+        ]
+
+    def get_srcsets(self, field, resolver=None):
+        """
+        {format: "url 320w, url 640w"} pour le champ `field` ({} si pas encore
+        prêt). Avec un MediaURLResolver, les URLs sont absolues.
+        """
+        field_file = getattr(self, field)
+        return srcsets(self.thumbnails.get(field), field_file.name, field_file.storage, resolver)
+
+    @property
+    def image_srcsets(self):
+        return self.get_srcsets("image")
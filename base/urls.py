@@ -12,11 +12,14 @@ urlpatterns = [
 
     # Commandes
     path("orders/", orders_list, name="orders_list"),
+    path("orders/events/", order_events, name="order_events"),
+    path("orders/kitchen/", kitchen_orders_api, name="kitchen_orders"),
     path("orders/create-manual-order/", create_manual_order, name="create_manual_order"),
     path("orders/<int:pk>/", order_detail, name="order_detail"),
     path('orders/<int:order_id>/update/', update_order, name='update_order'),
     path('orders/<int:order_id>/delete/', delete_order, name='delete_order'),
     path("orders/<int:pk>/change-status/", order_change_status, name="order_change_status"),
+    path("orders/bulk-status/", orders_bulk_status, name="orders_bulk_status"),
 
 
     # Catégories
@@ -36,6 +39,8 @@ urlpatterns = [
     path("tables/<int:table_id>/delete/", table_delete, name="table_delete"),
     path("tables/<int:table_id>/toggle_active/", table_toggle_active, name="table_toggle_active"),
     path("tables/<int:table_id>/regenerate_qr/", table_regenerate_qr, name="table_regenerate_qr"),
+    path("tables/generate_qr/", tables_generate_qr, name="tables_generate_qr"),
+    path("tables/export_qr/", tables_export_qr, name="tables_export_qr"),
     path("tables/<int:table_id>/update/", table_update, name="table_update"),
 
     # Personnalisation
@@ -44,4 +49,7 @@ urlpatterns = [
 
     # Paramètres restaurant
     path("settings/", restaurant_settings, name="restaurant_settings"),
+
+    # Instrumentation (staff)
+    path("metrics/", instrumentation_metrics, name="instrumentation_metrics"),
 ]
@@ -3,8 +3,9 @@ from decimal import Decimal
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 import json
+import re
 
-from .models import MenuItem , OrderItem
+from .models import MenuItem , Order , OrderItem
 
 
 # def get_or_create_wallet(user):
@@ -63,3 +64,168 @@ def get_client_context(request, table_token):
 
     return restaurant, table, customization, None
 
+
+
+# --------------------------
+# Commandes : création en bulk
+# --------------------------
+def merge_order_lines(lines, id_key="menu_item_id"):
+    """Regroupe les lignes en double : {menu_item_id: quantité totale}."""
+    quantities = {}
+    for line in lines:
+        menu_item_id = int(line[id_key])
+        quantity = max(int(line.get("quantity", 1)), 1)
+        quantities[menu_item_id] = quantities.get(menu_item_id, 0) + quantity
+    return quantities
+
+
+def build_order_items(restaurant, quantities, skip_missing=False):
+    """
+    Résout tous les articles en une seule requête et prépare les OrderItem
+    (non sauvegardés), au prix actuel. Lève ValueError si un article est
+    introuvable, sauf avec skip_missing=True (l'article est alors ignoré).
+    """
+    menu_items = _orderable_items(restaurant).in_bulk(list(quantities))
+    return price_order_items(menu_items, quantities, skip_missing)
+
+
+async def abuild_order_items(restaurant, quantities, skip_missing=False):
+    """build_order_items pour les vues async (ORM async)."""
+    menu_items = await _orderable_items(restaurant).ain_bulk(list(quantities))
+    return price_order_items(menu_items, quantities, skip_missing)
+
+
+def _orderable_items(restaurant):
+    return MenuItem.objects.filter(restaurant=restaurant, is_available=True)
+
+
+def price_order_items(menu_items, quantities, skip_missing=False):
+    """OrderItem non sauvegardés à partir de {id: MenuItem} déjà chargés."""
+    items = []
+    subtotal = Decimal("0.00")
+    for menu_item_id, quantity in quantities.items():
+        menu_item = menu_items.get(menu_item_id)
+        if menu_item is None:
+            if skip_missing:
+                continue
+            raise ValueError(f"Item {menu_item_id} introuvable ou indisponible.")
+
+        price = menu_item.discount_price or menu_item.price
+        items.append(OrderItem(menu_item=menu_item, quantity=quantity, price=price))
+        subtotal += price * quantity
+
+    return items, subtotal
+
+
+def compute_totals(subtotal, tax_rate):
+    """(taxe, total) avec le taux du restaurant (Restaurant.tax_rate)."""
+    tax = (subtotal * tax_rate).quantize(Decimal("0.01"))
+    return tax, subtotal + tax
+
+
+def create_order_with_items(restaurant, quantities, **order_fields):
+    """
+    Crée une commande et ses lignes en un nombre constant de requêtes :
+    1 SELECT des articles, 1 INSERT de la commande (totaux inclus),
+    1 INSERT groupé des OrderItem.
+    """
+    items, _ = build_order_items(restaurant, quantities)
+    return save_order(restaurant, items, **order_fields)
+
+
+def save_order(restaurant, items, **order_fields):
+    """Enregistre une commande à partir d'OrderItem déjà résolus (2 INSERT)."""
+    subtotal = sum((item.get_total() for item in items), Decimal("0.00"))
+    tax, total = compute_totals(subtotal, restaurant.tax_rate)
+
+    order = Order.objects.create(
+        restaurant=restaurant,
+        subtotal=subtotal,
+        tax=tax,
+        total=total,
+        **order_fields
+    )
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
+
+    # Évite de relire les lignes (et leurs articles) pour la sérialisation
+    order._prefetched_objects_cache = {"items": items}
+    return order
+
+
+def read_order_lines(data, prefix, key):
+    """
+    Lignes d'un formulaire de commande (`<prefix>-<i>-<key>`,
+    `<prefix>-<i>-quantity`, `<prefix>-<i>-DELETE`) : {valeur de key:
+    quantité}, 0 pour une ligne supprimée. Les index ne sont pas supposés
+    consécutifs. Lève ValueError si une ligne est invalide.
+    """
+    pattern = re.compile(rf"{re.escape(prefix)}-(\d+)-{re.escape(key)}")
+    lines = {}
+    for name, value in data.items():
+        match = pattern.fullmatch(name)
+        if not match or not value:
+            continue
+        index = match.group(1)
+        try:
+            if data.get(f"{prefix}-{index}-DELETE") in ("True", "on"):
+                quantity = 0
+            else:
+                quantity = int(data.get(f"{prefix}-{index}-quantity") or 0)
+                if quantity < 1:
+                    raise ValueError
+            value = int(value)
+        except ValueError:
+            raise ValueError("Ligne de commande invalide.") from None
+        lines[value] = lines.get(value, 0) + quantity
+    return lines
+
+
+def update_order_items(order, quantities, additions):
+    """
+    Modifie les lignes d'une commande en un nombre constant de requêtes :
+    1 SELECT des lignes, 1 DELETE, 1 UPDATE groupé des quantités, 1 SELECT
+    des nouveaux articles et 1 INSERT groupé. Un article déjà présent dans
+    la commande voit sa quantité augmenter au lieu d'être ajouté deux fois.
+
+    quantities : {id de ligne: quantité, 0 pour la supprimer}
+    additions : {id d'article: quantité}
+    Ne recalcule pas les totaux (Order.calculate_total).
+    """
+    lines = {line.pk: line for line in order.items.all()}
+    deleted, updated = [], {}
+    for pk, quantity in quantities.items():
+        line = lines.get(pk)
+        if line is None:
+            continue
+        if quantity == 0:
+            deleted.append(pk)
+        elif line.quantity != quantity:
+            line.quantity = quantity
+            updated[pk] = line
+
+    kept = {line.menu_item_id: line for pk, line in lines.items() if pk not in deleted}
+    new_quantities = {}
+    for menu_item_id, quantity in additions.items():
+        line = kept.get(menu_item_id)
+        if not quantity:
+            continue
+        if line is None:
+            new_quantities[menu_item_id] = quantity
+        else:
+            line.quantity += quantity
+            updated[line.pk] = line
+
+    new_items = []
+    if new_quantities:
+        new_items, _ = build_order_items(order.restaurant, new_quantities)
+        for item in new_items:
+            item.order = order
+
+    if deleted:
+        OrderItem.objects.filter(order=order, pk__in=deleted).delete()
+    if updated:
+        OrderItem.objects.bulk_update(list(updated.values()), ["quantity"])
+    if new_items:
+        OrderItem.objects.bulk_create(new_items)
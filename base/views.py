@@ -4,14 +4,24 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
 from django.db.models import Count, Sum, Prefetch
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from django.utils import timezone
 from base.models import Category, Table
-from .forms import RestaurantCreateForm, OrderForm, OrderItemFormSet , TableForm , OrderItemForm
+from .forms import RestaurantCreateForm, OrderForm, OrderItemFormSet , TableForm , OrderFilterForm
 from .models import SubscriptionPlan, Restaurant, MenuItem, Order, OrderItem , RestaurantCustomization
-from django.forms import inlineformset_factory
 from django.utils.text import slugify
-from .utils import generate_unique_subdomain
+from .utils import generate_unique_subdomain, read_order_lines, update_order_items
+from .tasks import enqueue_restaurant_tables_qr, enqueue_table_qr
+from .qr_export import stream_qr_sheet, stream_qr_zip, streaming_response
+from .rollups import dashboard_stats
+from .pagination import keyset_page
+from .events import event_stream, live_events_available, order_channel
+from .kitchen import decode_since, kitchen_orders
+from .order_status import TRANSITIONS, transition_orders
+from django.views.decorators.http import require_GET, require_POST
+
+ORDERS_PER_PAGE = 25
 
 def home(request):
     return render(request, 'home/index.html')
@@ -100,20 +110,9 @@ def dashboard(request):
     if not restaurant:
         return render(request, "admin_user/no_restaurant.html")
     
-    today = timezone.now().date()
-    last_7_days = today - timedelta(days=6)
-    
-    total_orders = Order.objects.filter(restaurant=restaurant).count()
-    today_orders = Order.objects.filter(
-        restaurant=restaurant,
-        created_at__date=today
-    ).count()
-    
-    total_revenue = Order.objects.filter(
-        restaurant=restaurant,
-        status__in=["confirmed", "preparing", "ready", "delivered"]
-    ).aggregate(total=Sum("total"))["total"] or 0
-    
+    # Commandes : agrégats journaliers (base/rollups.py), pas la table Order
+    stats = dashboard_stats(restaurant)
+
     active_menu_items = MenuItem.objects.filter(
         restaurant=restaurant,
         is_available=True
@@ -124,49 +123,11 @@ def dashboard(request):
         is_active=True
     ).count()
     
-    orders_by_day = (
-        Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date__gte=last_7_days
-        )
-        .extra(select={'day': "date(created_at)"})
-        .values('day')
-        .annotate(count=Count('id'))
-        .order_by('day')
-    )
-    
-    days = []
-    orders_count = []
-    
-    for item in orders_by_day:
-        day_obj = datetime.strptime(item['day'], "%Y-%m-%d").date()
-        days.append(day_obj.strftime("%d/%m"))
-        orders_count.append(item['count'])
-    
-    order_types = (
-        Order.objects.filter(restaurant=restaurant)
-        .values('order_type')
-        .annotate(count=Count('id'))
-    )
-    
-    type_labels = []
-    type_values = []
-    
-    for o in order_types:
-        type_labels.append(o['order_type'])
-        type_values.append(o['count'])
-    
     context = {
         "restaurant": restaurant,
-        "total_orders": total_orders,
-        "today_orders": today_orders,
-        "total_revenue": total_revenue,
         "active_menu_items": active_menu_items,
         "active_tables": active_tables,
-        "days": days,
-        "orders_count": orders_count,
-        "type_labels": type_labels,
-        "type_values": type_values,
+        **stats,
     }
     
     return render(request, "admin_user/index.html", context)
@@ -219,9 +180,8 @@ def create_manual_order(request):
                         instance.price = instance.menu_item.discount_price or instance.menu_item.price
                         instance.save()
                     
-                    # Calculer le total
+                    # Calculer le total (enregistré par calculate_total)
                     order.calculate_total()
-                    order.save()
                 
                 messages.success(request, f"Commande #{order.id} créée avec succès.")
                 return redirect("orders_list")
@@ -259,6 +219,8 @@ def update_order(request, order_id):
     
     # Récupérer la commande
     order = get_object_or_404(Order, id=order_id, restaurant=restaurant)
+    # Restaurant déjà chargé (articles ajoutés, taux de taxe)
+    order.restaurant = restaurant
     
     # Récupération des catégories avec leurs items disponibles
     categories = Category.objects.filter(
@@ -271,47 +233,24 @@ def update_order(request, order_id):
         )
     )
     
-    # Créer le formset pour les OrderItem
-    OrderItemFormSet = inlineformset_factory(
-        Order,
-        OrderItem,
-        form=OrderItemForm,
-        extra=0,
-        can_delete=True,
-        fields=['menu_item', 'quantity']
-    )
-    
     if request.method == "POST":
         order_form = OrderForm(request.POST, instance=order, restaurant=restaurant)
-        formset = OrderItemFormSet(request.POST, instance=order, prefix='items')
         
-        if order_form.is_valid() and formset.is_valid():
+        if order_form.is_valid():
             try:
+                # Lignes existantes ({id: quantité}) et nouveaux articles
+                quantities = read_order_lines(request.POST, "items", "id")
+                additions = read_order_lines(request.POST, "new-items", "menu_item")
+                
                 with transaction.atomic():
                     # Sauvegarder la commande
                     order = order_form.save()
                     
-                    # Sauvegarder les articles existants
-                    formset.save()
-                    
-                    # Traiter les nouveaux articles
-                    new_items_count = int(request.POST.get('new-items-TOTAL_FORMS', 0))
-                    for i in range(new_items_count):
-                        menu_item_id = request.POST.get(f'new-items-{i}-menu_item')
-                        quantity = request.POST.get(f'new-items-{i}-quantity')
-                        
-                        if menu_item_id and quantity:
-                            menu_item = MenuItem.objects.get(id=menu_item_id, restaurant=restaurant)
-                            OrderItem.objects.create(
-                                order=order,
-                                menu_item=menu_item,
-                                quantity=quantity,
-                                price=menu_item.discount_price or menu_item.price
-                            )
+                    # Articles modifiés, supprimés et ajoutés en quelques requêtes groupées
+                    update_order_items(order, quantities, additions)
                     
-                    # Recalculer le total
+                    # Recalculer le total (enregistré par calculate_total)
                     order.calculate_total()
-                    order.save()
                 
                 messages.success(request, f"Commande #{order.id} mise à jour avec succès.")
                 return redirect("orders_list")
@@ -323,25 +262,24 @@ def update_order(request, order_id):
     else:
         # GET request - formulaire pré-rempli
         order_form = OrderForm(instance=order, restaurant=restaurant)
-        formset = OrderItemFormSet(instance=order, prefix='items')
     
-    # Préparer les données pour le template
-    existing_items = []
-    for item in order.items.all():
-        existing_items.append({
+    # Préparer les données pour le template (lignes et articles en une requête)
+    existing_items = [
+        {
             'id': item.id,
-            'menu_item_id': item.menu_item.id,
+            'menu_item_id': item.menu_item_id,
             'name': item.menu_item.name,
             'price': float(item.price),
             'quantity': item.quantity,
             'image_url': item.menu_item.image.url if item.menu_item.image else '',
             'subtotal': float(item.get_total())
-        })
+        }
+        for item in order.items.select_related("menu_item").order_by("pk")
+    ]
     
     return render(request, "admin_user/orders/update_order.html", {
         "order": order,
         "order_form": order_form,
-        "formset": formset,
         "categories": categories,
         "restaurant": restaurant,
         "existing_items": existing_items,
@@ -370,45 +308,143 @@ def delete_order(request, order_id):
 @login_required
 def orders_list(request):
     restaurant = Restaurant.objects.filter(owner=request.user).first()
-    orders = Order.objects.filter(restaurant=restaurant).order_by("-created_at")
-    
+
+    filter_form = OrderFilterForm(request.GET or None, restaurant=restaurant)
+    orders = filter_form.filter(
+        Order.objects.filter(restaurant=restaurant)
+        .select_related("table")
+        .prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("menu_item"))
+        )
+    )
+    page = keyset_page(
+        orders,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        per_page=ORDERS_PER_PAGE,
+    )
+
+    # Filtres conservés dans les liens Précédent / Suivant
+    query = request.GET.copy()
+    for key in ("after", "before"):
+        query.pop(key, None)
+
     return render(request, "admin_user/orders/list_orders.html", {
         "restaurant": restaurant,
-        "orders": orders
+        "orders": page,
+        "filter_form": filter_form,
+        "filter_query": query.urlencode(),
+        "live_events": live_events_available(request),
+        "status_transitions": TRANSITIONS,
     })
 
 @login_required
+@require_GET
+def kitchen_orders_api(request):
+    """
+    Écran cuisine (JSON) : commandes en cours ; avec ?since=<curseur>,
+    uniquement les commandes modifiées depuis (voir base/kitchen.py).
+    """
+    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    if not restaurant:
+        return JsonResponse({"error": "Aucun restaurant trouvé."}, status=404)
+
+    # Curseur absent ou invalide : liste complète
+    since = decode_since(request.GET.get("since", ""))
+    orders, cursor = kitchen_orders(restaurant, since)
+    return JsonResponse({"full": since is None, "cursor": cursor, "orders": orders})
+
+@login_required
+@require_GET
+async def order_events(request):
+    """
+    Flux SSE des commandes du restaurant (créations, changements de statut).
+    Vue async : une connexion ouverte n'occupe pas de worker (ASGI).
+    Sous WSGI, 204 : l'EventSource n'essaie plus de se reconnecter.
+    """
+    if not live_events_available(request):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    restaurant = await Restaurant.objects.filter(owner=user).afirst()
+    if not restaurant:
+        return JsonResponse({"error": "Aucun restaurant trouvé."}, status=404)
+
+    response = StreamingHttpResponse(
+        event_stream(order_channel(restaurant.id), getattr(settings, "ORDER_EVENTS_KEEPALIVE", 15)),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Pas de mise en tampon par nginx
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 @login_required
+@require_POST
 def order_change_status(request, pk):
-    # Correction: "restaurant" au lieu de "restaurent"
     restaurant = Restaurant.objects.filter(owner=request.user).first()
     
     if not restaurant:
         messages.error(request, "Aucun restaurant trouvé.")
         return redirect("orders_list")
     
-    order = get_object_or_404(Order, pk=pk, restaurant=restaurant)
-    
-    # Récupérer le nouveau statut
     new_status = request.POST.get("status")
-    
-    # Valider que le statut est parmi les choix valides
-    valid_statuses = [choice[0] for choice in Order.STATUS_CHOICES]
-    
-    if new_status not in valid_statuses:
+    if new_status not in TRANSITIONS:
         messages.error(request, "Statut invalide.")
         return redirect("orders_list")
+
+    # `expected` : statut affiché sur l'écran au moment du clic. Si un
+    # collègue l'a changé entre-temps, la commande n'est pas modifiée.
+    changed = transition_orders(
+        Order.objects.filter(pk=pk, restaurant=restaurant),
+        new_status,
+        expected=request.POST.get("expected") or None,
+    )
+    if not changed:
+        current = Order.objects.filter(pk=pk, restaurant=restaurant).values_list("status", flat=True).first()
+        if current is None:
+            raise Http404("Commande non trouvée.")
+        current_display = dict(Order.STATUS_CHOICES).get(current, current)
+        messages.error(request, f"Statut de la commande #{pk} inchangé : elle est actuellement « {current_display} ».")
+        return redirect("orders_list")
     
-    # Mettre à jour le statut
-    order.status = new_status
-    order.save()
-    
-    # Message de succès
     status_display = dict(Order.STATUS_CHOICES).get(new_status, new_status)
-    messages.success(request, f"Statut de la commande #{order.id} mis à jour: {status_display}")
+    messages.success(request, f"Statut de la commande #{pk} mis à jour: {status_display}")
     
     return redirect("orders_list")
 
+@login_required
+@require_POST
+def orders_bulk_status(request):
+    """
+    Change le statut de plusieurs commandes en une requête, ex. toutes les
+    commandes prêtes de la table 5 -> livrées :
+    status=delivered&from_status=ready&table=5 (ou ids=1&ids=2...).
+    """
+    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    if not restaurant:
+        return JsonResponse({"error": "Aucun restaurant trouvé."}, status=404)
+
+    new_status = request.POST.get("status")
+    from_status = request.POST.get("from_status") or None
+    if new_status not in TRANSITIONS or (from_status and from_status not in TRANSITIONS):
+        return JsonResponse({"error": "Statut invalide."}, status=400)
+
+    orders = Order.objects.filter(restaurant=restaurant)
+    ids = request.POST.getlist("ids")
+    table = request.POST.get("table")
+    if not ids and not table:
+        return JsonResponse({"error": "Indiquez des commandes (ids) ou une table."}, status=400)
+    if ids:
+        if not all(pk.isdigit() for pk in ids):
+            return JsonResponse({"error": "Identifiants invalides."}, status=400)
+        orders = orders.filter(pk__in=ids)
+    if table:
+        orders = orders.filter(table__number=table)
+
+    changed = transition_orders(orders, new_status, expected=from_status)
+    return JsonResponse({"updated": len(changed), "ids": changed})
+
 @login_required
 def order_detail(request, pk):
     restaurant = Restaurant.objects.filter(owner=request.user).first()
@@ -735,6 +771,7 @@ from django.contrib import messages
 from django.utils import timezone
 from .models import Restaurant
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 @login_required
 def restaurant_settings(request):
@@ -849,6 +886,19 @@ def restaurant_settings(request):
         if opening_hours:
             restaurant.opening_hours = opening_hours
         
+        # Taxe appliquée aux commandes (saisie en %)
+        tax_percent = request.POST.get("tax_rate", "").replace(",", ".")
+        if tax_percent:
+            try:
+                tax_rate = (Decimal(tax_percent) / 100).quantize(Decimal("0.0001"))
+                valid = 0 <= tax_rate < 1
+            except InvalidOperation:
+                valid = False
+            if not valid:
+                messages.error(request, "Taux de taxe invalide (entre 0 et 100 %).")
+                return redirect("restaurant_settings")
+            restaurant.tax_rate = tax_rate
+        
         # Services
         # selected_services = request.POST.getlist("services", [])
         # restaurant.services = selected_services
@@ -871,6 +921,7 @@ def restaurant_settings(request):
        
         "schedules": schedules,
         "hours": hours,
+        "tax_percent": restaurant.tax_rate * 100,
     }
     
     return render(request, "admin_user/settings.html", context)
@@ -941,9 +992,48 @@ def table_toggle_active(request , table_id):
 @login_required
 def table_regenerate_qr(request, table_id):
     table = get_object_or_404(Table, id=table_id)
-    table.generate_qr_code()
-    messages.success(request, f"QR Code de la table {table.number} régénéré.")
+    enqueue_table_qr(table.id, force=True)
+    messages.success(request, f"QR Code de la table {table.number} en cours de régénération.")
     return redirect(request.META.get('HTTP_REFERER'))
+
+@login_required
+def tables_generate_qr(request):
+    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    if not restaurant:
+        messages.error(request, "Aucun restaurant trouvé.")
+        return redirect("dashboard")
+
+    if request.method == "POST":
+        enqueue_restaurant_tables_qr(restaurant.id)
+        messages.success(request, "Génération des QR Codes de toutes les tables lancée.")
+    return redirect("tables_list")
+
+@login_required
+def tables_export_qr(request):
+    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    if not restaurant:
+        messages.error(request, "Aucun restaurant trouvé.")
+        return redirect("dashboard")
+
+    # Lecture par lots : la mémoire reste constante quel que soit le nombre de tables
+    tables = (
+        Table.objects.filter(restaurant=restaurant)
+        .select_related("restaurant")
+        .order_by("number")
+        .iterator(chunk_size=200)
+    )
+
+    if request.GET.get("format") == "sheet":
+        return streaming_response(
+            request,
+            stream_qr_sheet(restaurant, tables),
+            content_type="text/html; charset=utf-8",
+        )
+
+    response = streaming_response(request, stream_qr_zip(tables), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="qrcodes-{restaurant.slug}.zip"'
+    return response
+
 @login_required
 def table_update(request, table_id):
     table = get_object_or_404(Table, id=table_id)
@@ -994,3 +1084,31 @@ def customization(request):
         "restaurant": restaurant,
         "customization": customization_obj
     })
+
+
+# ----instrumentation
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_http_methods
+from customer import menu_cache
+from customer.tenants import tenant_cache
+from .instrumentation import registry
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def instrumentation_metrics(request):
+    """Histogrammes par vue (processus courant) et statistiques des caches."""
+    if request.method == "POST":
+        registry.reset()
+        menu_cache.reset_stats()
+
+    return JsonResponse({
+        "instrumentation": {
+            "enabled": getattr(settings, "INSTRUMENTATION_ENABLED", False),
+            "sample_rate": getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0),
+        },
+        "views": registry.snapshot(),
+        "menu_cache": menu_cache.stats(),
+        "tenant_cache": tenant_cache.stats(),
+    }, json_dumps_params={"indent": 2})
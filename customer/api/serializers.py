@@ -5,12 +5,14 @@ from rest_framework import serializers
 from base.models import MenuItem
 
 
-from django.conf import settings
 from rest_framework import serializers
+from base.media_urls import get_resolver
 from base.models import MenuItem
 
+
 class MenuItemSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
@@ -21,6 +23,7 @@ class MenuItemSerializer(serializers.ModelSerializer):
             "price",
             "discount_price",
             "image",
+            "image_srcset",
             "ingredients",
             "allergens",
             "is_vegetarian",
@@ -30,12 +33,12 @@ class MenuItemSerializer(serializers.ModelSerializer):
         ]
 
     def get_image(self, obj):
-        if not obj.image:
-            return None
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.image.url)
-        return f"{settings.BACKEND_DOMAIN}{obj.image.url}"
+        return get_resolver(self.context).file_url(obj.image)
+
+    def get_image_srcset(self, obj):
+        return obj.get_srcsets("image", get_resolver(self.context))
+
+
 class CategorySerializer(serializers.ModelSerializer):
     items = MenuItemSerializer(many=True)
 
@@ -51,6 +54,8 @@ from base.models import RestaurantCustomization
 class RestaurantCustomizationSerializer(serializers.ModelSerializer):
     logo = serializers.SerializerMethodField()
     cover_image = serializers.SerializerMethodField()
+    logo_srcset = serializers.SerializerMethodField()
+    cover_image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = RestaurantCustomization
@@ -59,24 +64,22 @@ class RestaurantCustomizationSerializer(serializers.ModelSerializer):
             "secondary_color",
             "font_family",
             "logo",
-            "cover_image"
+            "cover_image",
+            "logo_srcset",
+            "cover_image_srcset",
         ]
 
     def get_logo(self, obj):
-        if not obj.logo:
-            return None
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.logo.url)
-        return f"{settings.BACKEND_DOMAIN}{obj.logo.url}"
+        return get_resolver(self.context).file_url(obj.logo)
 
     def get_cover_image(self, obj):
-        if not obj.cover_image:
-            return None
-        request = self.context.get("request")
-        if request:
-            return request.build_absolute_uri(obj.cover_image.url)
-        return f"{settings.BASE_URL}{obj.cover_image.url}"
+        return get_resolver(self.context).file_url(obj.cover_image)
+
+    def get_logo_srcset(self, obj):
+        return obj.get_srcsets("logo", get_resolver(self.context))
+
+    def get_cover_image_srcset(self, obj):
+        return obj.get_srcsets("cover_image", get_resolver(self.context))
 
 
 
@@ -1,47 +1,28 @@
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from base.models import Category, MenuItem
-from customer.utils import get_client_context
-from .serializers import (
-    CategorySerializer,
-    MenuItemSerializer,
-    RestaurantCustomizationSerializer
-)
-
-@api_view(["GET"])
-def client_menu_api(request, table_token):
-    restaurant, table, customization, error = get_client_context(request, table_token)
-    if error:
-        print('error ic---')
-        return Response({"error": "Restaurant ou table invalide"}, status=400)
-
-    categories = Category.objects.filter(
-        restaurant=restaurant,
-        is_active=True
-    ).prefetch_related("items")
-    print( restaurant.name , restaurant.subdomain)
-    menuItems = MenuItem.objects.filter(
-        restaurant=restaurant ,
-        is_available = True
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from customer import menu_cache
+
+# Vues client async (servies par main.asgi) : l'ORM async ne bloque pas la
+# boucle d'événements ; seuls la transaction et la sérialisation DRF passent
+# par un thread (sync_to_async).
+
+@menu_cache.http_cached("MENU_API_CACHE_CONTROL")
+@require_GET
+async def client_menu_api(request, restaurant, table):
+    # Table déjà vérifiée par http_cached
+    if table is None:
+        return JsonResponse({"error": "Restaurant ou table invalide"}, status=400)
+
+    # Le menu est servi depuis un snapshot versionné (voir customer/menu_cache.py)
+    snapshot = await menu_cache.aget_snapshot(restaurant)
+    return HttpResponse(
+        menu_cache.render_menu(snapshot, table),
+        content_type="application/json"
     )
-    return Response({
-        "restaurant": {
-            "name": restaurant.name,
-            'description': restaurant.description,
-            "address":restaurant.address,
-            "phone":restaurant.phone,
-            "subdomain": restaurant.subdomain,
-            "opening_hours": restaurant.opening_hours,
-        },
-        "table": {
-            "id": table.id,
-            "number": table.number,
-            "token": str(table.token),
-        },
-        "customization": RestaurantCustomizationSerializer(customization).data,
-        "categories": CategorySerializer(categories, many=True).data,
-        "menuItems": MenuItemSerializer(menuItems , many =True).data
-    })
     
 
 
@@ -134,77 +115,68 @@ def client_menu_api(request, table_token):
 #         "total": order.total
 #     })
 
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from rest_framework import status
 from django.db import transaction
-from decimal import Decimal
-from base.models import Restaurant, Table, Order, OrderItem, MenuItem
+from base.models import Table
+from base.instrumentation import measure
+from base.utils import abuild_order_items, merge_order_lines, save_order
 from .serializers import OrderSerializer
 
-@api_view(["POST"])
-def create_order(request , table_token):
-    data = request.data
-    print(data)
-
-    # 1️⃣ Récupérer le restaurant
-    table = Table.objects.get(token=table_token)
-    print(table)
-    restaurant =  table.restaurant
-    print(restaurant)
-   
+def place_order(restaurant, items, **order_fields):
+    """Enregistre la commande (transaction) et la sérialise : partie sync de create_order."""
+    with transaction.atomic():
+        order = save_order(restaurant, items, **order_fields)
+    with measure("serializer"):
+        return OrderSerializer(order).data
+
+
+def read_order_payload(request):
+    """
+    Corps JSON, ou formulaire (urlencoded / multipart) comme avec l'ancien
+    @api_view ; dans un formulaire, "items" est une liste JSON.
+    """
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    data = request.POST.dict()
+    data["items"] = json.loads(data.get("items") or "[]")
+    return data
+
+
+@csrf_exempt
+@require_POST
+async def create_order(request, table_token):
+    try:
+        data = read_order_payload(request)
+    except ValueError:
+        return JsonResponse({"error": "JSON invalide."}, status=400)
+
+    # 1️⃣ Récupérer la table et son restaurant (404 : l'ancienne vue levait une 500)
+    table = await Table.objects.select_related("restaurant").filter(token=table_token).afirst()
+    if table is None:
+        return JsonResponse({"error": "Table introuvable."}, status=404)
+    restaurant = table.restaurant
+
     order_type = data.get("order_type", "dine_in")
-   
+
     items_data = data.get("items", [])
     if not items_data:
-        return Response({"error": "Aucun item fourni."}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"error": "Aucun item fourni."}, status=400)
 
-    # 3️⃣ Créer la commande dans une transaction
+    # 2️⃣ Articles résolus en une requête (ORM async), puis commande dans une transaction
     try:
-        with transaction.atomic():
-            order = Order.objects.create(
-                restaurant=restaurant,
-                table=table,
-                order_type=order_type,
-                customer_name=data.get("customer_name", ""),
-                customer_phone=data.get("customer_phone", ""),
-                notes=data.get("notes", "")
-            )
-
-            subtotal = Decimal("0.00")
-
-            # 4️⃣ Créer les OrderItem
-            for item in items_data:
-                try:
-                    menu_item = MenuItem.objects.get(id=item["menu_item_id"], restaurant=restaurant, is_available=True)
-                except MenuItem.DoesNotExist:
-                    raise ValueError(f"Item {item['menu_item_id']} introuvable ou indisponible.")
-
-                quantity = max(int(item.get("quantity", 1)), 1)
-                price = menu_item.discount_price or menu_item.price
-
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=menu_item,
-                    quantity=quantity,
-                    price=price
-                )
-
-                subtotal += price * quantity
-
-            # 5️⃣ Calculer total et taxes
-            tax = subtotal * Decimal("0.10")  # exemple 10% TVA
-            total = subtotal + tax
-
-            order.subtotal = subtotal
-            order.tax = tax
-            order.total = total
-            order.save()
-
-            serializer = OrderSerializer(order)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        quantities = merge_order_lines(items_data)
+        items, _ = await abuild_order_items(restaurant, quantities)
+        data = await sync_to_async(place_order)(
+            restaurant,
+            items,
+            table=table,
+            order_type=order_type,
+            customer_name=data.get("customer_name", ""),
+            customer_phone=data.get("customer_phone", ""),
+            notes=data.get("notes", "")
+        )
+        return JsonResponse(data, status=201)
 
     except ValueError as ve:
-        return Response({"error": str(ve)}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"error": str(ve)}, status=400)
     except Exception as e:
-        return Response({"error": "Erreur lors de la création de la commande."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": "Erreur lors de la création de la commande."}, status=500)
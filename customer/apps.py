@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CustomerConfig(AppConfig):
     name = 'customer'
+
+    def ready(self):
+        import customer.checks
+        import customer.signals
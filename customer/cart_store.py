@@ -0,0 +1,256 @@
+"""
+Stockage des paniers clients, indépendant des sessions Django.
+
+Un panier est un petit enregistrement {menu_item_id: quantité} par table
+(ou par table + navigateur). Chaque clic "ajouter au panier" devient une
+seule écriture indexée au lieu de la réécriture complète de la session.
+
+Backends (settings.CART_STORE["BACKEND"]) :
+- customer.cart_store.DatabaseCartStore : table customer_cartline, partagée
+  par tous les workers (défaut)
+- customer.cart_store.LocalCartStore : en mémoire, par processus (tests et
+  développement avec un seul worker, refusé sinon par customer/checks.py)
+- customer.cart_store.RedisCartStore : protocole Redis (Redis ou
+  customer.resp.RespStandInServer en local)
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from customer.models import CartLine
+from customer.resp import RespClient
+
+
+def cart_key(restaurant_id, table_token, owner=None):
+    key = f"cart:{restaurant_id}:{table_token}"
+    return f"{key}:{owner}" if owner else key
+
+
+class BaseCartStore:
+    # Appels réseau indépendants de la connexion SQL de la requête : les vues
+    # async peuvent les exécuter hors du thread principal
+    thread_sensitive = False
+
+    def __init__(self, ttl=6 * 60 * 60, **options):
+        self.ttl = ttl
+
+    def get(self, key):
+        """Retourne {menu_item_id (int): quantité}."""
+        raise NotImplementedError
+
+    def incr(self, key, item_id, amount=1):
+        """Ajoute `amount` (peut être négatif) ; supprime la ligne à 0."""
+        raise NotImplementedError
+
+    def set(self, key, item_id, quantity):
+        raise NotImplementedError
+
+    def remove(self, key, *item_ids):
+        raise NotImplementedError
+
+    def clear(self, key):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Supprime les paniers expirés ; retourne le nombre de lignes supprimées."""
+        return 0
+
+
+class DatabaseCartStore(BaseCartStore):
+    """Une ligne CartLine par article ; chaque écriture prolonge tout le panier (comme EXPIRE)."""
+    thread_sensitive = True
+
+    def _lines(self, key):
+        return CartLine.objects.filter(key=key)
+
+    def _touch(self, key, now):
+        # Les lignes déjà expirées ne sont pas prolongées (ignorées par get)
+        expires_at = now + timedelta(seconds=self.ttl)
+        self._lines(key).filter(expires_at__gt=now).update(expires_at=expires_at)
+        return expires_at
+
+    def get(self, key):
+        return dict(
+            self._lines(key)
+            .filter(expires_at__gt=timezone.now())
+            .values_list("menu_item_id", "quantity")
+        )
+
+    def incr(self, key, item_id, amount=1):
+        item_id = int(item_id)
+        now = timezone.now()
+        with transaction.atomic():
+            expires_at = self._touch(key, now)
+            line = self._lines(key).select_for_update().filter(menu_item_id=item_id).first()
+            if line is None and amount > 0:
+                try:
+                    with transaction.atomic():
+                        CartLine.objects.create(
+                            key=key, menu_item_id=item_id, quantity=amount, expires_at=expires_at
+                        )
+                    return amount
+                except IntegrityError:
+                    # Ligne créée entre-temps par une autre requête
+                    line = self._lines(key).select_for_update().get(menu_item_id=item_id)
+
+            current = line.quantity if line is not None and line.expires_at > now else 0
+            quantity = current + amount
+            if quantity > 0:
+                line.quantity = quantity
+                line.expires_at = expires_at
+                line.save(update_fields=["quantity", "expires_at"])
+            elif line is not None:
+                line.delete()
+            return max(quantity, 0)
+
+    def set(self, key, item_id, quantity):
+        if quantity <= 0:
+            return self.remove(key, item_id)
+        with transaction.atomic():
+            expires_at = self._touch(key, timezone.now())
+            CartLine.objects.bulk_create(
+                [CartLine(key=key, menu_item_id=int(item_id), quantity=quantity, expires_at=expires_at)],
+                update_conflicts=True,
+                unique_fields=["key", "menu_item_id"],
+                update_fields=["quantity", "expires_at"],
+            )
+
+    def remove(self, key, *item_ids):
+        if item_ids:
+            self._lines(key).filter(menu_item_id__in=[int(i) for i in item_ids]).delete()
+
+    def clear(self, key):
+        self._lines(key).delete()
+
+    def purge_expired(self):
+        deleted, _ = CartLine.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class LocalCartStore(BaseCartStore):
+
+    def __init__(self, ttl=6 * 60 * 60, **options):
+        super().__init__(ttl)
+        self._carts = {}
+        self._lock = threading.Lock()
+
+    def _cart(self, key, create=False):
+        entry = self._carts.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._carts[key]
+            entry = None
+        if entry is None:
+            if not create:
+                return {}
+            entry = self._carts[key] = [0, {}]
+        entry[0] = time.monotonic() + self.ttl
+        return entry[1]
+
+    def get(self, key):
+        with self._lock:
+            return dict(self._cart(key))
+
+    def incr(self, key, item_id, amount=1):
+        with self._lock:
+            cart = self._cart(key, create=True)
+            quantity = cart.get(int(item_id), 0) + amount
+            if quantity > 0:
+                cart[int(item_id)] = quantity
+            else:
+                cart.pop(int(item_id), None)
+            return max(quantity, 0)
+
+    def set(self, key, item_id, quantity):
+        if quantity <= 0:
+            return self.remove(key, item_id)
+        with self._lock:
+            self._cart(key, create=True)[int(item_id)] = quantity
+
+    def remove(self, key, *item_ids):
+        with self._lock:
+            cart = self._cart(key)
+            for item_id in item_ids:
+                cart.pop(int(item_id), None)
+
+    def clear(self, key):
+        with self._lock:
+            self._carts.pop(key, None)
+
+
+class RedisCartStore(BaseCartStore):
+    """Un hash Redis par panier : champ = id de l'article, valeur = quantité."""
+
+    def __init__(self, ttl=6 * 60 * 60, url="redis://127.0.0.1:6379/0", timeout=2.0, **options):
+        super().__init__(ttl)
+        self.client = RespClient(url, timeout=timeout)
+
+    def get(self, key):
+        values = self.client.execute("HGETALL", key) or []
+        return {
+            int(field): int(quantity)
+            for field, quantity in zip(values[::2], values[1::2])
+        }
+
+    def incr(self, key, item_id, amount=1):
+        quantity, _ = self.client.pipeline(
+            ("HINCRBY", key, item_id, amount),
+            ("EXPIRE", key, self.ttl),
+        )
+        if quantity <= 0:
+            self.client.execute("HDEL", key, item_id)
+        return max(quantity, 0)
+
+    def set(self, key, item_id, quantity):
+        if quantity <= 0:
+            return self.remove(key, item_id)
+        self.client.pipeline(
+            ("HSET", key, item_id, quantity),
+            ("EXPIRE", key, self.ttl),
+        )
+
+    def remove(self, key, *item_ids):
+        if item_ids:
+            self.client.execute("HDEL", key, *item_ids)
+
+    def clear(self, key):
+        self.client.execute("DEL", key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, "CART_STORE", {})
+                backend = import_string(config.get("BACKEND", "customer.cart_store.DatabaseCartStore"))
+                _store = backend(**config.get("OPTIONS", {}))
+    return _store
+
+
+def request_cart_key(request, restaurant, table_token, create=False):
+    """
+    Clé du panier pour la requête. Avec CART_SHARED_PER_TABLE, toute la
+    table partage le même panier ; sinon chaque navigateur a le sien
+    (identifié par sa clé de session, sans réécrire la session).
+
+    La session n'est créée qu'à la première écriture (create=True) : un
+    simple scan du QR code ou un robot n'écrit rien. Sans session, retourne
+    None (panier vide).
+    """
+    if getattr(settings, "CART_SHARED_PER_TABLE", False):
+        return cart_key(restaurant.id, table_token)
+
+    if not request.session.session_key:
+        if not create:
+            return None
+        request.session.create()
+    return cart_key(restaurant.id, table_token, request.session.session_key)
@@ -0,0 +1,58 @@
+"""
+Vérifications de configuration (manage.py check, démarrage de gunicorn).
+
+Avec plusieurs processus web (settings.WEB_CONCURRENCY > 1), l'état
+partagé entre requêtes doit vivre hors du processus : sinon chaque worker
+a sa propre version des menus (et ses propres ETags), ses propres paniers
+et ses propres abonnés au flux des commandes.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+from base.events import LocalBroker
+from customer.cart_store import LocalCartStore
+
+
+@register(Tags.caches)
+def check_shared_state(app_configs, **kwargs):
+    workers = getattr(settings, "WEB_CONCURRENCY", 1)
+    if workers <= 1:
+        return []
+
+    errors = []
+    alias = getattr(settings, "MENU_CACHE_ALIAS", "default")
+    if isinstance(caches[alias], LocMemCache):
+        errors.append(Error(
+            f"Le cache des menus ({alias!r}) est un LocMemCache, propre à chaque "
+            f"processus, avec WEB_CONCURRENCY={workers}.",
+            hint=(
+                "Utiliser un cache partagé, ex. DJANGO_CACHE_BACKEND="
+                "django.core.cache.backends.redis.RedisCache et DJANGO_CACHE_LOCATION=redis://..."
+            ),
+            id="customer.E001",
+        ))
+
+    backend = getattr(settings, "CART_STORE", {}).get("BACKEND", "customer.cart_store.DatabaseCartStore")
+    if issubclass(import_string(backend), LocalCartStore):
+        errors.append(Error(
+            f"Le cart store {backend!r} garde les paniers en mémoire, par processus, "
+            f"avec WEB_CONCURRENCY={workers}.",
+            hint=(
+                "Utiliser CART_STORE_BACKEND=customer.cart_store.DatabaseCartStore "
+                "ou customer.cart_store.RedisCartStore."
+            ),
+            id="customer.E002",
+        ))
+
+    backend = getattr(settings, "ORDER_EVENTS", {}).get("BACKEND", "base.events.LocalBroker")
+    if import_string(backend) is LocalBroker:
+        errors.append(Error(
+            f"Le broker d'événements {backend!r} ne relaie les commandes qu'aux flux "
+            f"du même processus, avec WEB_CONCURRENCY={workers}.",
+            hint="Utiliser ORDER_EVENTS_BACKEND=base.events.RedisBroker.",
+            id="customer.E003",
+        ))
+    return errors
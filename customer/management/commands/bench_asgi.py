@@ -0,0 +1,166 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from base.benchmarks import create_menu, create_owner, create_restaurants, create_tables, summarize
+from base.models import MenuItem, Table
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, worker_class, workers, port):
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", app,
+            "-c", os.path.join(settings.BASE_DIR, "gunicorn.conf.py"),
+            "-k", worker_class, "-w", str(workers), "-b", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+        ],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "GUNICORN_WORKER_CLASS": worker_class},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Le serveur {app} ({worker_class}) s'est arrêté")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise CommandError(f"Le serveur {app} ne répond pas")
+
+
+async def read_response(reader):
+    """Lit une réponse HTTP/1.1 ; retourne (statut, garder la connexion)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connexion fermée")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get("connection") != "close"
+
+
+async def guest(port, host, paths, slow, samples, errors):
+    """Client mobile lent : chaque requête est envoyée en deux fois, à `slow` s d'intervalle."""
+    reader = writer = None
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\n".encode())
+            await writer.drain()
+            await asyncio.sleep(slow)
+            writer.write(f"Host: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            if status >= 400:
+                errors.append(status)
+            samples.append((time.perf_counter() - start) * 1000)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors.append(type(exc).__name__)
+            keep_alive = False
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, host, paths, concurrency, slow):
+    samples, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        guest(port, host, paths, slow, samples, errors) for _ in range(concurrency)
+    ))
+    return samples, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sous charge concurrente (clients mobiles lents) gunicorn WSGI avec "
+        "workers sync et gunicorn ASGI avec un worker uvicorn, sur les vues client"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=200, help="Clients simultanés")
+        parser.add_argument("--requests", type=int, default=5, help="Requêtes par client")
+        parser.add_argument("--slow-ms", type=int, default=100, help="Latence d'envoi d'un client lent")
+        parser.add_argument("--sync-workers", type=int, default=4)
+        parser.add_argument("--asgi-workers", type=int, default=1)
+        parser.add_argument("--items", type=int, default=60)
+
+    def handle(self, *args, **options):
+        if "sqlite" in settings.DATABASES["default"]["ENGINE"] and str(
+            settings.DATABASES["default"]["NAME"]
+        ).startswith((":memory:", "file::memory:")):
+            raise CommandError("Base SQLite en mémoire : les serveurs ne la verraient pas")
+
+        # Données temporaires dans la base configurée (supprimées à la fin)
+        owner = create_owner()
+        restaurant = create_restaurants(1, owner=owner, prefix=f"bench-asgi-{uuid.uuid4().hex[:6]}")[0]
+        try:
+            create_menu([restaurant], categories=6, items_per_category=max(options["items"] // 6, 1))
+            create_tables([restaurant], 2)
+            table = Table.objects.filter(restaurant=restaurant, is_active=True).first()
+            item = MenuItem.objects.filter(restaurant=restaurant, is_available=True).first()
+            host = f"{restaurant.subdomain}.localhost"
+            paths = [
+                f"/api/customer/menu/{table.token}/" if i % 2 == 0 else f"/item/{item.pk}/details/"
+                for i in range(options["requests"])
+            ]
+
+            self.stdout.write(
+                f"{options['concurrency']} clients x {options['requests']} requêtes, "
+                f"envoi lent de {options['slow_ms']} ms par requête"
+            )
+            for label, app, worker_class, workers in (
+                (f"WSGI sync x{options['sync_workers']}", "main.wsgi:application", "sync", options["sync_workers"]),
+                (f"ASGI uvicorn x{options['asgi_workers']}", "main.asgi:application",
+                 "uvicorn_worker.UvicornWorker", options["asgi_workers"]),
+            ):
+                port = free_port()
+                server = start_server(app, worker_class, workers, port)
+                try:
+                    samples, errors, elapsed = asyncio.run(run_load(
+                        port, host, paths, options["concurrency"], options["slow_ms"] / 1000
+                    ))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{label:>18} : {len(samples) / elapsed:8.1f} req/s, p50 {stats['p50']:8.1f} ms, "
+                    f"p95 {stats['p95']:8.1f} ms, p99 {stats['p99']:8.1f} ms, {len(errors)} erreur(s)"
+                )
+        finally:
+            restaurant.delete()
+            owner.delete()
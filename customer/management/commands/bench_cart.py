@@ -0,0 +1,91 @@
+import random
+import uuid
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+
+from base.benchmarks import isolated_database, summarize, timed
+from customer.cart_store import DatabaseCartStore, LocalCartStore, RedisCartStore, cart_key
+from customer.resp import RespStandInServer
+
+
+class Command(BaseCommand):
+    help = "Compare les paniers en session (backend DB) et le cart store dédié"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--guests", type=int, default=200)
+        parser.add_argument("--clicks", type=int, default=5000)
+        parser.add_argument("--menu-size", type=int, default=60)
+        parser.add_argument(
+            "--redis-url",
+            help="Serveur Redis à utiliser (par défaut : serveur RESP local de remplacement)",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        guests = [uuid.uuid4() for _ in range(options["guests"])]
+        clicks = [
+            (rng.choice(guests), rng.randrange(1, options["menu_size"] + 1))
+            for _ in range(options["clicks"])
+        ]
+
+        with isolated_database():
+            sessions = {}
+            for token in guests:
+                session = SessionStore()
+                session.create()
+                sessions[token] = session.session_key
+
+            def session_click(i):
+                # Ancien chemin : lecture + réécriture complète de la session
+                token, item_id = clicks[i]
+                session = SessionStore(session_key=sessions[token])
+                key = f"cart_1_{token}"
+                cart = session.get(key, {})
+                line = cart.setdefault(str(item_id), {
+                    "name": f"Plat {item_id}",
+                    "price": "12.50",
+                    "quantity": 0,
+                    "image": f"/media/menu_items/plat_{item_id}.webp",
+                })
+                line["quantity"] += 1
+                session[key] = cart
+                session.save()
+
+            results = {"session (DB)": summarize(timed(session_click, len(clicks)))}
+
+            store = DatabaseCartStore()
+
+            def db_store_click(i):
+                token, item_id = clicks[i]
+                store.incr(cart_key(1, token), item_id, 1)
+
+            results["cart store DB"] = summarize(timed(db_store_click, len(clicks)))
+
+        server = None
+        url = options["redis_url"]
+        if not url:
+            server = RespStandInServer().start()
+            url = server.url
+
+        try:
+            for label, store in (
+                ("cart store local", LocalCartStore()),
+                ("cart store RESP", RedisCartStore(url=url)),
+            ):
+                def store_click(i):
+                    token, item_id = clicks[i]
+                    store.incr(cart_key(1, token), item_id, 1)
+
+                results[label] = summarize(timed(store_click, len(clicks)))
+        finally:
+            if server:
+                server.stop()
+
+        self.stdout.write(f"{'backend':<18}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for label, stats in results.items():
+            self.stdout.write(
+                f"{label:<18}{stats['ops/s']:>10.0f}{stats['p50']:>10.3f}"
+                f"{stats['p95']:>10.3f}{stats['p99']:>10.3f}"
+            )
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from base.benchmarks import (
+    create_menu, create_menu_images, create_owner, create_restaurants, isolated_database,
+    summarize, timed,
+)
+from base.models import Category, MenuItem, RestaurantCustomization
+from customer.api.serializers import (
+    CategorySerializer, MenuItemSerializer, RestaurantCustomizationSerializer,
+)
+from customer.menu_encoder import encode_menu, orjson
+from customer.utils import DEFAULT_CUSTOMIZATION
+
+
+def drf_menu(restaurant, customization):
+    """Ancien snapshot : ModelSerializer DRF + JSONRenderer."""
+    categories = Category.objects.filter(restaurant=restaurant, is_active=True).prefetch_related("items")
+    menu_items = MenuItem.objects.filter(restaurant=restaurant, is_available=True)
+    return JSONRenderer().render({
+        "restaurant": {
+            "name": restaurant.name,
+            "description": restaurant.description,
+            "address": restaurant.address,
+            "phone": restaurant.phone,
+            "subdomain": restaurant.subdomain,
+            "opening_hours": restaurant.opening_hours,
+        },
+        "customization": RestaurantCustomizationSerializer(customization).data,
+        "categories": CategorySerializer(categories, many=True).data,
+        "menuItems": MenuItemSerializer(menu_items, many=True).data,
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare la construction du menu client : serializers DRF et encodeur .values()/orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Encodeur JSON : {'orjson' if orjson else 'json (orjson absent)'}")
+        with isolated_database():
+            owner = create_owner()
+            images = create_menu_images(10, size=(64, 48))
+            for size in options["sizes"]:
+                restaurant = create_restaurants(1, owner=owner, prefix=f"menu-{size}")[0]
+                create_menu(
+                    [restaurant],
+                    categories=options["categories"],
+                    items_per_category=size // options["categories"],
+                    images=images,
+                )
+                customization, _ = RestaurantCustomization.objects.get_or_create(
+                    restaurant=restaurant, defaults=DEFAULT_CUSTOMIZATION
+                )
+                for label, build in (
+                    ("DRF", drf_menu),
+                    ("encodeur", encode_menu),
+                ):
+                    size_kb = len(build(restaurant, customization)) / 1024
+                    stats = summarize(timed(lambda i: build(restaurant, customization), options["iterations"]))
+                    self.stdout.write(
+                        f"{size:>5} articles {label:>9} : {size_kb:7.1f} Ko, "
+                        f"p50 {stats['p50']:8.2f} ms, p95 {stats['p95']:8.2f} ms, p99 {stats['p99']:8.2f} ms"
+                    )
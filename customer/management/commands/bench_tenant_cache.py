@@ -0,0 +1,60 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from base.benchmarks import create_restaurants, isolated_database, rate
+from customer.middleware import SubdomainMiddleware
+from customer.tenants import TenantCache
+
+
+class Command(BaseCommand):
+    help = "Mesure les requêtes/s de SubdomainMiddleware avec et sans cache des tenants"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=2000)
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument(
+            "--unknown-ratio",
+            type=float,
+            default=0.2,
+            help="Part des requêtes sur des sous-domaines inexistants (bots)",
+        )
+        parser.add_argument("--cache-size", type=int, default=1024)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        factory = RequestFactory()
+
+        with isolated_database():
+            restaurants = create_restaurants(options["tenants"])
+            # Trafic réaliste : quelques restaurants concentrent les scans
+            weights = [1 / (rank + 1) for rank in range(len(restaurants))]
+            hosts = []
+            for _ in range(options["requests"]):
+                if rng.random() < options["unknown_ratio"]:
+                    hosts.append(f"bot-{rng.randrange(10 ** 6)}.openfood.app")
+                else:
+                    restaurant = rng.choices(restaurants, weights)[0]
+                    hosts.append(f"{restaurant.subdomain}.openfood.app")
+            requests = [factory.get("/", HTTP_HOST=host) for host in hosts]
+
+            subdomain_middleware = SubdomainMiddleware(lambda request: HttpResponse())
+
+            results = {}
+            for label, cache in (
+                ("sans cache", TenantCache(max_size=0)),
+                ("avec cache", TenantCache(max_size=options["cache_size"])),
+            ):
+                subdomain_middleware.tenant_cache = cache
+                elapsed, rps = rate(lambda i: subdomain_middleware(requests[i]), len(requests))
+                results[label] = rps
+                self.stdout.write(
+                    f"{label:>10} : {rps:10.0f} req/s ({elapsed:.2f}s) {cache.stats()}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Gain : x{results['avec cache'] / results['sans cache']:.1f}"
+        ))
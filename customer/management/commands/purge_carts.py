@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from customer.cart_store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = "Supprime les paniers expirés du cart store (à lancer périodiquement, comme clearsessions)"
+
+    def handle(self, *args, **options):
+        deleted = get_cart_store().purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ligne(s) de panier supprimée(s)"))
@@ -0,0 +1,35 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from base.models import Restaurant
+from customer import menu_cache
+
+
+class Command(BaseCommand):
+    help = "Pré-construit les snapshots de menu de tous les restaurants actifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            action="append",
+            dest="subdomains",
+            help="Limiter à un ou plusieurs sous-domaines",
+        )
+
+    def handle(self, *args, **options):
+        if isinstance(menu_cache.get_cache(), LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                "Cache local (LocMemCache) : les snapshots ne seront pas partagés "
+                "avec les workers du serveur. Configurez DJANGO_CACHE_BACKEND."
+            ))
+
+        restaurants = Restaurant.objects.filter(is_active=True)
+        if options["subdomains"]:
+            restaurants = restaurants.filter(subdomain__in=options["subdomains"])
+
+        count = 0
+        for restaurant in restaurants.iterator():
+            snapshot = menu_cache.warm(restaurant)
+            count += 1
+            self.stdout.write(f"✔ {restaurant.subdomain} ({len(snapshot)} octets)")
+
+        self.stdout.write(self.style.SUCCESS(f"{count} menu(s) en cache"))
@@ -0,0 +1,214 @@
+"""
+Cache des menus clients (snapshots JSON pré-rendus par restaurant).
+
+Chaque restaurant possède un compteur de version stocké dans le cache.
+Le snapshot est rangé sous une clé qui contient cette version : il suffit
+d'incrémenter la version (signaux dans customer/signals.py) pour que
+l'ancien snapshot ne soit plus jamais lu.
+"""
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+
+from base.instrumentation import measure
+from base.models import RestaurantCustomization
+from customer.menu_encoder import dumps, encode_menu
+
+VERSION_KEY = "menu:version:{restaurant_id}"
+SNAPSHOT_KEY = "menu:snapshot:{restaurant_id}:{version}"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_cache():
+    return caches[getattr(settings, "MENU_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "MENU_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """Compteurs hit/miss du processus courant."""
+    with _stats_lock:
+        data = dict(_stats)
+    total = data["hits"] + data["misses"]
+    data["hit_ratio"] = round(data["hits"] / total, 4) if total else 0.0
+    return data
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+
+
+def _initial_version():
+    # Basée sur l'horloge : si la clé de version est perdue (éviction,
+    # redémarrage du cache), on ne retombe jamais sur un ancien snapshot.
+    return time.time_ns() // 1000
+
+
+def get_version(restaurant_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(restaurant_id=restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(restaurant_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(restaurant_id=restaurant_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(restaurant_id):
+    """Invalide le snapshot d'un restaurant (appelé par les signaux)."""
+    cache = get_cache()
+    key = VERSION_KEY.format(restaurant_id=restaurant_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def build_snapshot(restaurant):
+    """
+    Sérialise le menu complet d'un restaurant en JSON (bytes).
+
+    Sans requête : les URLs média partent de MEDIA_ORIGIN ou BACKEND_DOMAIN,
+    jamais de l'hôte du premier client qui a raté le cache.
+    """
+    with measure("serializer"):
+        return encode_menu(restaurant, _customization(restaurant))
+
+
+def _customization(restaurant):
+    from customer.utils import DEFAULT_CUSTOMIZATION
+
+    customization, _ = RestaurantCustomization.objects.get_or_create(
+        restaurant=restaurant,
+        defaults=DEFAULT_CUSTOMIZATION
+    )
+    return customization
+
+
+def get_snapshot(restaurant):
+    """Retourne le snapshot courant, en le construisant si besoin."""
+    cache = get_cache()
+    version = get_version(restaurant.id)
+    key = SNAPSHOT_KEY.format(restaurant_id=restaurant.id, version=version)
+
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        _count("hits")
+        return snapshot
+
+    _count("misses")
+    snapshot = build_snapshot(restaurant)
+    cache.set(key, snapshot, _timeout())
+    return snapshot
+
+
+async def aget_snapshot(restaurant):
+    """get_snapshot pour les vues async : seule la reconstruction passe par un thread."""
+    cache = get_cache()
+    version = await aget_version(restaurant.id)
+    key = SNAPSHOT_KEY.format(restaurant_id=restaurant.id, version=version)
+
+    snapshot = await cache.aget(key)
+    if snapshot is not None:
+        _count("hits")
+        return snapshot
+
+    _count("misses")
+    snapshot = await sync_to_async(build_snapshot)(restaurant)
+    await cache.aset(key, snapshot, _timeout())
+    return snapshot
+
+
+def warm(restaurant):
+    """Pré-construit le snapshot de la version courante."""
+    # Créer la personnalisation change la version : avant de la lire
+    _customization(restaurant)
+    cache = get_cache()
+    version = get_version(restaurant.id)
+    snapshot = build_snapshot(restaurant)
+    cache.set(
+        SNAPSHOT_KEY.format(restaurant_id=restaurant.id, version=version),
+        snapshot,
+        _timeout()
+    )
+    return snapshot
+
+
+def _etag(restaurant, version):
+    return f'"menu-{restaurant.id}-{version}"'
+
+
+def _finalize(request, response, policy_setting, etag):
+    if response.status_code in (200, 304):
+        if request.method in ("GET", "HEAD"):
+            response["ETag"] = etag
+        response["Cache-Control"] = getattr(settings, policy_setting)
+    return response
+
+
+def http_cached(policy_setting):
+    """
+    Requêtes conditionnelles sur la version du menu (If-None-Match -> 304 sans
+    sérialisation, un accès au cache) et en-tête Cache-Control lu dans
+    settings.<policy_setting>. Vues async appelées avec un jeton de table.
+
+    La table est vérifiée avant l'ETag (une requête) : une table désactivée
+    ou inconnue n'obtient jamais de 304. La vue reçoit (request, restaurant,
+    table), table à None si invalide, et renvoie alors l'erreur.
+
+    L'ETag renvoyé est relu après la vue : elle a pu changer la version
+    (personnalisation créée à la volée). Les erreurs n'ont pas d'ETag.
+    """
+    from customer.utils import aget_client_table
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, table_token):
+            restaurant, table = await aget_client_table(request, table_token)
+            if table is None:
+                return await view(request, restaurant, None)
+            etag = _etag(restaurant, await aget_version(restaurant.id))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, restaurant, table)
+                etag = _etag(restaurant, await aget_version(restaurant.id))
+            return _finalize(request, response, policy_setting, etag)
+        return wrapped
+    return decorator
+
+
+def render_menu(snapshot, table):
+    """Ajoute le bloc "table" (propre à chaque QR) au snapshot partagé."""
+    table_json = dumps({
+        "id": table.id,
+        "number": table.number,
+        "token": str(table.token),
+    })
+    return b'{"table":' + table_json + b"," + snapshot[1:]
@@ -0,0 +1,114 @@
+"""
+Encodeur rapide du menu client (snapshot de customer/menu_cache.py).
+
+Remplace les ModelSerializer DRF sur le chemin du menu : les articles sont
+lus en une requête .values() (pas d'instances de modèle), regroupés par
+catégorie en un seul passage, puis encodés avec orjson. Sans orjson, on
+retombe sur json de la bibliothèque standard (même sortie, plus lent).
+
+Le format est celui de MenuItemSerializer / RestaurantCustomizationSerializer
+(prix en chaînes, images en URLs absolues).
+"""
+import json
+
+from base.media_urls import MediaURLResolver
+from base.models import Category, MenuItem
+from base.thumbnails import srcsets
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+ITEM_FIELDS = (
+    "id", "category_id", "name", "description", "price", "discount_price", "image",
+    "thumbnails", "ingredients", "allergens", "is_vegetarian", "is_vegan", "is_spicy",
+    "preparation_time",
+)
+
+
+def dumps(data):
+    """JSON compact en bytes (UTF-8, comme le JSONRenderer de DRF)."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _decimal(value):
+    return None if value is None else str(value)
+
+
+def encode_items(rows, resolver):
+    """Dictionnaires d'articles (ordre des clés de MenuItemSerializer)."""
+    storage = MenuItem._meta.get_field("image").storage
+    url = resolver.url
+    items = []
+    for row in rows:
+        image = row["image"]
+        items.append({
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "price": str(row["price"]),
+            "discount_price": _decimal(row["discount_price"]),
+            "image": url(image, storage),
+            "image_srcset": srcsets(row["thumbnails"].get("image"), image, storage, resolver),
+            "ingredients": row["ingredients"],
+            "allergens": row["allergens"],
+            "is_vegetarian": row["is_vegetarian"],
+            "is_vegan": row["is_vegan"],
+            "is_spicy": row["is_spicy"],
+            "preparation_time": row["preparation_time"],
+        })
+    return items
+
+
+def encode_customization(customization, resolver):
+    return {
+        "primary_color": customization.primary_color,
+        "secondary_color": customization.secondary_color,
+        "font_family": customization.font_family,
+        "logo": resolver.file_url(customization.logo),
+        "cover_image": resolver.file_url(customization.cover_image),
+        "logo_srcset": customization.get_srcsets("logo", resolver),
+        "cover_image_srcset": customization.get_srcsets("cover_image", resolver),
+    }
+
+
+def encode_menu(restaurant, customization, request=None):
+    """Menu complet d'un restaurant en JSON (bytes) : 2 requêtes SQL."""
+    resolver = MediaURLResolver.for_request(request)
+    categories = list(
+        Category.objects.filter(restaurant=restaurant, is_active=True).values_list("id", "name")
+    )
+    rows = list(MenuItem.objects.filter(restaurant=restaurant).values(*ITEM_FIELDS, "is_available"))
+    items = encode_items(rows, resolver)
+
+    # Regroupement en un passage ; l'ordre global (order, name) est conservé.
+    # Comme CategorySerializer, les catégories listent tous leurs articles ;
+    # "menuItems" ne garde que les articles disponibles.
+    by_category = {category_id: [] for category_id, _ in categories}
+    available = []
+    for row, item in zip(rows, items):
+        group = by_category.get(row["category_id"])
+        if group is not None:
+            group.append(item)
+        if row["is_available"]:
+            available.append(item)
+
+    return dumps({
+        "restaurant": {
+            "name": restaurant.name,
+            "description": restaurant.description,
+            "address": restaurant.address,
+            "phone": restaurant.phone,
+            "subdomain": restaurant.subdomain,
+            "opening_hours": restaurant.opening_hours,
+        },
+        "customization": encode_customization(customization, resolver),
+        "categories": [
+            {"id": category_id, "name": name, "items": by_category[category_id]}
+            for category_id, name in categories
+        ],
+        "menuItems": available,
+    })
@@ -1,3 +1,20 @@
 from django.db import models
 
-# Create your models here.
+
+class CartLine(models.Model):
+    """
+    Ligne de panier client (customer.cart_store.DatabaseCartStore) : une
+    ligne par article et par clé de panier, partagée par tous les workers.
+    """
+    key = models.CharField(max_length=128)
+    menu_item_id = models.IntegerField()
+    quantity = models.IntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["key", "menu_item_id"], name="unique_cart_line"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} : {self.menu_item_id} x {self.quantity}"
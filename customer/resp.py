@@ -0,0 +1,286 @@
+"""
+Client minimal du protocole Redis (RESP2) et serveur local de remplacement.
+
+Le client ne couvre que les commandes utilisées par RedisCartStore et
+base.events.RedisBroker (PUBLISH / PSUBSCRIBE) ; il
+fonctionne avec un vrai Redis (ou tout serveur compatible : KeyDB, Valkey,
+Dragonfly...) comme avec RespStandInServer, utilisé en local et par
+`manage.py bench_cart`.
+"""
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    pass
+
+
+def encode_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connexion fermée par le serveur")
+    kind, payload = line[:1], line[1:-2]
+
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f"Réponse inattendue : {line!r}")
+
+
+class RespClient:
+    """Une connexion par thread, ouverte à la demande."""
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        self._local.sock, self._local.stream = sock, stream
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args):
+        self._local.sock.sendall(encode_command(*args))
+        return read_reply(self._local.stream)
+
+    def execute(self, *args):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        try:
+            return self._send(*args)
+        except (ConnectionError, OSError):
+            # Connexion coupée (redémarrage du serveur...) : un seul nouvel essai
+            self.close()
+            self._connect()
+            return self._send(*args)
+
+    def pipeline(self, *commands):
+        """Envoie plusieurs commandes en un seul aller-retour réseau."""
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        self._local.sock.sendall(b"".join(encode_command(*command) for command in commands))
+        return [read_reply(self._local.stream) for _ in commands]
+
+    def listen(self, *command):
+        """
+        Connexion dédiée aux abonnements (PSUBSCRIBE...) : envoie `command`
+        puis produit les messages reçus, sans timeout de lecture.
+        """
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            stream = sock.makefile("rb")
+            if self.password:
+                sock.sendall(encode_command("AUTH", self.password))
+                read_reply(stream)
+            sock.settimeout(None)
+            sock.sendall(encode_command(*command))
+            while True:
+                yield read_reply(stream)
+        finally:
+            sock.close()
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            finally:
+                self._local.sock = self._local.stream = None
+
+
+# --------------------------
+# Serveur local de remplacement
+# --------------------------
+class _Handler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._write_lock = threading.Lock()
+
+    def finish(self):
+        self.server.unsubscribe(self)
+        super().finish()
+
+    def send(self, value):
+        # Les messages PUBLISH sont écrits depuis le thread de l'émetteur
+        with self._write_lock:
+            self.wfile.write(self._encode(value))
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, RespError, ValueError):
+                return
+            if not command:
+                return
+            name = command[0].decode().upper()
+            if name == "PSUBSCRIBE":
+                for pattern in command[1:]:
+                    self.send([b"psubscribe", pattern, self.server.psubscribe(self, pattern)])
+                continue
+            try:
+                reply = self.server.dispatch(name, command[1:])
+            except RespError as exc:
+                with self._write_lock:
+                    self.wfile.write(f"-ERR {exc}\r\n".encode())
+                continue
+            self.send(reply)
+
+    def _encode(self, value):
+        if value is True:
+            return b"+OK\r\n"
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._encode(v) for v in value)
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class RespStandInServer(socketserver.ThreadingTCPServer):
+    """
+    Serveur RESP en mémoire (hashes et PUBLISH / PSUBSCRIBE) pour le
+    développement et les benchmarks, sans dépendre d'une installation Redis.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, _Handler)
+        self._hashes = {}
+        self._expires = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def psubscribe(self, handler, pattern):
+        with self._lock:
+            patterns = self._subscribers.setdefault(handler, set())
+            patterns.add(pattern)
+            return len(patterns)
+
+    def unsubscribe(self, handler):
+        with self._lock:
+            self._subscribers.pop(handler, None)
+
+    def _publish(self, channel, message):
+        receivers = [
+            (handler, pattern)
+            for handler, patterns in self._subscribers.items()
+            for pattern in patterns
+            if fnmatch.fnmatchcase(channel.decode(), pattern.decode())
+        ]
+        for handler, pattern in receivers:
+            try:
+                handler.send([b"pmessage", pattern, channel, message])
+            except OSError:
+                pass
+        return len(receivers)
+
+    def _hash(self, key, create=False):
+        expires = self._expires.get(key)
+        if expires is not None and expires < time.monotonic():
+            self._hashes.pop(key, None)
+            self._expires.pop(key, None)
+        if create:
+            return self._hashes.setdefault(key, {})
+        return self._hashes.get(key, {})
+
+    def dispatch(self, name, args):
+        with self._lock:
+            if name == "PING":
+                return "PONG"
+            if name in ("SELECT", "AUTH"):
+                return True
+            if name == "PUBLISH":
+                return self._publish(*args)
+            if name == "HINCRBY":
+                key, field, amount = args
+                data = self._hash(key, create=True)
+                data[field] = int(data.get(field, 0)) + int(amount)
+                return data[field]
+            if name == "HSET":
+                key, pairs = args[0], args[1:]
+                data = self._hash(key, create=True)
+                added = 0
+                for field, value in zip(pairs[::2], pairs[1::2]):
+                    added += field not in data
+                    data[field] = int(value)
+                return added
+            if name == "HGETALL":
+                result = []
+                for field, value in self._hash(args[0]).items():
+                    result += [field, value]
+                return result
+            if name == "HDEL":
+                data = self._hash(args[0])
+                return sum(data.pop(field, None) is not None for field in args[1:])
+            if name == "DEL":
+                removed = 0
+                for key in args:
+                    removed += self._hashes.pop(key, None) is not None
+                    self._expires.pop(key, None)
+                return removed
+            if name == "EXPIRE":
+                key, seconds = args[0], int(args[1])
+                if key not in self._hashes:
+                    return 0
+                self._expires[key] = time.monotonic() + seconds
+                return 1
+        raise RespError(f"commande inconnue '{name}'")
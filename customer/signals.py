@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from base.models import Category, MenuItem, Restaurant, RestaurantCustomization, Table
+from customer import menu_cache
+from customer.tenants import tenant_cache
+
+
+# --------------------------
+# Invalidation du cache des menus
+# --------------------------
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=RestaurantCustomization)
+@receiver(post_delete, sender=RestaurantCustomization)
+@receiver(post_delete, sender=Table)
+def bump_menu_version(sender, instance, **kwargs):
+    menu_cache.bump_version(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Table)
+def bump_table_menu_version(sender, instance, update_fields=None, **kwargs):
+    # Le bloc "table" fait partie de la réponse du menu (et de son ETag) ;
+    # la régénération du QR code ne le modifie pas
+    if update_fields and set(update_fields) <= {"qr_code", "qr_status"}:
+        return
+    menu_cache.bump_version(instance.restaurant_id)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def bump_restaurant_menu_version(sender, instance, **kwargs):
+    menu_cache.bump_version(instance.pk)
+
+
+# --------------------------
+# Invalidation du cache des tenants (SubdomainMiddleware)
+# --------------------------
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_tenant(sender, instance, **kwargs):
+    tenant_cache.invalidate(instance.pk, subdomains=[instance.subdomain])
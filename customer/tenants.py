@@ -0,0 +1,127 @@
+"""
+Cache en mémoire (par processus) de la résolution host -> id du restaurant.
+
+Utilisé par SubdomainMiddleware pour éviter une requête SQL et le parsing
+du host à chaque requête. Les hosts inconnus sont aussi mis en cache
+(cache négatif, TTL plus court) pour que les bots qui testent des
+sous-domaines au hasard ne touchent pas la base.
+
+Seul l'id est gardé : la ligne du restaurant (nom, horaires, taux de TVA)
+est relue avec la table à chaque requête (customer/utils.py), sans quoi
+un worker servirait une copie périmée après une modification faite dans
+un autre processus. Un restaurant désactivé est filtré à cette relecture.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from base.models import Restaurant
+
+
+def parse_subdomain(host):
+    """Extrait le sous-domaine d'un host (sans le port)."""
+    parts = host.split('.')
+
+    # ex: resto.localhost
+    if host.endswith("localhost"):
+        return parts[0] if len(parts) > 1 else None
+
+    # ex: resto.127.0.0.1
+    if host.endswith("127.0.0.1"):
+        return parts[0] if len(parts) > 4 else None
+
+    # ex: resto.mondomaine.com
+    return parts[0] if len(parts) > 2 else None
+
+
+class TenantCache:
+    """LRU borné avec expiration, indexé par host (`clock` remplaçable dans les tests)."""
+
+    def __init__(self, max_size=1024, ttl=300, negative_ttl=30, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, host):
+        """Retourne (trouvé, sous-domaine, id du restaurant)."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return False, None, None
+            self._entries.move_to_end(host)
+            self.hits += 1
+        _, subdomain, restaurant_id = entry
+        return True, subdomain, restaurant_id
+
+    def set(self, host, subdomain, restaurant_id):
+        if not self.enabled:
+            return
+        ttl = self.ttl if restaurant_id is not None or subdomain is None else self.negative_ttl
+        with self._lock:
+            self._entries[host] = (self.clock() + ttl, subdomain, restaurant_id)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, restaurant_id=None, subdomains=()):
+        """Supprime les entrées d'un restaurant et celles des sous-domaines donnés."""
+        subdomains = {s for s in subdomains if s}
+        with self._lock:
+            for host, (_, subdomain, cached_id) in list(self._entries.items()):
+                if subdomain in subdomains or (
+                    cached_id is not None and cached_id == restaurant_id
+                ):
+                    del self._entries[host]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+tenant_cache = TenantCache(
+    max_size=getattr(settings, "TENANT_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "TENANT_CACHE_TTL", 300),
+    negative_ttl=getattr(settings, "TENANT_CACHE_NEGATIVE_TTL", 30),
+)
+
+
+def resolve_tenant(host, cache=tenant_cache):
+    """Retourne (sous-domaine, id du restaurant) pour un host."""
+    found, subdomain, restaurant_id = cache.get(host)
+    if found:
+        return subdomain, restaurant_id
+
+    subdomain = parse_subdomain(host)
+    restaurant_id = None
+    if subdomain:
+        restaurant_id = Restaurant.objects.filter(
+            subdomain=subdomain,
+            is_active=True
+        ).values_list("pk", flat=True).first()
+
+    cache.set(host, subdomain, restaurant_id)
+    return subdomain, restaurant_id
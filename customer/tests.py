@@ -1,3 +1,545 @@
-from django.test import TestCase
+import json
+import tempfile
+from urllib.parse import urlencode
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from base.models import Category, MenuItem, Order, Restaurant, RestaurantCustomization, Table
+from base.tests import RestaurantTestCase, create_restaurant
+from customer import menu_cache
+from customer.cart_store import DatabaseCartStore, RedisCartStore, cart_key, get_cart_store
+from customer.models import CartLine
+from customer.resp import RespStandInServer
+from customer.tenants import TenantCache, resolve_tenant, tenant_cache
+
+
+class CreateOrderApiTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(restaurant=cls.restaurant, name="Plats")
+        cls.items = [
+            MenuItem.objects.create(
+                restaurant=cls.restaurant,
+                category=category,
+                name=f"Plat {i}",
+                price=Decimal("10.00"),
+                discount_price=Decimal("8.00") if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = f"/api/customer/create-order/{self.table.token}/"
+
+    def post_order(self, lines):
+        return self.client.post(self.url, {"items": lines}, format="json")
+
+    def count_queries(self, lines):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_order(lines)
+        self.assertEqual(response.status_code, 201, response.content)
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        # La première commande du jour crée la ligne d'agrégat (DailyOrderRollup)
+        self.post_order([{"menu_item_id": self.items[0].id, "quantity": 1}])
+        one_line = self.count_queries([{"menu_item_id": self.items[0].id, "quantity": 1}])
+        fifteen_lines = self.count_queries([
+            {"menu_item_id": item.id, "quantity": 2} for item in self.items
+        ])
+        self.assertEqual(one_line, fifteen_lines)
+
+    def test_duplicate_lines_are_merged(self):
+        item = self.items[1]
+        response = self.post_order([
+            {"menu_item_id": item.id, "quantity": 2},
+            {"menu_item_id": item.id, "quantity": 3},
+        ])
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get(pk=response.json()["id"])
+        lines = list(order.items.all())
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0].quantity, 5)
+        self.assertEqual(lines[0].price, Decimal("8.00"))
+        self.assertEqual(order.subtotal, Decimal("40.00"))
+        self.assertEqual(order.tax, Decimal("4.00"))
+        self.assertEqual(order.total, Decimal("44.00"))
+
+    def test_unavailable_item_rolls_back(self):
+        item = self.items[0]
+        item.is_available = False
+        item.save()
+
+        response = self.post_order([
+            {"menu_item_id": self.items[2].id, "quantity": 1},
+            {"menu_item_id": item.id, "quantity": 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_form_encoded_body(self):
+        lines = json.dumps([{"menu_item_id": self.items[0].id, "quantity": 2}])
+        for fmt in ("multipart", None):
+            data = {"items": lines, "customer_name": "Alice"}
+            if fmt:
+                response = self.client.post(self.url, data, format=fmt)
+            else:
+                response = self.client.post(
+                    self.url, urlencode(data), content_type="application/x-www-form-urlencoded"
+                )
+            self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            list(Order.objects.values_list("customer_name", "subtotal")),
+            [("Alice", Decimal("20.00"))] * 2,
+        )
+
+    def test_unknown_table_is_404(self):
+        response = self.client.post(
+            "/api/customer/create-order/00000000-0000-0000-0000-000000000000/",
+            {"items": [{"menu_item_id": self.items[0].id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+
+class TenantCacheTests(RestaurantTestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = TenantCache(max_size=2, ttl=300, negative_ttl=30, clock=lambda: self.now)
+        self.host = f"{self.restaurant.subdomain}.localhost"
+        tenant_cache.clear()
+        self.addCleanup(tenant_cache.clear)
+
+    def test_least_recently_used_host_is_evicted(self):
+        self.cache.set("a.localhost", "a", 1)
+        self.cache.set("b.localhost", "b", 2)
+        self.cache.get("a.localhost")
+        self.cache.set("c.localhost", "c", 3)
+
+        self.assertEqual(self.cache.get("a.localhost"), (True, "a", 1))
+        self.assertEqual(self.cache.get("b.localhost"), (False, None, None))
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+    def test_entries_expire_after_the_ttl(self):
+        self.cache.set(self.host, self.restaurant.subdomain, self.restaurant.id)
+        self.now = 300
+        self.assertTrue(self.cache.get(self.host)[0])
+        self.now = 300.5
+        self.assertFalse(self.cache.get(self.host)[0])
+
+    def test_unknown_subdomains_use_the_negative_ttl(self):
+        self.assertEqual(resolve_tenant("inconnu.localhost", self.cache), ("inconnu", None))
+        self.now = 29
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_tenant("inconnu.localhost", self.cache), ("inconnu", None))
+        self.now = 31
+        with self.assertNumQueries(1):
+            resolve_tenant("inconnu.localhost", self.cache)
+
+    def test_restaurant_rename_and_deletion_invalidate_the_cache(self):
+        self.assertEqual(resolve_tenant(self.host), (self.restaurant.subdomain, self.restaurant.id))
+        self.assertEqual(resolve_tenant("nouveau.localhost"), ("nouveau", None))
+
+        old_subdomain = self.restaurant.subdomain
+        self.restaurant.subdomain = "nouveau"
+        self.restaurant.save()
+        self.assertEqual(resolve_tenant(self.host), (old_subdomain, None))
+        self.assertEqual(resolve_tenant("nouveau.localhost"), ("nouveau", self.restaurant.id))
+
+        self.restaurant.delete()
+        self.assertEqual(resolve_tenant("nouveau.localhost"), ("nouveau", None))
+
+class CartTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(restaurant=cls.restaurant, name="Plats")
+        cls.items = [
+            MenuItem.objects.create(
+                restaurant=cls.restaurant, category=category, name=f"Plat {i}", price=Decimal("5.00")
+            )
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        self.client.defaults["HTTP_HOST"] = f"{self.restaurant.subdomain}.localhost"
+        session = self.client.session
+        session.save()
+        self.store = get_cart_store()
+        self.cart_key = cart_key(self.restaurant.id, self.table.token, session.session_key)
+
+    def fill_cart(self, items):
+        self.store.clear(self.cart_key)
+        for item in items:
+            self.store.set(self.cart_key, item.id, 2)
+
+    def update_cart(self, **payload):
+        return self.client.post(
+            f"/t/{self.table.token}/cart/", payload, content_type="application/json"
+        ).json()
+
+    def checkout_queries(self, items):
+        self.fill_cart(items)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f"/t/{self.table.token}/checkout/")
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_checkout_query_count_is_constant(self):
+        # Premier passage : personnalisation créée, tenant mis en cache
+        self.checkout_queries(self.items[:1])
+        self.assertEqual(
+            self.checkout_queries(self.items[:1]),
+            self.checkout_queries(self.items),
+        )
+
+    def test_checkout_reprices_and_skips_unavailable_items(self):
+        unavailable = self.items[1]
+        unavailable.is_available = False
+        unavailable.save()
+        self.fill_cart(self.items[:3])
+
+        self.client.post(f"/t/{self.table.token}/checkout/")
+
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(order.subtotal, Decimal("20.00"))
+        self.assertEqual(order.total, Decimal("22.00"))
+
+    def test_checkout_uses_the_current_tax_rate(self):
+        self.checkout_queries(self.items[:1])  # tenant mis en cache
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(tax_rate=Decimal("0.20"))
+        Order.objects.all().delete()
+
+        self.checkout_queries(self.items[:1])
+        self.assertEqual(Order.objects.get().total, Decimal("12.00"))
+
+    def test_checkout_page_shows_the_charged_amounts(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(tax_rate=Decimal("0.055"))
+        self.fill_cart(self.items[:3])
+
+        response = self.client.get(f"/t/{self.table.token}/checkout/")
+        self.assertContains(response, "Taxe (5.5%)")
+        self.assertEqual(response.context["tax"], Decimal("1.65"))
+        self.assertEqual(response.context["total"], Decimal("31.65"))
+
+        self.client.post(f"/t/{self.table.token}/checkout/")
+        order = Order.objects.get()
+        self.assertEqual((order.tax, order.total), (response.context["tax"], response.context["total"]))
+
+    def test_update_cart_writes_to_the_cart_store(self):
+        item = self.items[0]
+        self.update_cart(action="add", item_id=item.id)
+        response = self.update_cart(action="add", item_id=item.id)
+
+        self.assertEqual(response, {"success": True, "total": 10.0, "count": 1})
+        self.assertEqual(self.store.get(self.cart_key), {item.id: 2})
+
+        self.update_cart(action="update", item_id=item.id, quantity=0)
+        self.assertEqual(self.store.get(self.cart_key), {})
+
+    def test_menu_visit_creates_no_session(self):
+        from django.contrib.sessions.models import Session
+
+        self.client.cookies.clear()
+        sessions = Session.objects.count()
+        response = self.client.get(f"/t/{self.table.token}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Session.objects.count(), sessions)
+
+        self.update_cart(action="add", item_id=self.items[0].id)
+        self.assertEqual(Session.objects.count(), sessions + 1)
+
+    def test_update_cart_rejects_unavailable_item(self):
+        item = self.items[0]
+        item.is_available = False
+        item.save()
+
+        response = self.update_cart(action="add", item_id=item.id)
+
+        self.assertFalse(response["success"])
+        self.assertEqual(self.store.get(self.cart_key), {})
+
+
+class DatabaseCartStoreTests(TestCase):
+
+    def setUp(self):
+        self.store = DatabaseCartStore(ttl=60)
+
+    def test_increments_and_removes_at_zero(self):
+        key = cart_key(1, "token")
+        self.assertEqual(self.store.incr(key, 7), 1)
+        self.assertEqual(self.store.incr(key, 7, 2), 3)
+        self.store.set(key, 8, 4)
+        self.store.set(key, 8, 5)
+        self.assertEqual(self.store.get(key), {7: 3, 8: 5})
+
+        self.assertEqual(self.store.incr(key, 7, -3), 0)
+        self.assertEqual(self.store.get(key), {8: 5})
+
+        self.store.clear(key)
+        self.assertEqual(self.store.get(key), {})
+
+    def test_expired_cart_starts_over(self):
+        key = cart_key(1, "token")
+        self.store.incr(key, 7, 2)
+        CartLine.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.store.get(key), {})
+
+        self.assertEqual(self.store.incr(key, 7), 1)
+        self.assertEqual(self.store.purge_expired(), 0)
+        CartLine.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.store.purge_expired(), 1)
+
+
+class RespCartStoreTests(TestCase):
+
+    def setUp(self):
+        self.server = RespStandInServer().start()
+        self.addCleanup(self.server.stop)
+        self.store = RedisCartStore(url=self.server.url)
+        self.addCleanup(self.store.client.close)
+
+    def test_increments_and_removes_at_zero(self):
+        key = cart_key(1, "token")
+        self.assertEqual(self.store.incr(key, 7), 1)
+        self.assertEqual(self.store.incr(key, 7, 2), 3)
+        self.store.set(key, 8, 4)
+        self.assertEqual(self.store.get(key), {7: 3, 8: 4})
+
+        self.assertEqual(self.store.incr(key, 7, -3), 0)
+        self.assertEqual(self.store.get(key), {8: 4})
+
+        self.store.clear(key)
+        self.assertEqual(self.store.get(key), {})
+
+
+def create_sample_menu(restaurant):
+    categories = [
+        Category.objects.create(restaurant=restaurant, name=name, order=i)
+        for i, name in enumerate(["Entrées", "Plats"])
+    ]
+    for i in range(6):
+        MenuItem.objects.create(
+            restaurant=restaurant,
+            category=categories[i % 2],
+            name=f"Plat {i}",
+            price=Decimal("10.50"),
+            discount_price=Decimal("8.00") if i % 2 else None,
+            image=f"menu_items/plat-{i}.jpg" if i % 3 else "",
+            is_available=i != 4,
+            order=i,
+        )
+
+
+@override_settings(MEDIA_ORIGIN="https://cdn.openfood.test")
+class MenuEncoderTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        create_sample_menu(cls.restaurant)
+
+    def setUp(self):
+        menu_cache.get_cache().clear()
+
+    def test_encoder_matches_drf_serializers(self):
+        from customer.api.serializers import MenuItemSerializer, RestaurantCustomizationSerializer
+
+        menu_cache.build_snapshot(self.restaurant)  # crée la personnalisation par défaut
+        with CaptureQueriesContext(connection) as queries:
+            data = json.loads(menu_cache.build_snapshot(self.restaurant))
+        self.assertEqual(len(queries), 3)
+
+        items = MenuItem.objects.filter(restaurant=self.restaurant, is_available=True)
+        self.assertEqual(data["menuItems"], MenuItemSerializer(items, many=True).data)
+        self.assertEqual(
+            data["customization"],
+            RestaurantCustomizationSerializer(self.restaurant.customization).data,
+        )
+        self.assertEqual(data["menuItems"][1]["image"], "https://cdn.openfood.test/media/menu_items/plat-1.jpg")
+
+    def test_categories_list_all_their_items(self):
+        from customer.api.serializers import CategorySerializer
+
+        response = self.client.get(
+            f"/api/customer/menu/{self.table.token}/",
+            HTTP_HOST=f"{self.restaurant.subdomain}.localhost",
+        )
+        data = response.json()
+        self.assertEqual(data["table"]["number"], "1")
+        # Contrat de CategorySerializer : articles indisponibles compris
+        categories = Category.objects.filter(restaurant=self.restaurant, is_active=True)
+        self.assertEqual(data["categories"], CategorySerializer(categories, many=True).data)
+        self.assertEqual(
+            [[item["name"] for item in category["items"]] for category in data["categories"]],
+            [["Plat 0", "Plat 2", "Plat 4"], ["Plat 1", "Plat 3", "Plat 5"]],
+        )
+        self.assertNotIn("Plat 4", [item["name"] for item in data["menuItems"]])
+
+
+@override_settings(MEDIA_ORIGIN="", BACKEND_DOMAIN="https://api.openfood.test")
+class MenuCacheTests(RestaurantTestCase):
+
+    table_number = "1"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        create_sample_menu(cls.restaurant)
+        menu_cache.build_snapshot(cls.restaurant)  # crée la personnalisation par défaut
+
+    def setUp(self):
+        menu_cache.get_cache().clear()
+        menu_cache.reset_stats()
+
+    def test_bump_invalidates_the_snapshot(self):
+        first = menu_cache.get_snapshot(self.restaurant)
+        self.assertEqual(menu_cache.get_snapshot(self.restaurant), first)
+
+        # Écriture sans signal : seul le changement de version rend le menu à jour
+        MenuItem.objects.filter(restaurant=self.restaurant, name="Plat 0").update(name="Soupe")
+        self.assertEqual(menu_cache.get_snapshot(self.restaurant), first)
+        menu_cache.bump_version(self.restaurant.id)
+        self.assertIn(b"Soupe", menu_cache.get_snapshot(self.restaurant))
+
+        self.assertEqual(menu_cache.stats(), {"hits": 2, "misses": 2, "hit_ratio": 0.5})
+
+    def test_item_save_bumps_the_version(self):
+        version = menu_cache.get_version(self.restaurant.id)
+        MenuItem.objects.filter(restaurant=self.restaurant).first().save()
+        self.assertNotEqual(menu_cache.get_version(self.restaurant.id), version)
+
+    def test_warm_command_prebuilds_every_active_menu(self):
+        other = create_restaurant(self.owner, name="Fermé", email="f@openfood.test", is_active=False)
+        # Sans personnalisation : warm() la crée avant de lire la version
+        RestaurantCustomization.objects.filter(restaurant=self.restaurant).delete()
+        out = StringIO()
+        call_command("warm_menu_cache", stdout=out)
+        self.assertIn("1 menu(s) en cache", out.getvalue())
+        self.assertNotIn(other.subdomain, out.getvalue())
+
+        menu_cache.get_snapshot(self.restaurant)
+        self.assertEqual(menu_cache.stats()["hits"], 1)
+        self.assertEqual(menu_cache.stats()["misses"], 0)
+
+    def test_snapshot_urls_do_not_depend_on_the_first_request(self):
+        url = f"/api/customer/menu/{self.table.token}/"
+        host = f"{self.restaurant.subdomain}.localhost"
+        data = self.client.get(url, HTTP_HOST=host).json()
+        self.assertEqual(data["menuItems"][1]["image"], "https://api.openfood.test/media/menu_items/plat-1.jpg")
+        # warm() produit exactement le snapshot servi aux clients
+        self.assertEqual(menu_cache.warm(self.restaurant), menu_cache.get_snapshot(self.restaurant))
+
+    def test_conditional_requests(self):
+        url = f"/api/customer/menu/{self.table.token}/"
+        host = f"{self.restaurant.subdomain}.localhost"
+        response = self.client.get(url, HTTP_HOST=host)
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "public, max-age=0, must-revalidate")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST=host, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], "public, max-age=0, must-revalidate")
+        # La table est vérifiée, les articles ne sont pas relus
+        self.assertEqual(len([q for q in queries if "base_table" in q["sql"]]), 1)
+        self.assertFalse([q for q in queries if "base_menuitem" in q["sql"]])
+
+        MenuItem.objects.filter(restaurant=self.restaurant).first().save()
+        response = self.client.get(url, HTTP_HOST=host, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.table.number = "2"
+        self.table.save()
+        response = self.client.get(url, HTTP_HOST=host, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["table"]["number"], "2")
+
+    def test_snapshot_reads_the_current_restaurant_row(self):
+        url = f"/api/customer/menu/{self.table.token}/"
+        host = f"{self.restaurant.subdomain}.localhost"
+        self.client.get(url, HTTP_HOST=host)  # tenant mis en cache
+
+        # Modification faite par un autre worker : seule la version partagée change
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(name="Nouveau nom")
+        menu_cache.bump_version(self.restaurant.pk)
+        response = self.client.get(url, HTTP_HOST=host)
+        self.assertEqual(response.json()["restaurant"]["name"], "Nouveau nom")
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url, HTTP_HOST=host).status_code, 400)
+
+    def test_deactivated_table_gets_no_304(self):
+        url = f"/api/customer/menu/{self.table.token}/"
+        host = f"{self.restaurant.subdomain}.localhost"
+        etag = self.client.get(url, HTTP_HOST=host)["ETag"]
+
+        Table.objects.filter(pk=self.table.pk).update(is_active=False)
+        response = self.client.get(url, HTTP_HOST=host, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_local_menu_cache_is_refused_with_several_workers(self):
+        from customer.checks import check_shared_state
+
+        self.assertEqual(check_shared_state(None), [])
+        with override_settings(WEB_CONCURRENCY=2):
+            self.assertEqual(
+                [e.id for e in check_shared_state(None)], ["customer.E001", "customer.E003"]
+            )
+        with override_settings(WEB_CONCURRENCY=2, CART_STORE={"BACKEND": "customer.cart_store.LocalCartStore"}):
+            self.assertEqual(
+                [e.id for e in check_shared_state(None)],
+                ["customer.E001", "customer.E002", "customer.E003"],
+            )
+
+        redis_events = {"BACKEND": "base.events.RedisBroker"}
+        with tempfile.TemporaryDirectory() as location, override_settings(WEB_CONCURRENCY=2, ORDER_EVENTS=redis_events, CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": location,
+            },
+        }):
+            self.assertEqual(check_shared_state(None), [])
+
+    async def test_async_views(self):
+        from customer.api.views import client_menu_api
+        from customer.views import get_item_details
+
+        # Appel direct (AsyncRequestFactory ne permet pas de changer le host)
+        factory = AsyncRequestFactory()
+        request = factory.get(f"/api/customer/menu/{self.table.token}/")
+        request.restaurant_id = self.restaurant.id
+        response = await client_menu_api(request, table_token=self.table.token)
+        self.assertEqual(response.status_code, 200)
+        item_id = json.loads(response.content)["menuItems"][0]["id"]
+
+        request = factory.get(f"/api/customer/menu/{self.table.token}/", headers={"if-none-match": response["ETag"]})
+        request.restaurant_id = self.restaurant.id
+        response = await client_menu_api(request, table_token=self.table.token)
+        self.assertEqual(response.status_code, 304)
+
+        response = await get_item_details(factory.get(f"/item/{item_id}/details/"), str(item_id))
+        self.assertEqual(json.loads(response.content)["item"]["category"], "Entrées")
@@ -16,7 +16,6 @@ urlpatterns = [
     # Confirmation
     path("order/<int:order_id>/confirmation/", order_confirmation, name="order_confirmation"),
     path('item/<str:item_id>/details/', get_item_details, name='get_item_details'),
-    path("api/customer/menu/<uuid:table_token>/", menu_api),
 
 ]
 
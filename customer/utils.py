@@ -1,14 +1,34 @@
 
 from django.shortcuts import render
-from base.models import Restaurant, Table, RestaurantCustomization
+from base.models import Table, RestaurantCustomization
 
-def get_client_context(request, table_token):
+DEFAULT_CUSTOMIZATION = {
+    "primary_color": "#111827",
+    "secondary_color": "#C8A951",
+    "font_family": "inter"
+}
+
+
+def client_tables(request, table_token):
+    """
+    Table active du restaurant injecté par le middleware (id seulement),
+    restaurant relu dans la même requête : jamais une copie périmée.
+    """
+    return Table.objects.select_related("restaurant").filter(
+        token=table_token,
+        restaurant_id=getattr(request, "restaurant_id", None),
+        restaurant__is_active=True,
+        is_active=True
+    )
+
+
+def get_client_context(request, table_token, with_customization=True):
     # Restaurant injecté par le middleware
     print('depart')
-    restaurant = getattr(request, "restaurant", None)
+    restaurant_id = getattr(request, "restaurant_id", None)
     
-    print(restaurant)
-    if not restaurant:
+    print(restaurant_id)
+    if not restaurant_id:
         
         return None, None, None, render(
             request,
@@ -16,27 +36,82 @@ def get_client_context(request, table_token):
             {"message": "Restaurant non disponible"}
         )
 
-    try:
-        table = Table.objects.get(
-            token=table_token,
-            restaurant=restaurant,
-            is_active=True
-        )
-    except Table.DoesNotExist:
-        return restaurant, None, None, render(
+    table = client_tables(request, table_token).first()
+    if table is None:
+        return None, None, None, render(
             request,
             "customer/error.html",
             {"message": "Table non valide"}
         )
+    restaurant = table.restaurant
+
+    if not with_customization:
+        return restaurant, table, None, None
 
     customization, _ = RestaurantCustomization.objects.get_or_create(
         restaurant=restaurant,
-        defaults={
-            "primary_color": "#111827",
-            "secondary_color": "#C8A951",
-            "font_family": "inter"
-        }
+        defaults=DEFAULT_CUSTOMIZATION
     )
 
     return restaurant, table, customization, None
 
+
+
+def resolve_cart(restaurant, cart):
+    """
+    Valide tout le panier ({menu_item_id: quantité}, voir cart_store) en une
+    seule requête et le reprice à partir du prix actuel (discount_price ou
+    price) des articles. Les articles supprimés ou indisponibles sont ignorés.
+
+    Retourne (order_items, lignes pour l'affichage, total, nombre d'articles).
+    """
+    from base.utils import build_order_items
+
+    order_items, cart_total = build_order_items(restaurant, _cart_quantities(cart), skip_missing=True)
+    return _cart_lines(order_items, cart_total)
+
+
+async def aresolve_cart(restaurant, cart):
+    """resolve_cart pour les vues async."""
+    from base.utils import abuild_order_items
+
+    order_items, cart_total = await abuild_order_items(restaurant, _cart_quantities(cart), skip_missing=True)
+    return _cart_lines(order_items, cart_total)
+
+
+def _cart_quantities(cart):
+    return {
+        int(item_id): quantity
+        for item_id, quantity in cart.items()
+        if quantity > 0
+    }
+
+
+def _cart_lines(order_items, cart_total):
+    lines = []
+    cart_count = 0
+    for order_item in order_items:
+        menu_item = order_item.menu_item
+        item_total = order_item.get_total()
+        cart_count += order_item.quantity
+        lines.append({
+            "id": str(menu_item.id),
+            "name": menu_item.name,
+            "price": float(order_item.price),
+            "quantity": order_item.quantity,
+            "image": menu_item.image.url if menu_item.image else None,
+            "total": float(item_total),
+        })
+
+    return order_items, lines, cart_total, cart_count
+
+
+async def aget_client_table(request, table_token):
+    """
+    Contexte client des vues async (réponses JSON) : (restaurant, table),
+    table à None si le restaurant ou la table est invalide.
+    """
+    table = await client_tables(request, table_token).afirst()
+    if table is None:
+        return None, None
+    return table.restaurant, table
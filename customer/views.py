@@ -1,7 +1,8 @@
 from django.shortcuts import render
 from django.db.models import Prefetch
 from base.models import Category, MenuItem
-from customer.utils import get_client_context
+from customer.cart_store import get_cart_store, request_cart_key
+from customer.utils import get_client_context, resolve_cart
 
 def client_menu(request, table_token):
     restaurant, table, customization, error = get_client_context(request, table_token)
@@ -21,31 +22,12 @@ def client_menu(request, table_token):
         )
     ).order_by("order")
 
-    cart_key = f"cart_{restaurant.id}_{table_token}"
-    cart = request.session.get(cart_key, {})
+    key = request_cart_key(request, restaurant, table_token)
+    cart = get_cart_store().get(key) if key else {}
     
-    # Calculer les totaux
-    cart_items = []
-    cart_total = 0
-    cart_count = 0
-    
-    for item_id, item_data in cart.items():
-        try:
-            menu_item = MenuItem.objects.get(id=item_id, restaurant=restaurant)
-            item_total = float(item_data["price"]) * item_data["quantity"]
-            cart_total += item_total
-            cart_count += item_data["quantity"]
-            
-            cart_items.append({
-                "id": item_id,
-                "name": item_data["name"],
-                "price": float(item_data["price"]),
-                "quantity": item_data["quantity"],
-                "image": item_data.get("image"),
-                "total": item_total
-            })
-        except MenuItem.DoesNotExist:
-            continue
+    # Valider et calculer le panier (une seule requête)
+    _, cart_items, cart_total, cart_count = resolve_cart(restaurant, cart)
+    cart_total = float(cart_total)
     
     context = {
         "restaurant": restaurant,
@@ -64,113 +46,110 @@ def client_menu(request, table_token):
 import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
 from base.models import MenuItem
-from .utils import get_client_context
+from .utils import aget_client_table, aresolve_cart
+from customer.cart_store import get_cart_store, request_cart_key
+
+def apply_cart_action(store, key, action, item_id, data):
+    """Modifie le panier dans le cart store et le retourne (appels réseau sync)."""
+    if action == "add":
+        store.incr(key, item_id, 1)
+
+    elif action == "update":
+        qty = int(data.get("quantity", 1))
+        store.set(key, item_id, qty)
+
+    elif action == "remove":
+        store.remove(key, item_id)
+
+    return store.get(key)
+
 
 @csrf_exempt
-def update_cart(request, table_token):
+async def update_cart(request, table_token):
     if request.method != "POST":
         return JsonResponse({"success": False})
 
-    restaurant, table, _, error = get_client_context(request, table_token)
-    if error:
+    restaurant, table = await aget_client_table(request, table_token)
+    if table is None:
         return JsonResponse({"success": False, "error": "Contexte invalide"})
 
     data = json.loads(request.body)
     action = data.get("action")
     item_id = str(data.get("item_id"))
-
-    cart_key = f"cart_{restaurant.id}_{table_token}"
-    cart = request.session.get(cart_key, {})
-
-    if action == "add":
-        item = MenuItem.objects.get(
-            id=item_id,
-            restaurant=restaurant,
-            is_available=True
-        )
-
-        if item_id in cart:
-            cart[item_id]["quantity"] += 1
-        else:
-            cart[item_id] = {
-                "name": item.name,
-                "price": str(item.discount_price or item.price),
-                "quantity": 1,
-                "image": item.image.url if item.image else None
-            }
-
-    elif action == "update":
-        qty = int(data.get("quantity", 1))
-        if item_id in cart:
-            if qty > 0:
-                cart[item_id]["quantity"] = qty
-            else:
-                del cart[item_id]
-
-    elif action == "remove":
-        cart.pop(item_id, None)
-
-    request.session[cart_key] = cart
-    request.session.modified = True
-
-    total = sum(
-        float(i["price"]) * i["quantity"]
-        for i in cart.values()
-    )
+    if not item_id.isdigit():
+        return JsonResponse({"success": False, "error": "Article invalide"})
+
+    # Panier dans le cart store : une seule petite écriture par clic.
+    # Clé (session) et cart store sont sync : exécutés dans un thread
+    store = get_cart_store()
+    key = await sync_to_async(request_cart_key)(request, restaurant, table_token, create=True)
+    cart = await sync_to_async(apply_cart_action, thread_sensitive=store.thread_sensitive)(store, key, action, item_id, data)
+    _, lines, total, _ = await aresolve_cart(restaurant, cart)
+
+    # Article inexistant ou indisponible : on le retire du panier
+    invalid = set(cart) - {int(line["id"]) for line in lines}
+    if invalid:
+        await sync_to_async(store.remove, thread_sensitive=store.thread_sensitive)(key, *invalid)
+        if action == "add" and int(item_id) in invalid:
+            return JsonResponse({"success": False, "error": "Article indisponible"})
 
     return JsonResponse({
         "success": True,
-        "total": total,
-        "count": len(cart)
+        "total": float(total),
+        "count": len(lines)
     })
 
 # checkout
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.db import transaction
-from base.models import Order, OrderItem
-from customer.utils import get_client_context
+from base.utils import compute_totals, save_order
+from customer.cart_store import get_cart_store, request_cart_key
+from customer.utils import get_client_context, resolve_cart
 
 def checkout(request, table_token):
     restaurant, table, customization, error = get_client_context(request, table_token)
     if error:
         return error
 
-    cart_key = f"cart_{restaurant.id}_{table_token}"
-    cart = request.session.get(cart_key, {})
+    store = get_cart_store()
+    key = request_cart_key(request, restaurant, table_token)
+
+    # Panier validé et repricé en une requête
+    order_items, lines, cart_total, _ = resolve_cart(restaurant, store.get(key) if key else {})
 
-    if not cart:
+    if not order_items:
         messages.error(request, "Votre panier est vide")
         return redirect("client_menu", table_token=table_token)
 
     if request.method == "POST":
         with transaction.atomic():
-            order = Order.objects.create(
-                restaurant=restaurant,
+            order = save_order(
+                restaurant,
+                order_items,
                 table=table,
                 order_type="dine_in",
                 status="pending"
             )
-
-            for item_id, data in cart.items():
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item_id=item_id,
-                    quantity=data["quantity"],
-                    price=data["price"]
-                )
-
-            order.calculate_total()
-            del request.session[cart_key]
+            transaction.on_commit(lambda: store.clear(key), robust=True)
 
             return redirect("order_confirmation", order_id=order.id)
 
+    # Mêmes montants que ceux enregistrés par save_order
+    tax, total = compute_totals(cart_total, restaurant.tax_rate)
+
     return render(request, "customer/checkout.html", {
         "restaurant": restaurant,
         "customization": customization,
         "table": table,
-        "cart": cart,
+        "table_token": table_token,
+        "cart": {line["id"]: dict(line, total_price=line["total"]) for line in lines},
+        "cart_total": cart_total,
+        "tax_percent": f"{(restaurant.tax_rate * 100).normalize():f}",
+        "tax": tax,
+        "total": total,
     })
 
 
@@ -193,83 +172,36 @@ from django.http import JsonResponse
 from base.models import MenuItem
 
 @csrf_exempt
-def get_item_details(request, item_id):
+async def get_item_details(request, item_id):
     """Retourne les détails d'un article en JSON pour le modal"""
     if request.method != 'GET':
         return JsonResponse({'success': False})
-    
-    try:
-        item = MenuItem.objects.get(id=item_id, is_available=True)
-        
-        data = {
-            'success': True,
-            'item': {
-                'id': str(item.id),
-                'name': item.name,
-                'description': item.description,
-                'price': str(item.price),
-                'discount_price': str(item.discount_price) if item.discount_price else None,
-                'image_url': item.image.url if item.image else None,
-                'ingredients': item.ingredients,
-                'allergens': item.allergens,
-                'is_vegetarian': item.is_vegetarian,
-                'is_vegan': item.is_vegan,
-                'is_spicy': item.is_spicy,
-                'preparation_time': item.preparation_time,
-                'category': item.category.name if item.category else '',
-            }
-        }
-        
-        return JsonResponse(data)
-        
-    except MenuItem.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Article non trouvé'})
-    
-    
-    from django.http import JsonResponse
-from django.views.decorators.http import require_GET
-from customer.utils import get_client_context
-from base.models import Category, MenuItem
-
-@require_GET
-def menu_api(request, table_token):
-    restaurant, table, customization, error = get_client_context(request, table_token)
-    if error:
-        return JsonResponse({"error": "Restaurant non disponible"}, status=404)
 
-    categories_data = []
+    item = None
+    if item_id.isdigit():
+        item = await MenuItem.objects.select_related('category').filter(
+            id=item_id, is_available=True
+        ).afirst()
+    if item is None:
+        return JsonResponse({'success': False, 'error': 'Article non trouvé'})
 
-    categories = Category.objects.filter(
-        restaurant=restaurant,
-        is_active=True
-    ).prefetch_related("items")
-
-    for category in categories:
-        items = category.items.filter(is_available=True)
-
-        categories_data.append({
-            "id": category.id,
-            "name": category.name,
-            "items": [
-                {
-                    "id": item.id,
-                    "name": item.name,
-                    "price": str(item.discount_price or item.price),
-                    "image": item.image.url if item.image else None,
-                }
-                for item in items
-            ]
-        })
+    data = {
+        'success': True,
+        'item': {
+            'id': str(item.id),
+            'name': item.name,
+            'description': item.description,
+            'price': str(item.price),
+            'discount_price': str(item.discount_price) if item.discount_price else None,
+            'image_url': item.image.url if item.image else None,
+            'ingredients': item.ingredients,
+            'allergens': item.allergens,
+            'is_vegetarian': item.is_vegetarian,
+            'is_vegan': item.is_vegan,
+            'is_spicy': item.is_spicy,
+            'preparation_time': item.preparation_time,
+            'category': item.category.name if item.category else '',
+        }
+    }
 
-    return JsonResponse({
-        "restaurant": {
-            "id": restaurant.id,
-            "name": restaurant.name,
-            "logo": restaurant.logo.url if restaurant.logo else None,
-        },
-        "customization": {
-            "primary_color": customization.primary_color,
-            "secondary_color": customization.secondary_color,
-        },
-        "categories": categories_data
-    })
+    return JsonResponse(data)
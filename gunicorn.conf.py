@@ -0,0 +1,52 @@
+"""
+Configuration gunicorn (voir Procfile).
+
+Par défaut : application ASGI (main.asgi) servie par des workers uvicorn.
+Un worker garde des centaines de connexions lentes (clients mobiles) ouvertes
+pendant que les vues client async (menu, panier, commande) attendent la base.
+Pour revenir au WSGI : GUNICORN_WORKER_CLASS=sync et main.wsgi:application.
+
+Un seul worker par défaut. Avec WEB_CONCURRENCY > 1, le cache des menus,
+le cart store et le broker d'événements doivent être partagés (Redis, base) :
+le démarrage échoue sinon (on_starting, customer/checks.py).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn_worker.UvicornWorker")
+# Workers async : un par CPU suffit (les workers sync en demandent 2 x CPU + 1)
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+# Connexions keep-alive des clients mobiles (plusieurs requêtes par ouverture du menu)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Recyclage périodique des workers (fuites mémoire éventuelles)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+# X-Forwarded-Proto / X-Forwarded-For ne sont crus que venant de ces adresses
+# (request.scheme, URLs média absolues, redirections). Par défaut, seul un
+# proxy local. Derrière le proxy de la plateforme, donner ses adresses :
+# FORWARDED_ALLOW_IPS="10.0.0.1,10.0.0.2" ("*" seulement si l'application
+# n'est joignable que par ce proxy).
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = "-"
+
+if worker_class != "sync":
+    # ASGI : les connexions persistantes de Django sont liées à un thread ;
+    # le pool de connexions (base/db/pool.py) les partage entre requêtes
+    os.environ.setdefault("DB_POOL", "True")
+
+
+def on_starting(server):
+    # Vérifications Django (dont customer/checks.py) avec le nombre réel de workers
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("check")
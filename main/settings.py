@@ -195,6 +195,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "base.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -230,14 +231,29 @@ WSGI_APPLICATION = 'main.wsgi.application'
 # --------------------------
 # Base de données MySQL
 # --------------------------
+# Connexions persistantes : durée de vie en secondes (0 = une connexion par
+# requête), vérifiées au début de chaque requête qui les réutilise
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+# Pool de connexions en processus (recommandé en ASGI, base/db/pool.py) :
+# remplace les connexions persistantes, liées à un thread
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": "base.db.mysql_pool" if DB_POOL else "django.db.backends.mysql",
         "NAME": os.getenv("MYSQL_DATABASE"),
         "USER": os.getenv("MYSQL_USER"),
         "PASSWORD": os.getenv("MYSQL_PASSWORD"),
         "HOST": os.getenv("MYSQL_HOST"),
         "PORT": os.getenv("MYSQL_PORT", "3306"),
+        "CONN_MAX_AGE": 0 if DB_POOL else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
+        "OPTIONS": {
+            "pool": {"max_size": DB_POOL_SIZE, "max_lifetime": DB_POOL_MAX_LIFETIME},
+        } if DB_POOL else {},
     }
 }
 
@@ -290,3 +306,94 @@ LOGIN_URL = "/connexion"
 # --------------------------
 BACKEND_DOMAIN = os.getenv("BACKEND_DOMAIN", "https://monbackend-production.up.railway.app")
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "https://openfood-ten.vercel.app/")
+# Origine des URLs média renvoyées par l'API (CDN, ex. https://cdn.openfood.app).
+# Vide : domaine de la requête, ou BACKEND_DOMAIN hors requête et pour les
+# snapshots du menu en cache, partagés entre clients (base/media_urls.py)
+MEDIA_ORIGIN = os.getenv("MEDIA_ORIGIN", "")
+
+# --------------------------
+# Cache
+# --------------------------
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", "openfood"),
+    }
+}
+
+# Processus web (gunicorn.conf.py). Au-delà de 1, le cache des menus doit être
+# partagé entre processus (Redis, memcached) : vérifié par customer/checks.py
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+# Snapshots JSON des menus clients (customer/menu_cache.py)
+MENU_CACHE_ALIAS = os.getenv("MENU_CACHE_ALIAS", "default")
+MENU_CACHE_TIMEOUT = int(os.getenv("MENU_CACHE_TIMEOUT", 60 * 60 * 24))
+# Cache HTTP de l'API menu : ETag = version du menu, revalidation à chaque
+# ouverture (304 sans sérialisation). Ex. "public, max-age=30" derrière un CDN
+MENU_API_CACHE_CONTROL = os.getenv("MENU_API_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+# Cache des tenants par host (customer/tenants.py), 0 pour désactiver
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", 1024))
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", 300))
+TENANT_CACHE_NEGATIVE_TTL = int(os.getenv("TENANT_CACHE_NEGATIVE_TTL", 30))
+
+# --------------------------
+# Paniers clients (customer/cart_store.py)
+# --------------------------
+# DatabaseCartStore (défaut) ou RedisCartStore : partagés entre workers.
+# LocalCartStore (en mémoire) est réservé aux tests et au développement.
+CART_STORE = {
+    "BACKEND": os.getenv("CART_STORE_BACKEND", "customer.cart_store.DatabaseCartStore"),
+    "OPTIONS": {
+        "url": os.getenv("CART_STORE_URL", "redis://127.0.0.1:6379/0"),
+        "ttl": int(os.getenv("CART_STORE_TTL", 6 * 60 * 60)),
+    },
+}
+# Un seul panier partagé par table (True) ou un panier par navigateur (False)
+CART_SHARED_PER_TABLE = os.getenv("CART_SHARED_PER_TABLE", "False") == "True"
+
+# --------------------------
+# Commandes : temps réel (base/events.py), écran cuisine, numéros
+# --------------------------
+# Flux SSE /orders/events/ ; avec plusieurs workers : base.events.RedisBroker
+ORDER_EVENTS = {
+    "BACKEND": os.getenv("ORDER_EVENTS_BACKEND", "base.events.LocalBroker"),
+    "OPTIONS": {
+        "url": os.getenv("ORDER_EVENTS_URL", os.getenv("CART_STORE_URL", "redis://127.0.0.1:6379/0")),
+        # Publication après le commit de la commande : délai court, jamais bloquant
+        "timeout": float(os.getenv("ORDER_EVENTS_TIMEOUT", 0.5)),
+    },
+}
+ORDER_EVENTS_KEEPALIVE = int(os.getenv("ORDER_EVENTS_KEEPALIVE", 15))
+# Écran cuisine (base/kitchen.py) : recouvrement du curseur "since", en secondes
+KITCHEN_CURSOR_LAG = int(os.getenv("KITCHEN_CURSOR_LAG", 5))
+# Numéros de commande (base/order_numbers.py) : plages réservées par processus.
+# 1 = numéros consécutifs, mais les commandes d'un restaurant s'attendent
+# (ligne de séquence verrouillée jusqu'au commit) ; plus grand = trous possibles
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv("ORDER_NUMBER_BLOCK_SIZE", 20))
+
+# --------------------------
+# Tâches en arrière-plan (base/tasks.py)
+# --------------------------
+BACKGROUND_TASKS_ASYNC = os.getenv("BACKGROUND_TASKS_ASYNC", "True") == "True"
+BACKGROUND_TASKS_WORKERS = int(os.getenv("BACKGROUND_TASKS_WORKERS", 2))
+# Génération des QR en lot : pool de processus à partir de N tables
+QR_PROCESS_POOL_SIZE = int(os.getenv("QR_PROCESS_POOL_SIZE", 0))  # 0 = nombre de CPU
+QR_PROCESS_POOL_THRESHOLD = int(os.getenv("QR_PROCESS_POOL_THRESHOLD", 8))
+# Format des QR codes générés : "png" ou "svg" (plus léger)
+QR_FORMAT = os.getenv("QR_FORMAT", "png")
+
+# --------------------------
+# Miniatures des images (base/thumbnails.py)
+# --------------------------
+# Largeurs générées (px) ; une image plus étroite n'est jamais agrandie
+THUMBNAIL_WIDTHS = [int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "320,640,1024").split(",")]
+THUMBNAIL_FORMATS = os.getenv("THUMBNAIL_FORMATS", "webp,jpeg").split(",")
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 80))
+
+# --------------------------
+# Instrumentation des requêtes (base/instrumentation.py)
+# --------------------------
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "False") == "True"
+# Part des requêtes mesurées (0.0 à 1.0)
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv("INSTRUMENTATION_SAMPLE_RATE", 0.05))